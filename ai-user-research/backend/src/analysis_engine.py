@@ -0,0 +1,249 @@
+from typing import List, Optional
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from openai_scheduler import BACKGROUND, estimate_tokens
+
+# The report sections every analysis ends with, single-prompt or map-reduce
+ANALYSIS_SECTIONS = """
+            1. Key Findings and Documentation Alignment
+            - Compare user responses with product documentation
+            - Highlight any misalignments or misconceptions
+            - Identify feature requests that align/don't align with current capabilities
+
+            2. Sentiment Analysis
+            - Overall emotional response [Positive/Negative/Neutral]
+            - Pain points and frustrations [Negative]
+            - Areas of enthusiasm [Positive]
+            - Concerns and uncertainties [Neutral]
+            - Each bullet point must include sentiment tag
+
+            3. Market Opportunity
+            - Clear description of the problem worth solving
+            - Existing solutions and their limitations (based on documentation)
+            - Gaps between user needs and current capabilities
+
+            4. Action Items
+            - List 3-5 specific next steps to validate these findings
+            - Each action item should be concrete and measurable
+            - Include expected outcome for each action
+
+            5. Recommendations
+            - Specific features or solutions to consider
+            - Potential risks and mitigation strategies
+            - Priority order for implementation
+            """
+
+ANALYST_SYSTEM_MESSAGE = ("You are an expert user researcher and business analyst. Always verify information "
+                          "against provided documentation before making statements about product capabilities.")
+
+
+def document_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class DocumentSummaryCache:
+    """Product document summaries keyed by (content hash, model), shared by every session"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS document_summaries (
+                document_hash TEXT NOT NULL,
+                model TEXT NOT NULL,
+                summary TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (document_hash, model)
+            )
+        """)
+        self._conn.commit()
+
+    def get(self, doc_hash: str, model: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary FROM document_summaries WHERE document_hash = ? AND model = ?", (doc_hash, model)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, doc_hash: str, model: str, summary: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO document_summaries (document_hash, model, summary, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                (doc_hash, model, summary, time.time())
+            )
+            self._conn.commit()
+
+
+class MapReduceAnalyzer:
+    """Interview analysis that scales past one context window.
+
+    Map: the full transcript is cut into windows of whole turns; each window is analysed
+    concurrently together with the document chunks retrieved for it. Reduce: the window
+    notes and a summary of the whole product document are merged into the usual five
+    report sections, condensing the notes first if they do not fit. The document summary
+    is itself map-reduced over the chunks once per document and cached by content hash.
+    """
+
+    def __init__(self, platform, summary_cache: Optional[DocumentSummaryCache] = None, model: str = "gpt-4",
+                 window_tokens: int = 2500, chunks_per_window: int = 4, reduce_tokens: int = 4000,
+                 max_summary_sections: int = 32, concurrency: int = 4):
+        self.platform = platform
+        self.summary_cache = summary_cache
+        self.model = model
+        self.window_tokens = window_tokens
+        self.chunks_per_window = chunks_per_window
+        self.reduce_tokens = reduce_tokens
+        self.max_summary_sections = max_summary_sections
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    def _encode(self, text: str) -> List[int]:
+        # Transcripts and documents are user text: "<|endoftext|>" in them is not a special token
+        return self.platform.tokenizer.encode(text, disallowed_special=())
+
+    def _count(self, text: str) -> int:
+        return len(self._encode(text))
+
+    def _windows(self, blocks: List[str], max_tokens: int) -> List[List[str]]:
+        """Group consecutive blocks into windows of at most ``max_tokens`` (a lone oversized block is cut)"""
+        windows, current, current_tokens = [], [], 0
+        for block in blocks:
+            tokens = self._count(block)
+            if tokens > max_tokens:
+                block = self.platform.tokenizer.decode(self._encode(block)[:max_tokens])
+                tokens = max_tokens
+            if current and current_tokens + tokens > max_tokens:
+                windows.append(current)
+                current, current_tokens = [], 0
+            current.append(block)
+            current_tokens += tokens
+        if current:
+            windows.append(current)
+        return windows
+
+    async def _complete(self, prompt: str, completion_tokens: int, temperature: float = 0.3) -> str:
+        messages = [{"role": "system", "content": ANALYST_SYSTEM_MESSAGE}, {"role": "user", "content": prompt}]
+
+        async def call() -> str:
+            async with self._semaphore:
+                response = await self.platform.scheduler.call(
+                    self.platform.async_client.chat.completions.create,
+                    tokens=estimate_tokens([prompt, ANALYST_SYSTEM_MESSAGE], completion_tokens),
+                    priority=BACKGROUND,
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature
+                )
+            return response.choices[0].message.content.strip()
+
+        if self.platform.completion_cache is None:
+            return await call()
+        return await self.platform.completion_cache.complete_async(self.model, temperature, messages, call)
+
+    async def document_summary(self) -> str:
+        """Summary of the whole product document, computed once per document"""
+        platform = self.platform
+        text = platform.product_context or "\n".join(platform.doc_chunks)
+        if not text.strip():
+            return "No product documentation provided."
+        doc_hash = await asyncio.to_thread(document_hash, text)
+        if platform.document_summary and platform.document_summary[0] == doc_hash:
+            return platform.document_summary[1]
+        if self.summary_cache is not None:
+            cached = await asyncio.to_thread(self.summary_cache.get, doc_hash, self.model)
+            if cached is not None:
+                platform.document_summary = (doc_hash, cached)
+                return cached
+
+        sections = self._windows(platform._create_chunks(text, 4000, 0), self.window_tokens)
+        if len(sections) > self.max_summary_sections:
+            # Very long documents are summarized from evenly spaced sections
+            step = len(sections) / self.max_summary_sections
+            sections = [sections[int(i * step)] for i in range(self.max_summary_sections)]
+        partials = await asyncio.gather(*(self._complete(f"""
+            Summarize this part of a product's documentation for a user researcher. Keep the
+            capabilities, limitations, target users and any pricing or roadmap statements.
+            Use at most 200 words.
+
+            {"".join(section)}
+            """, 400) for section in sections))
+        summary = (await self._merge(list(partials), """
+            Merge these summaries of consecutive parts of one product document into a single
+            summary of at most 400 words, keeping capabilities, limitations and target users.
+            """, 800, until_one=True))[0]
+
+        platform.document_summary = (doc_hash, summary)
+        if self.summary_cache is not None:
+            await asyncio.to_thread(self.summary_cache.put, doc_hash, self.model, summary)
+        return summary
+
+    async def _map_window(self, window: List[str], index: int, total: int) -> str:
+        excerpt = "\n".join(window)
+        chunks = await self.platform._get_relevant_chunks_async(excerpt, top_k=self.chunks_per_window)
+        documentation = "\n---\n".join(chunks) or "No relevant documentation found."
+        return await self._complete(f"""
+            You are analysing part {index + 1} of {total} of a user research interview for
+            {self.platform.project_info['project_name']} ({self.platform.project_info['goal']} research with
+            {self.platform.project_info['target_audience']}).
+
+            Relevant product documentation:
+            {documentation}
+
+            Interview excerpt:
+            {excerpt}
+
+            Write concise notes on this excerpt only, under these headings: Findings and documentation
+            alignment; Sentiment (tag each point Positive/Negative/Neutral); Problems and gaps;
+            Ideas for next steps. Quote the interviewee where it matters. At most 250 words.
+            """, 500)
+
+    async def _merge(self, texts: List[str], instruction: str, completion_tokens: int,
+                     until_one: bool = False) -> List[str]:
+        """Merge groups of consecutive texts concurrently until they fit one reduce prompt
+        (or, with ``until_one``, until a single text is left)"""
+        while len(texts) > 1 and (until_one or sum(self._count(text) for text in texts) > self.reduce_tokens):
+            groups = self._windows(texts, self.reduce_tokens)
+            if len(groups) == len(texts):
+                # Every text is already near the limit on its own; pair them up
+                groups = [texts[i:i + 2] for i in range(0, len(texts), 2)]
+            texts = list(await asyncio.gather(*(
+                self._complete(f"{instruction}\n\n{chr(10).join(group)}", completion_tokens) for group in groups
+            )))
+        return texts
+
+    async def analyze(self) -> str:
+        platform = self.platform
+        turns = platform._format_conversation_turns(full=True)
+        windows = self._windows(turns, self.window_tokens)
+        summary, notes = await asyncio.gather(
+            self.document_summary(),
+            asyncio.gather(*(self._map_window(window, i, len(windows)) for i, window in enumerate(windows)))
+        )
+        notes = await self._merge(list(notes), """
+            Merge these notes on consecutive parts of one interview into one set of notes with
+            the same headings. Keep quotes, sentiment tags and anything contradictory.
+            """, 600)
+        interview_notes = "\n\n".join(f"Part {i + 1}:\n{note}" for i, note in enumerate(notes))
+
+        return await self._complete(f"""
+            Analyze the user research interview for {platform.project_info['project_name']}.
+            Context: {platform.project_info['goal']} research with {platform.project_info['target_audience']}
+
+            Product Documentation Summary:
+            {summary}
+
+            Notes on the interview, in order:
+            {interview_notes}
+
+            Provide analysis in these sections:
+            {ANALYSIS_SECTIONS}""", platform.analysis_completion_tokens, temperature=0.7)
@@ -0,0 +1,147 @@
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from embedding_space import EmbeddingSpaceMismatch
+
+
+class ChunkIndex:
+    """In-memory nearest-neighbour index over document chunk embeddings.
+
+    Embeddings are kept as one contiguous, L2-normalized matrix so a top-k query is a
+    matrix-vector product (in row blocks for compact storage) followed by ``argpartition``. ``dtype`` selects the
+    storage precision: ``"float32"``, ``"float16"`` (half the memory) or ``"int8"``
+    (a quarter, with one float32 scale per row). ``space`` is the key of the embedding
+    space the rows belong to; searches made with a query from another space are refused.
+    """
+
+    STORAGE_DTYPES = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+    # float16 and int8 rows are widened to float32 this many at a time while scoring, so a
+    # query allocates a bounded buffer rather than a float32 copy of the whole matrix
+    SEARCH_BLOCK_ROWS = 1024
+
+    def __init__(self, dtype: str = "float32", space: Optional[str] = None):
+        if dtype not in self.STORAGE_DTYPES:
+            raise ValueError(f"Unsupported storage dtype: {dtype}. "
+                             f"Supported dtypes are: {', '.join(self.STORAGE_DTYPES)}")
+        self.dtype = dtype
+        self.space = space
+        self._matrix = None
+        self._scales = None
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def dimensions(self) -> int:
+        return 0 if self._matrix is None else self._matrix.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the stored rows, excluding spare capacity"""
+        if self._matrix is None:
+            return 0
+        total = self._matrix[:self._size].nbytes
+        if self._scales is not None:
+            total += self._scales[:self._size].nbytes
+        return total
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def add(self, embeddings: Sequence[Sequence[float]]):
+        """Append embeddings; row ``i`` of the index corresponds to the ``i``-th chunk added"""
+        if len(embeddings) == 0:
+            return
+        vectors = self._normalize(np.asarray(embeddings, dtype=np.float32))
+        storage_dtype = self.STORAGE_DTYPES[self.dtype]
+
+        if self._matrix is None:
+            capacity = max(len(vectors), 16)
+            self._matrix = np.empty((capacity, vectors.shape[1]), dtype=storage_dtype)
+            if self.dtype == "int8":
+                self._scales = np.empty(capacity, dtype=np.float32)
+        elif vectors.shape[1] != self._matrix.shape[1]:
+            raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match index dimension "
+                             f"{self._matrix.shape[1]}")
+
+        # Grow geometrically so repeated appends stay amortized O(1) per row
+        needed = self._size + len(vectors)
+        if needed > len(self._matrix):
+            capacity = max(needed, 2 * len(self._matrix))
+            grown = np.empty((capacity, self._matrix.shape[1]), dtype=storage_dtype)
+            grown[:self._size] = self._matrix[:self._size]
+            self._matrix = grown
+            if self._scales is not None:
+                grown_scales = np.empty(capacity, dtype=np.float32)
+                grown_scales[:self._size] = self._scales[:self._size]
+                self._scales = grown_scales
+
+        if self.dtype == "int8":
+            # Symmetric per-row quantization: row ~= int8 values * scale
+            scales = np.abs(vectors).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            self._matrix[self._size:needed] = np.round(vectors / scales[:, None]).astype(np.int8)
+            self._scales[self._size:needed] = scales
+        else:
+            self._matrix[self._size:needed] = vectors
+        self._size = needed
+
+    def to_state(self) -> Dict:
+        """Compact, picklable copy of the stored rows (no spare capacity)"""
+        return {
+            "dtype": self.dtype,
+            "space": self.space,
+            "dimensions": self.dimensions,
+            "matrix": b"" if self._matrix is None else self._matrix[:self._size].tobytes(),
+            "scales": b"" if self._scales is None else self._scales[:self._size].tobytes(),
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict) -> "ChunkIndex":
+        """Rebuild an index from ``to_state``; raises ValueError if the state has no embedding space"""
+        if "space" not in state:
+            raise ValueError("Chunk index state does not record its embedding space")
+        index = cls(state["dtype"], state["space"])
+        if state["matrix"]:
+            matrix = np.frombuffer(state["matrix"], dtype=cls.STORAGE_DTYPES[state["dtype"]])
+            index._matrix = matrix.reshape(-1, state["dimensions"]).copy()
+            index._size = len(index._matrix)
+            if state["scales"]:
+                index._scales = np.frombuffer(state["scales"], dtype=np.float32).copy()
+        return index
+
+    def search(self, query_embedding: Sequence[float], top_k: int, space: Optional[str] = None) -> List[int]:
+        """Return the row indices of the ``top_k`` most cosine-similar chunks, best first.
+
+        Raises EmbeddingSpaceMismatch if ``space`` (the query's) differs from the index's,
+        or if the query's dimension does.
+        """
+        if space is not None and self.space is not None and space != self.space:
+            raise EmbeddingSpaceMismatch(f"Query embedding from {space} cannot be compared "
+                                         f"with chunk embeddings from {self.space}")
+        if self._size == 0 or top_k <= 0:
+            return []
+        query = self._normalize(np.asarray(query_embedding, dtype=np.float32))
+        if query.shape[-1] != self._matrix.shape[1]:
+            raise EmbeddingSpaceMismatch(f"Query embedding dimension {query.shape[-1]} does not match "
+                                         f"index dimension {self._matrix.shape[1]}")
+        if self.dtype == "float32":
+            scores = self._matrix[:self._size] @ query
+        else:
+            scores = np.empty(self._size, dtype=np.float32)
+            block = np.empty((min(self.SEARCH_BLOCK_ROWS, self._size), self._matrix.shape[1]), dtype=np.float32)
+            for start in range(0, self._size, len(block)):
+                rows = block[:min(len(block), self._size - start)]
+                np.copyto(rows, self._matrix[start:start + len(rows)])
+                np.matmul(rows, query, out=scores[start:start + len(rows)])
+        if self._scales is not None:
+            scores *= self._scales[:self._size]
+
+        top_k = min(top_k, self._size)
+        candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+        return candidates[np.argsort(-scores[candidates])].tolist()
@@ -0,0 +1,226 @@
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+MODES = ("off", "cache", "record", "replay")
+
+
+class CompletionCacheMiss(Exception):
+    """Raised in replay mode for a prompt that was never recorded"""
+
+
+def normalize_messages(messages: List[Dict]) -> List[Tuple[str, str]]:
+    """Roles and contents with whitespace runs collapsed, so re-indented prompt templates share a key"""
+    return [(message["role"], " ".join((message.get("content") or "").split())) for message in messages]
+
+
+def completion_key(model: str, temperature: float, messages: List[Dict]) -> str:
+    payload = json.dumps([model, temperature, normalize_messages(messages)], separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CompletionCache:
+    """Chat completion texts keyed by (model, temperature, hash of the normalized messages).
+
+    Two tiers: an in-memory LRU of ``max_memory_entries`` in front of a SQLite table that
+    survives restarts and is shared by workers using the same results directory. The mode
+    decides how callers use it:
+
+    - ``off``: every call goes to the API, nothing is stored
+    - ``cache``: hits are served, misses are called and stored
+    - ``record``: each prompt goes to the API once per process and its response is stored,
+      replacing older recordings; repeats within the run get that same response, so a
+      replay of the run sees exactly what the recording did
+    - ``replay``: only stored responses are served, a miss raises ``CompletionCacheMiss``;
+      the disk tier is loaded into memory up front so replays run without the network
+    """
+
+    def __init__(self, path: str, mode: str = "cache", max_memory_entries: int = 2048,
+                 max_entries: int = 100_000):
+        if mode not in MODES:
+            raise ValueError(f"Unknown completion cache mode {mode!r}, expected one of {', '.join(MODES)}")
+        self.path = path
+        self.mode = mode
+        self.max_memory_entries = max_memory_entries
+        self.max_entries = max_entries
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._recorded = set()
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS completions (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS completions_last_access ON completions (last_access)")
+        self._conn.commit()
+
+        if mode == "replay":
+            self.max_memory_entries = max(self.max_memory_entries, self._count())
+            self._preload()
+
+    def _count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+
+    def _preload(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, response FROM completions ORDER BY last_access DESC LIMIT ?", (self.max_memory_entries,)
+            ).fetchall()
+        for key, response in reversed(rows):
+            self._remember(key, response)
+
+    def _remember(self, key: str, response: str):
+        with self._lock:
+            self._memory[key] = response
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def _get_memory(self, key: str) -> Optional[str]:
+        with self._lock:
+            response = self._memory.get(key)
+            if response is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+            return response
+
+    def _get_disk(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT response FROM completions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE completions SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.disk_hits += 1
+        self._remember(key, row[0])
+        return row[0]
+
+    def _put_disk(self, key: str, model: str, response: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completions (key, model, response, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, model, response, now, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        # Caller holds the lock
+        count = self._conn.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM completions WHERE key IN "
+                "(SELECT key FROM completions ORDER BY last_access ASC LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+    def get(self, key: str) -> Optional[str]:
+        """The stored response for ``key`` from memory or disk, or None"""
+        response = self._get_memory(key)
+        return response if response is not None else self._get_disk(key)
+
+    def put(self, key: str, model: str, response: str):
+        if self.mode == "record":
+            self._recorded.add(key)
+        self._remember(key, response)
+        self._put_disk(key, model, response)
+
+    def lookup(self, model: str, temperature: float, messages: List[Dict]) -> Tuple[Optional[str], Optional[str]]:
+        """``(key, response)`` for a request as the mode dictates.
+
+        The key is None when nothing should be stored (mode ``off``), the response is None
+        when the API has to be called. Raises ``CompletionCacheMiss`` in replay mode.
+        """
+        if self.mode == "off":
+            return None, None
+        key = completion_key(model, temperature, messages)
+        if self.mode == "record" and key not in self._recorded:
+            return key, None
+        response = self.get(key)
+        if response is None and self.mode == "replay":
+            raise CompletionCacheMiss(f"No recorded {model} completion for this prompt")
+        return key, response
+
+    async def lookup_async(self, model: str, temperature: float,
+                           messages: List[Dict]) -> Tuple[Optional[str], Optional[str]]:
+        """Async variant of ``lookup``; memory hits are answered without leaving the loop"""
+        if self.mode == "off":
+            return None, None
+        key = completion_key(model, temperature, messages)
+        if self.mode == "record" and key not in self._recorded:
+            return key, None
+        response = self._get_memory(key)
+        if response is None:
+            response = await asyncio.to_thread(self._get_disk, key)
+        if response is None and self.mode == "replay":
+            raise CompletionCacheMiss(f"No recorded {model} completion for this prompt")
+        return key, response
+
+    async def put_async(self, key: Optional[str], model: str, response: str):
+        """Async variant of ``put``; a None key (mode ``off``) stores nothing"""
+        if key is None:
+            return
+        if self.mode == "record":
+            self._recorded.add(key)
+        self._remember(key, response)
+        await asyncio.to_thread(self._put_disk, key, model, response)
+
+    def complete(self, model: str, temperature: float, messages: List[Dict], call: Callable[[], str]) -> str:
+        """The response to ``messages``, from the cache or from ``call()`` as the mode dictates"""
+        key, response = self.lookup(model, temperature, messages)
+        if response is not None:
+            return response
+        response = call()
+        if key is not None:
+            self.put(key, model, response)
+        return response
+
+    async def complete_async(self, model: str, temperature: float, messages: List[Dict],
+                             call: Callable[[], Awaitable[str]]) -> str:
+        """Async variant of ``complete``"""
+        key, response = await self.lookup_async(model, temperature, messages)
+        if response is not None:
+            return response
+        response = await call()
+        await self.put_async(key, model, response)
+        return response
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "mode": self.mode,
+            "entries": self._count(),
+            "memory_entries": len(self._memory),
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
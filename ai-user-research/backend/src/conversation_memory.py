@@ -0,0 +1,80 @@
+from typing import Dict, List, Optional
+import asyncio
+
+from openai_scheduler import BACKGROUND, estimate_tokens
+
+
+class ConversationMemory:
+    """Rolling interview memory: the most recent turns verbatim, older turns folded into a summary.
+
+    Folding happens in a background task after each response, so the prompt for the next
+    question never waits on it. Turns that have left the recent window but are not yet
+    summarized stay verbatim until the summary catches up, so nothing is ever dropped.
+    """
+
+    def __init__(self, recent_turns: int = 6, summary_max_words: int = 250):
+        self.recent_turns = recent_turns
+        self.summary_max_words = summary_max_words
+        self.summary = ""
+        self.summarized_count = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def format_turns(self, history: List[Dict]) -> List[str]:
+        """Prompt blocks for the conversation: the running summary, then unsummarized turns"""
+        turns = [f"Q: {entry['question']}\nA: {entry['response']}" for entry in history[self.summarized_count:]]
+        if self.summary:
+            turns.insert(0, f"Summary of the earlier conversation: {self.summary}")
+        return turns
+
+    def _turns_to_fold(self, history: List[Dict]) -> List[Dict]:
+        return history[self.summarized_count:max(len(history) - self.recent_turns, self.summarized_count)]
+
+    def schedule_update(self, client, model: str, history: List[Dict], scheduler=None):
+        """Fold turns that left the recent window into the summary, off the request's critical path.
+
+        With a ``RequestScheduler`` the summary request runs at background priority.
+        """
+        if self._task and not self._task.done():
+            # The running update re-checks the history before it finishes
+            return
+        if not self._turns_to_fold(history):
+            return
+        try:
+            self._task = asyncio.get_running_loop().create_task(self._update(client, model, history, scheduler))
+        except RuntimeError:
+            # No event loop (sync callers): keep every turn verbatim
+            self._task = None
+
+    async def _update(self, client, model: str, history: List[Dict], scheduler=None):
+        while True:
+            turns = self._turns_to_fold(history)
+            if not turns:
+                return
+            exchanges = "\n".join(f"Q: {entry['question']}\nA: {entry['response']}" for entry in turns)
+            prompt = f"""
+            Running summary of a user research interview so far:
+            {self.summary or "None yet."}
+
+            New exchanges to fold in:
+            {exchanges}
+
+            Rewrite the summary so it covers the whole interview in under {self.summary_max_words} words.
+            Keep specific incidents, products, pain points, workarounds and the interviewee's own
+            phrasing for anything important. Output only the summary.
+            """
+            request = dict(model=model, messages=[{"role": "user", "content": prompt}], temperature=0)
+            try:
+                if scheduler is None:
+                    response = await client.chat.completions.create(**request)
+                else:
+                    response = await scheduler.call(
+                        client.chat.completions.create,
+                        tokens=estimate_tokens([prompt], self.summary_max_words * 2),
+                        priority=BACKGROUND,
+                        **request
+                    )
+            except Exception as e:
+                print(f"Error updating conversation summary: {e}")
+                return
+            self.summary = response.choices[0].message.content.strip()
+            self.summarized_count += len(turns)
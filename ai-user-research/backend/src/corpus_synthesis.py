@@ -0,0 +1,360 @@
+"""Cross-interview synthesis over saved interviews: the results store and interview_*.json files.
+
+Interviews are streamed from disk one at a time through a bounded queue to a pool of
+workers, each producing a short structured analysis. Every finished analysis is appended
+to a JSONL checkpoint and folded into running counts, so a run can be interrupted and
+resumed and memory does not grow with the size of the corpus. A final call turns the
+aggregated themes, sentiment and pain points into one project-level synthesis.
+
+    python backend/src/corpus_synthesis.py . backend/data --workers 8
+"""
+from collections import Counter
+from typing import AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Set
+import argparse
+import asyncio
+import glob
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+from openai_scheduler import BACKGROUND, estimate_tokens, get_scheduler, shared_clients
+from results_store import ResultsStore
+
+SENTIMENTS = ("positive", "negative", "neutral", "mixed")
+
+
+def iter_interview_files(paths: Iterable[str]) -> Iterator[str]:
+    """Interview files under ``paths`` (directories are searched for interview_*.json), each once"""
+    seen = set()
+    for path in paths:
+        files = sorted(glob.glob(os.path.join(path, "interview_*.json"))) if os.path.isdir(path) else [path]
+        for file in files:
+            real = os.path.realpath(file)
+            if real not in seen:
+                seen.add(real)
+                yield file
+
+
+def checkpoint_path(project_name: Optional[str] = None, results_dir: str = "results",
+                    sources: Iterable[str] = ()) -> str:
+    """Default checkpoint location; one per project and set of input paths (``sources``), so
+    filtered runs resume independently and a run over another corpus starts afresh"""
+    slug = re.sub(r"[^a-z0-9]+", "-", (project_name or "all").lower()).strip("-") or "all"
+    corpus = json.dumps(sorted({os.path.realpath(source) for source in sources}))
+    digest = hashlib.sha256(corpus.encode("utf-8")).hexdigest()[:12]
+    return os.path.join(results_dir, f"synthesis_checkpoint_{slug}_{digest}.jsonl")
+
+
+def normalize_question(question: str) -> str:
+    """Key under which rephrasings of the same question collapse: no numbering, case or punctuation"""
+    question = re.sub(r"^\s*\d+[.)]\s*", "", question or "")
+    return " ".join(re.findall(r"[a-z0-9']+", question.lower()))
+
+
+def _interview(interview_id: str, data: Dict) -> Optional[Dict]:
+    if isinstance(data.get("conversation_history"), list):
+        pairs = [(entry.get("question") or "", entry.get("response") or "") for entry in data["conversation_history"]]
+    elif isinstance(data.get("responses"), dict):
+        pairs = list(data["responses"].items())
+    else:
+        return None
+
+    turns: Dict[str, Dict] = {}
+    for question, response in pairs:
+        key = normalize_question(question)
+        if key in turns:
+            turns[key]["response"] += f"\n{response}"
+        else:
+            turns[key] = {"question": question, "response": response}
+
+    return {"id": interview_id, "project_info": data.get("project_info") or {}, "turns": list(turns.values())}
+
+
+def load_interview(path: str) -> Optional[Dict]:
+    """Read one saved interview into ``{"id", "project_info", "turns"}``.
+
+    Handles both the ``conversation_history`` list of interviews saved by the platform and
+    the older ``responses`` mapping of question to answer. Repeated questions within an
+    interview are merged into one turn. Returns None for files that are not interviews.
+    """
+    with open(path, "rb") as f:
+        content = f.read()
+    try:
+        data = json.loads(content)
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    return _interview(f"{path}:{hashlib.sha1(content).hexdigest()[:12]}", data)
+
+
+def interview_from_result(result: Dict) -> Optional[Dict]:
+    """An interview stored in the ``ResultsStore``, in the same shape as ``load_interview``"""
+    return _interview(f"result:{result['result_id']}", result)
+
+
+class CorpusAggregate:
+    """Running counts over per-interview analyses; memory is bounded by the number of distinct themes"""
+
+    def __init__(self, max_quotes: int = 30):
+        self.max_quotes = max_quotes
+        self.interviews = 0
+        self.sentiment = Counter()
+        self.themes = Counter()
+        self.pain_points = Counter()
+        self.questions = Counter()
+        self.question_text: Dict[str, str] = {}
+        self.quotes: List[str] = []
+
+    def add(self, record: Dict):
+        analysis = record["analysis"]
+        self.interviews += 1
+        sentiment = str(analysis.get("sentiment", "")).lower()
+        self.sentiment[sentiment if sentiment in SENTIMENTS else "neutral"] += 1
+        self.themes.update({str(theme).strip().lower() for theme in analysis.get("themes", []) if theme})
+        self.pain_points.update({str(point).strip().lower() for point in analysis.get("pain_points", []) if point})
+        for question in record.get("questions", []):
+            key = normalize_question(question)
+            self.questions[key] += 1
+            self.question_text.setdefault(key, question)
+        for quote in analysis.get("quotes", [])[:1]:
+            if len(self.quotes) < self.max_quotes:
+                self.quotes.append(str(quote))
+
+    def repeated_questions(self, limit: int = 20) -> List[Dict]:
+        return [{"question": self.question_text[key], "interviews": count}
+                for key, count in self.questions.most_common(limit) if count > 1]
+
+    def to_dict(self) -> Dict:
+        return {
+            "interviews": self.interviews,
+            "sentiment": dict(self.sentiment),
+            "top_themes": self.themes.most_common(25),
+            "top_pain_points": self.pain_points.most_common(25),
+            "repeated_questions": self.repeated_questions(),
+        }
+
+
+class CorpusSynthesis:
+    """One synthesis run over a corpus, resumable from its checkpoint file.
+
+    ``progress`` is called with the aggregate after every interview for status reporting.
+    """
+
+    def __init__(self, api_key: str, checkpoint_path: str, model: str = "gpt-4", workers: int = 4,
+                 project_name: Optional[str] = None, max_transcript_tokens: int = 3000):
+        self.client = shared_clients(api_key)[1]
+        self.scheduler = get_scheduler()
+        self.checkpoint_path = checkpoint_path
+        self.model = model
+        self.workers = workers
+        self.project_name = project_name
+        self.max_transcript_tokens = max_transcript_tokens
+        self.aggregate = CorpusAggregate()
+        self.failed = 0
+        self.skipped = 0
+        self._checkpoint_lock = threading.Lock()
+
+    def _load_checkpoint(self) -> Set[str]:
+        """Fold finished analyses back in and return their interview ids"""
+        done = set()
+        if not os.path.exists(self.checkpoint_path):
+            return done
+        with open(self.checkpoint_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A line cut short by an interrupted run; that interview is redone
+                    continue
+                if record["id"] not in done:
+                    done.add(record["id"])
+                    self.aggregate.add(record)
+        return done
+
+    def _open_checkpoint(self):
+        """Open the checkpoint for appending, terminating a line cut short by an interrupted run"""
+        directory = os.path.dirname(self.checkpoint_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        checkpoint = open(self.checkpoint_path, "a+", encoding="utf-8")
+        if checkpoint.tell():
+            checkpoint.seek(checkpoint.tell() - 1)
+            if checkpoint.read(1) != "\n":
+                checkpoint.write("\n")
+        return checkpoint
+
+    def _append(self, checkpoint, record: Dict):
+        line = json.dumps(record) + "\n"
+        # Workers append from the default executor's threads
+        with self._checkpoint_lock:
+            checkpoint.write(line)
+            checkpoint.flush()
+
+    def _wanted(self, interview: Optional[Dict]) -> bool:
+        if interview is None or not interview["turns"]:
+            return False
+        return not self.project_name or interview["project_info"].get("project_name") == self.project_name
+
+    async def _complete(self, prompt: str, completion_tokens: int) -> str:
+        response = await self.scheduler.call(
+            self.client.chat.completions.create,
+            tokens=estimate_tokens([prompt], completion_tokens),
+            priority=BACKGROUND,
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0
+        )
+        return response.choices[0].message.content.strip()
+
+    async def _analyze(self, interview: Dict) -> Dict:
+        transcript = "\n".join(f"Q: {turn['question']}\nA: {turn['response']}" for turn in interview["turns"])
+        # Keep the tail of very long transcripts (~4 characters per token)
+        transcript = transcript[-self.max_transcript_tokens * 4:]
+        info = interview["project_info"]
+        text = await self._complete(f"""
+            Analyze this user research interview ({info.get('goal', 'unknown')} research with
+            {info.get('target_audience', 'unknown audience')}).
+
+            {transcript}
+
+            Reply with JSON only, in this shape:
+            {{"themes": ["3-6 short theme labels"], "sentiment": "positive|negative|neutral|mixed",
+              "pain_points": ["short labels"], "quotes": ["the most telling verbatim quote"],
+              "summary": "two sentences"}}
+            """, 400)
+        try:
+            analysis = json.loads(text[text.find("{"):text.rfind("}") + 1])
+        except ValueError:
+            analysis = {"summary": text}
+        return analysis if isinstance(analysis, dict) else {"summary": text}
+
+    async def _worker(self, queue: asyncio.Queue, checkpoint, progress: Optional[Callable[[Dict], None]]):
+        while True:
+            interview = await queue.get()
+            if interview is None:
+                return
+            try:
+                analysis = await self._analyze(interview)
+            except Exception as e:
+                print(f"Error analyzing {interview['id']}: {e}")
+                self.failed += 1
+                continue
+            record = {
+                "id": interview["id"],
+                "project_info": interview["project_info"],
+                "questions": [turn["question"] for turn in interview["turns"]],
+                "analysis": analysis,
+            }
+            await asyncio.to_thread(self._append, checkpoint, record)
+            self.aggregate.add(record)
+            if progress:
+                progress(self.status())
+
+    async def _interviews(self, paths: Iterable[str], store=None) -> AsyncIterator[Optional[Dict]]:
+        """Interviews from the files under ``paths``, then from ``store``, read one at a time off the loop"""
+        for path in iter_interview_files(paths):
+            yield await asyncio.to_thread(load_interview, path)
+        if store is not None:
+            results = store.iter_results(kind="interview", project_name=self.project_name)
+            while (result := await asyncio.to_thread(next, results, None)) is not None:
+                yield interview_from_result(result)
+
+    async def run(self, paths: Iterable[str], progress: Optional[Callable[[Dict], None]] = None,
+                  store=None) -> Dict:
+        """Analyse every interview under ``paths`` (and in the results ``store``) not yet in the checkpoint"""
+        # Checkpoint reads and writes stay off the event loop, like the interview files
+        done = await asyncio.to_thread(self._load_checkpoint)
+        checkpoint = await asyncio.to_thread(self._open_checkpoint)
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.workers * 2)
+        workers = [asyncio.create_task(self._worker(queue, checkpoint, progress)) for _ in range(self.workers)]
+        try:
+            async for interview in self._interviews(paths, store):
+                if not self._wanted(interview):
+                    continue
+                if interview["id"] in done:
+                    self.skipped += 1
+                    continue
+                await queue.put(interview)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.to_thread(checkpoint.close)
+
+        return await self.synthesize()
+
+    async def synthesize(self) -> Dict:
+        """Project-level synthesis of everything in the aggregate"""
+        stats = self.aggregate.to_dict()
+        if not stats["interviews"]:
+            return {**stats, "synthesis": "No interviews to synthesize."}
+        quotes = "\n".join(f"- {quote}" for quote in self.aggregate.quotes)
+        synthesis = await self._complete(f"""
+            You are synthesizing {stats['interviews']} user research interviews
+            {f"for {self.project_name}" if self.project_name else ""}.
+
+            Sentiment across interviews: {json.dumps(stats['sentiment'])}
+            Most frequent themes (theme, interviews): {json.dumps(stats['top_themes'])}
+            Most frequent pain points (pain point, interviews): {json.dumps(stats['top_pain_points'])}
+            Representative quotes:
+            {quotes}
+
+            Write a project-level synthesis with these sections: Key Themes (grouping related
+            themes and saying how widespread each is), Overall Sentiment, Top Pain Points,
+            Opportunities, and Recommended Next Research Questions.
+            """, 1500)
+        return {**stats, "synthesis": synthesis}
+
+    def status(self) -> Dict:
+        return {"analyzed": self.aggregate.interviews, "skipped": self.skipped, "failed": self.failed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="*", default=[".", os.path.join("backend", "data")])
+    parser.add_argument("--project")
+    parser.add_argument("--store", default=os.path.join("results", "results.sqlite3"),
+                        help="results store whose interviews are included as well")
+    parser.add_argument("--checkpoint", help="defaults to one checkpoint per project and input paths under results/")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--model", default="gpt-4")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise SystemExit("OPENAI_API_KEY is not set")
+
+    store = ResultsStore(args.store) if os.path.exists(args.store) else None
+    sources = args.paths + ([args.store] if store else [])
+    synthesis = CorpusSynthesis(api_key, args.checkpoint or checkpoint_path(args.project, sources=sources),
+                                model=args.model, workers=args.workers, project_name=args.project)
+    try:
+        result = asyncio.run(synthesis.run(
+            args.paths,
+            store=store,
+            progress=lambda status: print(f"\rAnalyzed {status['analyzed']} interviews", end="", flush=True)
+        ))
+    finally:
+        if store is not None:
+            store.close()
+    print()
+
+    filename = os.path.join("results", f"synthesis_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs("results", exist_ok=True)
+    with open(filename, "w") as f:
+        json.dump({**result, **synthesis.status()}, f, indent=2)
+    print(result["synthesis"])
+    print(f"\nSynthesis saved to {filename}")
+
+
+if __name__ == "__main__":
+    main()
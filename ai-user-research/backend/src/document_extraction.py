@@ -0,0 +1,179 @@
+from typing import AsyncIterator, Iterator, Union
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from queue import Empty
+import asyncio
+import codecs
+import io
+import mmap
+import multiprocessing
+import os
+import time
+
+from PyPDF2 import PdfReader
+from docx import Document
+from pptx import Presentation
+import markdown
+
+from metrics import REGISTRY, span
+
+SUPPORTED_FORMATS = ['.pdf', '.docx', '.pptx', '.md', '.txt']
+
+# Paragraphs per piece for DOCX and characters per piece for plain text
+DOCX_PARAGRAPHS_PER_PIECE = 50
+TEXT_CHARS_PER_PIECE = 64 * 1024
+
+# Seconds between checks that the parsing worker is still alive while waiting for a page
+WORKER_POLL_SECONDS = 0.5
+
+_process_pool = None
+_manager = None
+
+
+def is_supported_format(file_type: str) -> bool:
+    file_type = file_type.lower().strip('.')
+    return any(file_type.endswith(extension.strip('.')) for extension in SUPPORTED_FORMATS)
+
+
+def _iter_text(source: Union[bytes, str]) -> Iterator[str]:
+    """Decode UTF-8 text in pieces; files are memory-mapped rather than read into memory"""
+    if isinstance(source, bytes):
+        text = source.decode('utf-8')
+        for start in range(0, len(text), TEXT_CHARS_PER_PIECE):
+            yield text[start:start + TEXT_CHARS_PER_PIECE]
+        return
+
+    with open(source, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if not size:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            decoder = codecs.getincrementaldecoder('utf-8')()
+            for start in range(0, size, TEXT_CHARS_PER_PIECE):
+                end = start + TEXT_CHARS_PER_PIECE
+                piece = decoder.decode(mapped[start:end], final=end >= size)
+                if piece:
+                    yield piece
+
+
+def iter_document_pages(source: Union[bytes, str], file_type: str) -> Iterator[str]:
+    """Yield a document's text page by page (slide by slide for PPTX).
+
+    ``source`` is either the file content or a path to it; parsers read from the path
+    directly so the whole file need not be held in memory. Concatenating the pieces
+    gives the full text, separators included.
+    """
+    # Normalize file type to lowercase and remove any leading dots
+    file_type = file_type.lower().strip('.')
+    document = io.BytesIO(source) if isinstance(source, bytes) else source
+
+    if file_type.endswith('pdf'):
+        for page in PdfReader(document).pages:
+            yield (page.extract_text() or "") + "\n"
+
+    elif file_type.endswith('docx'):
+        paragraphs = [paragraph.text for paragraph in Document(document).paragraphs]
+        for start in range(0, len(paragraphs), DOCX_PARAGRAPHS_PER_PIECE):
+            piece = "\n".join(paragraphs[start:start + DOCX_PARAGRAPHS_PER_PIECE])
+            yield piece + "\n" if start + DOCX_PARAGRAPHS_PER_PIECE < len(paragraphs) else piece
+
+    elif file_type.endswith('pptx'):
+        for slide in Presentation(document).slides:
+            yield "".join(shape.text + "\n" for shape in slide.shapes if hasattr(shape, "text"))
+
+    elif file_type.endswith('md'):
+        html = markdown.markdown("".join(_iter_text(source)))
+        from bs4 import BeautifulSoup
+        yield BeautifulSoup(html, 'html.parser').get_text()
+
+    elif file_type.endswith('txt'):
+        yield from _iter_text(source)
+
+    else:
+        raise ValueError(
+            f"Unsupported file type: {file_type}. Supported formats are: {', '.join(SUPPORTED_FORMATS)}")
+
+
+def extract_text_from_document(source: Union[bytes, str], file_type: str) -> str:
+    """Extract text from various document formats"""
+    try:
+        with span("extract", format=file_type.lstrip(".").lower()):
+            return "".join(iter_document_pages(source, file_type))
+    except Exception as e:
+        print(f"Error processing file: {str(e)}")  # Debug log
+        raise ValueError(f"Error processing {file_type} file: {str(e)}")
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=int(os.getenv("EXTRACTION_WORKERS", os.cpu_count() or 2)))
+    return _process_pool
+
+
+def _discard_broken_pool(error: BaseException):
+    """Drop a pool whose worker died, so the next document gets a fresh one"""
+    global _process_pool
+    if isinstance(error, BrokenProcessPool) and _process_pool is not None:
+        _process_pool.shutdown(wait=False)
+        _process_pool = None
+
+
+def _get_manager():
+    global _manager
+    if _manager is None:
+        _manager = multiprocessing.Manager()
+    return _manager
+
+
+def _extract_into_queue(source: Union[bytes, str], file_type: str, queue):
+    """Process pool worker: push pages onto ``queue`` as they are parsed"""
+    try:
+        for page in iter_document_pages(source, file_type):
+            queue.put(("page", page))
+        queue.put(("done", None))
+    except Exception as e:
+        queue.put(("error", f"Error processing {file_type} file: {str(e)}"))
+
+
+async def stream_document_pages(source: Union[bytes, str], file_type: str,
+                                delete_after: bool = False) -> AsyncIterator[str]:
+    """Parse a document in the process pool and yield its pages as soon as each is extracted.
+
+    Parsing never runs on the event loop, so one large upload does not stall other sessions.
+    Pass a file path as ``source`` to avoid copying the content to the worker; with
+    ``delete_after`` the file is removed once parsing is over. Raises ValueError if the
+    document cannot be parsed.
+
+    The ``extract`` span records the time spent waiting on the parser, not on the consumer.
+    """
+    loop = asyncio.get_running_loop()
+    waited, outcome = 0.0, "error"
+    try:
+        queue = _get_manager().Queue()
+        worker = loop.run_in_executor(_get_process_pool(), _extract_into_queue, source, file_type, queue)
+
+        while True:
+            start = time.perf_counter()
+            try:
+                kind, value = await loop.run_in_executor(None, queue.get, True, WORKER_POLL_SECONDS)
+            except Empty:
+                waited += time.perf_counter() - start
+                # A worker that died mid-parse (killed, out of memory) never posts "done"
+                if worker.done() and worker.exception() is not None:
+                    _discard_broken_pool(worker.exception())
+                    raise ValueError(f"Error processing {file_type} file: {worker.exception()}")
+                continue
+            waited += time.perf_counter() - start
+            if kind == "page":
+                yield value
+            elif kind == "error":
+                raise ValueError(value)
+            else:
+                break
+        await worker
+        outcome = "ok"
+    finally:
+        REGISTRY.observe_stage("extract", waited, outcome=outcome, format=file_type.lstrip(".").lower())
+        if delete_after and isinstance(source, str) and os.path.exists(source):
+            os.remove(source)
@@ -1,12 +1,14 @@
 from typing import List, Dict, Optional
 import json
-from datetime import datetime
 import os
+from embedding_cache import EmbeddingCache
+from analysis_engine import DocumentSummaryCache
+from results_store import ResultsStore
+from completion_cache import CompletionCache
 
 
 class DocumentProcessor:
     def __init__(self):
-        self.embeddings_cache = {}
         self.documents = []
         self.results_dir = "results"
 
@@ -14,6 +16,19 @@ class DocumentProcessor:
         if not os.path.exists(self.results_dir):
             os.makedirs(self.results_dir)
 
+        # Shared by every session so the same document is only embedded once
+        self.embeddings_cache = EmbeddingCache(os.path.join(self.results_dir, "embeddings.sqlite3"))
+        # Product document summaries for map-reduce analysis, keyed by document content
+        self.summary_cache = DocumentSummaryCache(os.path.join(self.results_dir, "summaries.sqlite3"))
+        # Finished interviews and analyses, indexed by session, project, goal, audience and date
+        self.results_store = ResultsStore(os.path.join(self.results_dir, "results.sqlite3"))
+        # Question and analysis completions keyed by normalized prompt; COMPLETION_CACHE_MODE is
+        # "off" (default), "record" (capture live traffic), "replay" (offline, no API calls) or
+        # "cache". Questions and analyses are sampled, so "cache" hands one interview's
+        # completion to any other with the same prompt; keep it to development and load tests
+        self.completion_cache = CompletionCache(os.path.join(self.results_dir, "completions.sqlite3"),
+                                                mode=os.getenv("COMPLETION_CACHE_MODE", "off"))
+
     def process_document(self, content: str, document_type: str) -> Dict:
         """
         Process a document and extract relevant information
@@ -42,15 +57,10 @@ class DocumentProcessor:
         # Add text processing logic here
         return {"type": "text", "content": content}
 
-    def save_results(self, analysis_results: Dict) -> str:
+    def save_results(self, analysis_results: Dict, session_id: Optional[str] = None,
+                     project_info: Optional[Dict] = None) -> str:
         """
-        Save analysis results to a file
+        Queue analysis results in the results store and return their result id
         """
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"analysis_{timestamp}.json"
-        filepath = os.path.join(self.results_dir, filename)
-
-        with open(filepath, 'w') as f:
-            json.dump(analysis_results, f, indent=2)
-
-        return filepath
\ No newline at end of file
+        return self.results_store.append("analysis", {"project_info": project_info or {}, **analysis_results},
+                                         session_id=session_id, project_info=project_info)
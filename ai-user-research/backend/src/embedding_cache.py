@@ -0,0 +1,151 @@
+from typing import List, Optional, Sequence
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """Disk-backed embedding cache keyed by (model, hash of the chunk text).
+
+    Vectors are stored as float32 blobs in SQLite. Least recently used entries are
+    evicted once the cache grows past ``max_entries`` or ``max_bytes``. Entry count and
+    size are tracked as rows are written and only recounted from the table when they
+    say the limits are exceeded, since workers sharing the file also write to it.
+    """
+
+    def __init__(self, path: str, max_entries: int = 100_000, max_bytes: int = 512 * 1024 * 1024):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_access ON embeddings (last_access)")
+        self._conn.commit()
+        self._count, self._bytes = self._totals()
+
+    def _totals(self):
+        return self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM embeddings").fetchone()
+
+    @staticmethod
+    def _hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """Look up embeddings for ``texts``; misses are returned as ``None``"""
+        hashes = [self._hash(text) for text in texts]
+        found = {}
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(hashes), 500):
+                batch = list(set(hashes[start:start + 500]))
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *batch]
+                ).fetchall()
+                found.update(rows)
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model, text_hash) for text_hash in found]
+                )
+                self._conn.commit()
+
+        results = [np.frombuffer(found[text_hash], dtype=np.float32).tolist() if text_hash in found else None
+                   for text_hash in hashes]
+        hits = sum(result is not None for result in results)
+        with self._lock:
+            self.hits += hits
+            self.misses += len(results) - hits
+        return results
+
+    def put_many(self, model: str, texts: Sequence[str], embeddings: Sequence[Optional[List[float]]]):
+        """Store embeddings for ``texts``, skipping any that are ``None``"""
+        now = time.time()
+        rows = []
+        for text, embedding in zip(texts, embeddings):
+            if embedding is None:
+                continue
+            blob = np.asarray(embedding, dtype=np.float32).tobytes()
+            rows.append((model, self._hash(text), blob, len(blob), now))
+        if not rows:
+            return
+
+        with self._lock:
+            # Rows being replaced are already counted
+            replaced = {}
+            for start in range(0, len(rows), 500):
+                batch = list({row[1] for row in rows[start:start + 500]})
+                placeholders = ",".join("?" * len(batch))
+                replaced.update(self._conn.execute(
+                    f"SELECT text_hash, size FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *batch]
+                ).fetchall())
+            written = {row[1]: row[3] for row in rows}
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector, size, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            self._count += len(written) - len(replaced)
+            self._bytes += sum(written.values()) - sum(replaced.values())
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits its limits; caller holds the lock"""
+        if self._count <= self.max_entries and self._bytes <= self.max_bytes:
+            return
+        count, total_bytes = self._totals()
+        if count <= self.max_entries and total_bytes <= self.max_bytes:
+            self._count, self._bytes = count, total_bytes
+            return
+
+        rows = self._conn.execute(
+            "SELECT model, text_hash, size FROM embeddings ORDER BY last_access ASC"
+        )
+        evicted = []
+        for model, text_hash, size in rows:
+            if count <= self.max_entries and total_bytes <= self.max_bytes:
+                break
+            evicted.append((model, text_hash))
+            count -= 1
+            total_bytes -= size
+        self._conn.executemany("DELETE FROM embeddings WHERE model = ? AND text_hash = ?", evicted)
+        self._count, self._bytes = count, total_bytes
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, total_bytes = self._totals()
+        lookups = self.hits + self.misses
+        return {
+            "entries": count,
+            "bytes": total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
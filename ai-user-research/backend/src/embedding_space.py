@@ -0,0 +1,51 @@
+from typing import Dict, Optional
+
+# Known embedding models: native dimensions and whether the API can shorten them
+EMBEDDING_MODELS = {
+    "text-embedding-ada-002": {"dimensions": 1536, "shortenable": False},
+    "text-embedding-3-small": {"dimensions": 1536, "shortenable": True},
+    "text-embedding-3-large": {"dimensions": 3072, "shortenable": True},
+}
+
+
+class EmbeddingSpaceMismatch(ValueError):
+    """Raised when vectors from different embedding spaces would be compared"""
+
+
+class EmbeddingSpace:
+    """A model and output dimension; vectors are only comparable within one space.
+
+    ``key`` names the space wherever vectors are stored (embedding cache, chunk index,
+    session snapshots). Native-dimension spaces are keyed by the bare model name.
+    """
+
+    def __init__(self, model: str, dimensions: Optional[int] = None):
+        if model not in EMBEDDING_MODELS:
+            raise ValueError(f"Unknown embedding model: {model}. "
+                             f"Known models are: {', '.join(EMBEDDING_MODELS)}")
+        native = EMBEDDING_MODELS[model]["dimensions"]
+        dimensions = dimensions or native
+        if dimensions != native and not EMBEDDING_MODELS[model]["shortenable"]:
+            raise ValueError(f"{model} only produces {native}-dimensional embeddings")
+        if not 0 < dimensions <= native:
+            raise ValueError(f"{model} embeddings can have at most {native} dimensions")
+        self.model = model
+        self.dimensions = dimensions
+        self.native = dimensions == native
+
+    @property
+    def key(self) -> str:
+        return self.model if self.native else f"{self.model}@{self.dimensions}"
+
+    def request_options(self) -> Dict:
+        """Extra embeddings API arguments; only shortened spaces send ``dimensions``"""
+        return {} if self.native else {"dimensions": self.dimensions}
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, EmbeddingSpace) and self.key == other.key
+
+    def __hash__(self) -> int:
+        return hash(self.key)
+
+    def __repr__(self) -> str:
+        return f"EmbeddingSpace({self.key!r})"
@@ -0,0 +1,107 @@
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional
+import asyncio
+import time
+
+from user_research_platform import UserResearchPlatform
+
+
+class IngestionJob:
+    """Background extract -> chunk -> embed -> index pipeline for one session's product document.
+
+    The job owns its asyncio task so the request that started it can return right away;
+    clients poll ``to_dict`` through the status endpoint.
+    """
+
+    # Share of the overall progress at which each stage starts
+    STAGE_PROGRESS = {
+        "queued": 0.0,
+        "extracting": 0.05,
+        "chunking": 0.05,
+        "embedding": 0.2,
+        "indexing": 0.9,
+        "generating_question": 0.95,
+        "ready": 1.0,
+        "failed": 1.0,
+    }
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.stage = "queued"
+        self.chunks_total = 0
+        self.chunks_embedded = 0
+        self.error = None
+        self.question = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def done(self) -> bool:
+        return self.stage in ("ready", "failed")
+
+    @property
+    def progress(self) -> float:
+        if self.stage in ("extracting", "embedding") and self.chunks_total:
+            start, end = self.STAGE_PROGRESS["embedding"], self.STAGE_PROGRESS["indexing"]
+            return start + (end - start) * self.chunks_embedded / self.chunks_total
+        return self.STAGE_PROGRESS[self.stage]
+
+    def _on_progress(self, stage: str, done: int, total: int):
+        self.stage = stage
+        if total:
+            self.chunks_total = total
+            self.chunks_embedded = done
+
+    def start(self, platform: UserResearchPlatform, pages: AsyncIterator[str],
+              product_context: Optional[str] = None, generate_question: bool = False,
+              on_finished: Optional[Callable[[], Awaitable[None]]] = None):
+        """Schedule the pipeline on the running event loop"""
+        self._task = asyncio.get_running_loop().create_task(
+            self.run(platform, pages, product_context, generate_question, on_finished)
+        )
+
+    async def run(self, platform: UserResearchPlatform, pages: AsyncIterator[str],
+                  product_context: Optional[str] = None, generate_question: bool = False,
+                  on_finished: Optional[Callable[[], Awaitable[None]]] = None):
+        try:
+            # Chunking and embedding start on the first pages while the rest are still being parsed
+            await platform.set_product_context_from_pages_async(pages, progress=self._on_progress)
+
+            if product_context:
+                await platform.set_product_context_async(product_context)
+
+            if generate_question:
+                self.stage = "generating_question"
+                self.question = await platform.generate_next_question_async()
+                if not self.question:
+                    raise ValueError("Failed to generate question")
+
+            self.stage = "ready"
+        except Exception as e:
+            print(f"Ingestion failed for {self.session_id}: {e}")
+            self.error = str(e)
+            self.stage = "failed"
+        finally:
+            self.finished_at = time.time()
+
+        if on_finished:
+            try:
+                await on_finished()
+            except Exception as e:
+                print(f"Error finishing ingestion for {self.session_id}: {e}")
+
+    async def wait(self):
+        """Wait for the pipeline to finish without cancelling it if the waiter goes away"""
+        if self._task:
+            await asyncio.shield(self._task)
+
+    def to_dict(self) -> Dict:
+        return {
+            "session_id": self.session_id,
+            "stage": self.stage,
+            "progress": round(self.progress, 3),
+            "chunks_total": self.chunks_total,
+            "chunks_embedded": self.chunks_embedded,
+            "question": self.question,
+            "error": self.error,
+        }
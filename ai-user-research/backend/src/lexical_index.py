@@ -0,0 +1,100 @@
+from collections import Counter
+from typing import Dict, Iterable, List, Sequence
+import math
+import re
+
+import numpy as np
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("""
+a about above after again all am an and any are as at be because been before being below between
+both but by can could did do does doing down during each few for from further had has have having
+he her here hers him his how i if in into is it its itself just me more most my no nor not now of
+off on once only or other our ours out over own same she should so some such than that the their
+theirs them then there these they this those through to too under until up very was we were what
+when where which while who whom why will with would you your yours q
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased alphanumeric terms without stopwords"""
+    return [term for term in _TOKEN_PATTERN.findall(text.lower()) if term not in STOPWORDS]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], top_k: int, k: int = 60) -> List[int]:
+    """Merge best-first rankings; each list contributes ``1 / (k + rank)`` per item"""
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=lambda item: -scores[item])[:top_k]
+
+
+class LexicalIndex:
+    """Okapi BM25 over document chunks with an in-memory inverted index.
+
+    Chunks can be added incrementally as a document streams in; postings are packed into
+    numpy arrays on the first search after a change, so a query costs one vectorized
+    update per matching term and needs no network call.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, List[List[int]]] = {}  # term -> [chunk ids, term frequencies]
+        self._lengths: List[int] = []
+        self._packed: Dict[str, tuple] = {}
+        self._length_norm = None
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def add(self, chunks: Iterable[str]):
+        for chunk in chunks:
+            chunk_id = len(self._lengths)
+            terms = tokenize(chunk)
+            self._lengths.append(len(terms))
+            for term, count in Counter(terms).items():
+                postings = self._postings.setdefault(term, [[], []])
+                postings[0].append(chunk_id)
+                postings[1].append(count)
+            self._dirty = True
+
+    def _pack(self):
+        self._packed = {
+            term: (np.array(ids, dtype=np.int32), np.array(counts, dtype=np.float32))
+            for term, (ids, counts) in self._postings.items()
+        }
+        lengths = np.array(self._lengths, dtype=np.float32)
+        average_length = max(float(lengths.mean()), 1.0) if len(lengths) else 1.0
+        self._length_norm = self.k1 * (1 - self.b + self.b * lengths / average_length)
+        self._dirty = False
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every chunk for ``query``; repeated query terms count once"""
+        if self._dirty:
+            self._pack()
+        count = len(self._lengths)
+        scores = np.zeros(count, dtype=np.float32)
+        if not count:
+            return scores
+
+        for term in set(tokenize(query)):
+            packed = self._packed.get(term)
+            if packed is None:
+                continue
+            ids, frequencies = packed
+            idf = math.log(1 + (count - len(ids) + 0.5) / (len(ids) + 0.5))
+            scores[ids] += idf * frequencies * (self.k1 + 1) / (frequencies + self._length_norm[ids])
+        return scores
+
+    def search(self, query: str, top_k: int) -> List[int]:
+        """Row indices of the ``top_k`` best-scoring chunks that share a term with ``query``, best first"""
+        scores = self.scores(query)
+        matched = np.flatnonzero(scores > 0)
+        if not len(matched) or top_k <= 0:
+            return []
+        if len(matched) > top_k:
+            matched = matched[np.argpartition(-scores[matched], top_k - 1)[:top_k]]
+        return matched[np.argsort(-scores[matched], kind="stable")].tolist()
@@ -2,21 +2,34 @@ from fastapi import FastAPI, HTTPException, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Optional, Dict
+from datetime import datetime
 from user_research_platform import UserResearchPlatform
 import os
 from dotenv import load_dotenv
-from fastapi.responses import JSONResponse
-from document_processor import DocumentProcessor  # Updated import
-from PyPDF2 import PdfReader
-from docx import Document
-from pptx import Presentation
-import markdown
-import io  # Add this import
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from document_processor import DocumentProcessor
+from ingestion import IngestionJob
+from session_store import SessionStore, new_session_id
+from corpus_synthesis import CorpusSynthesis, checkpoint_path
+from openai_scheduler import get_scheduler
+from model_router import ModelRouter
+from metrics import PREFIX, REGISTRY
+from document_extraction import extract_text_from_document, is_supported_format, stream_document_pages, \
+    SUPPORTED_FORMATS
+import json
+import asyncio
+import logging
+import tempfile
 
 load_dotenv()
+# Platform errors and progress go through module loggers; LOG_LEVEL=WARNING keeps only problems
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+# The SDK's HTTP client logs every API request at INFO
+for http_logger in ("httpx", "httpx2"):
+    logging.getLogger(http_logger).setLevel(logging.WARNING)
 
 app = FastAPI()
-document_processor = DocumentProcessor()  # Add this line
+document_processor = DocumentProcessor()
 
 
 app.add_middleware(
@@ -32,7 +45,7 @@ class ProjectInfo(BaseModel):
     project_name: str
     goal: str
     target_audience: str
-    api_key: Optional[str] = None  # Add this line
+    api_key: Optional[str] = None
     improvement_objective: Optional[str] = None
 
 
@@ -41,61 +54,190 @@ class ResponseModel(BaseModel):
     response: str
 
 
-research_sessions = {}
+class SynthesisRequest(BaseModel):
+    project_name: Optional[str] = None
+    workers: int = 4
 
 
-def extract_text_from_document(file_content: bytes, file_type: str) -> str:
-    """Extract text from various document formats"""
-    print(f"Processing file type: {file_type}")  # Debug log
+# Uploads are streamed to disk in blocks and rejected past this size
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 50 * 1024 * 1024))
+UPLOAD_BLOCK_BYTES = 1024 * 1024
 
-    # Normalize file type to lowercase and remove any leading dots
-    file_type = file_type.lower().strip('.')
+ingestion_jobs: Dict[str, IngestionJob] = {}
 
+# Directories holding interview_*.json files saved before the results store, searched by /api/synthesize
+INTERVIEW_CORPUS_DIRS = os.getenv("INTERVIEW_CORPUS_DIRS", os.pathsep.join([".", os.path.join("backend", "data")]))
+synthesis_jobs: Dict[str, Dict] = {}
+
+# Per-task model overrides as JSON; every task defaults to gpt-4 with no fallback. E.g.
+# {"question": {"fallback": "gpt-4o-mini", "deadline": 8}, "elaboration": {"model": "template"}}
+# races gpt-4o-mini in after 8 s and answers elaborations locally from templates
+model_router = ModelRouter(json.loads(os.getenv("MODEL_ROUTES", "{}")))
+
+
+def new_platform(api_key: str) -> UserResearchPlatform:
+    platform = UserResearchPlatform(api_key, embeddings_cache=document_processor.embeddings_cache,
+                                    summary_cache=document_processor.summary_cache,
+                                    completion_cache=document_processor.completion_cache, router=model_router)
+    platform.analysis_mode = os.getenv("ANALYSIS_MODE", "auto")
+    platform.embedding_storage_dtype = os.getenv("EMBEDDING_STORAGE_DTYPE", "float32")
+    platform.embedding_model = os.getenv("EMBEDDING_MODEL", platform.embedding_model)
+    if os.getenv("EMBEDDING_DIMENSIONS"):
+        platform.embedding_dimensions = int(os.getenv("EMBEDDING_DIMENSIONS"))
+    # Fail fast on an unknown model or a dimension it cannot produce
+    platform.embedding_space
+    platform.retrieval_mode = os.getenv("RETRIEVAL_MODE", "dense")
+    return platform
+
+
+# Live sessions are capped in memory and snapshotted to SQLite, so evicted or idle sessions
+# come back on their next request and any worker sharing the results directory can serve them
+research_sessions = SessionStore(
+    os.path.join(document_processor.results_dir, "sessions.sqlite3"),
+    create_platform=lambda: new_platform(os.getenv("OPENAI_API_KEY")),
+    max_sessions=int(os.getenv("SESSION_CACHE_MAX", 200)),
+    max_bytes=int(os.getenv("SESSION_CACHE_MAX_BYTES", 1024 * 1024 * 1024)),
+    idle_ttl=float(os.getenv("SESSION_IDLE_TTL", 30 * 60))
+)
+
+
+def collect_metrics():
+    """Scrape-time samples from the components that keep their own counts"""
+    usage = get_scheduler().stats()
+    for kind in ("prompt", "cached", "completion"):
+        yield (f"{PREFIX}_openai_tokens_total", "counter",
+               "Chat completion tokens reported by OpenAI; kind=cached is the part of the prompt served from cache",
+               {"kind": kind}, usage[f"{kind}_tokens"])
+    yield (f"{PREFIX}_openai_cached_token_ratio", "gauge", "Share of prompt tokens served from the prompt cache",
+           {}, usage["cached_token_ratio"])
+    yield (f"{PREFIX}_rate_limit_tokens_available", "gauge", "Tokens left in the scheduler's TPM bucket",
+           {}, usage["tokens_available"])
+    cache = document_processor.embeddings_cache
+    for result, count in (("hit", cache.hits), ("miss", cache.misses)):
+        yield (f"{PREFIX}_embedding_cache_lookups_total", "counter", "Embedding cache lookups by result",
+               {"result": result}, count)
+    completions = document_processor.completion_cache
+    for result, count in (("memory_hit", completions.memory_hits), ("disk_hit", completions.disk_hits),
+                          ("miss", completions.misses)):
+        yield (f"{PREFIX}_completion_cache_lookups_total", "counter", "Completion cache lookups by result",
+               {"result": result}, count)
+    sessions = research_sessions.stats()
+    yield f"{PREFIX}_sessions_in_memory", "gauge", "Live sessions held in memory", {}, sessions["in_memory"]
+    yield (f"{PREFIX}_session_memory_bytes", "gauge", "Approximate memory held by live sessions",
+           {}, sessions["memory_bytes"])
+    yield (f"{PREFIX}_results_queued", "gauge", "Results waiting for the background writer",
+           {}, document_processor.results_store.stats()["queued"])
+
+
+REGISTRY.register_collector(collect_metrics)
+
+
+async def load_session(session_id: str) -> Optional[UserResearchPlatform]:
+    """Look the session up off the event loop; rehydrating it reads and decompresses its snapshot"""
+    return await asyncio.to_thread(research_sessions.get, session_id)
+
+
+async def delete_session(session_id: str):
+    await asyncio.to_thread(research_sessions.__delitem__, session_id)
+
+
+async def save_session(session_id: str, platform: UserResearchPlatform):
+    """Snapshot the session on the event loop, where ingestion also changes it, and write it off the loop"""
+    snapshot = platform.to_snapshot()
+    await asyncio.to_thread(research_sessions.save, session_id, platform, snapshot=snapshot)
+
+
+async def spool_upload(upload: UploadFile, suffix: str = "") -> str:
+    """Stream an upload to a temporary file block by block and return its path.
+
+    Memory use stays at one block regardless of the document size. Raises a 413 once the
+    upload exceeds MAX_UPLOAD_BYTES; the caller owns (and must remove) the file otherwise.
+    """
+    fd, path = tempfile.mkstemp(prefix="upload_", suffix=suffix)
+    size = 0
     try:
-        if file_type.endswith('pdf'):
-            print("Processing as PDF")  # Debug log
-            pdf_reader = PdfReader(io.BytesIO(file_content))
-            text_content = ""
-            for page in pdf_reader.pages:
-                text_content += page.extract_text() + "\n"
-            return text_content
-
-        elif file_type.endswith('docx'):
-            print("Processing as DOCX")  # Debug log
-            doc = Document(io.BytesIO(file_content))
-            text_content = "\n".join([paragraph.text for paragraph in doc.paragraphs])
-            return text_content
-
-        elif file_type.endswith('pptx'):
-            print("Processing as PPTX")  # Debug log
-            prs = Presentation(io.BytesIO(file_content))
-            text_content = ""
-            for slide in prs.slides:
-                for shape in slide.shapes:
-                    if hasattr(shape, "text"):
-                        text_content += shape.text + "\n"
-            return text_content
-
-        elif file_type.endswith('md'):
-            print("Processing as Markdown")  # Debug log
-            text_content = file_content.decode('utf-8')
-            html = markdown.markdown(text_content)
-            from bs4 import BeautifulSoup
-            text = BeautifulSoup(html, 'html.parser').get_text()
-            return text
-
-        elif file_type.endswith('txt'):
-            print("Processing as TXT")  # Debug log
-            return file_content.decode('utf-8')
-
-        else:
-            supported_formats = ['.pdf', '.docx', '.pptx', '.md', '.txt']
-            raise ValueError(
-                f"Unsupported file type: {file_type}. Supported formats are: {', '.join(supported_formats)}")
+        with os.fdopen(fd, "wb") as f:
+            while True:
+                block = await upload.read(UPLOAD_BLOCK_BYTES)
+                if not block:
+                    break
+                size += len(block)
+                if size > MAX_UPLOAD_BYTES:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"Document is larger than the {MAX_UPLOAD_BYTES // (1024 * 1024)} MB upload limit"
+                    )
+                await asyncio.to_thread(f.write, block)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+
+async def create_platform(
+        session_id: str,
+        api_key: str,
+        project_name: str,
+        target_audience: str,
+        goal: str,
+        improvement_objective: Optional[str],
+        product_doc: Optional[UploadFile],
+        product_name: Optional[str],
+        product_context: Optional[str],
+        question_in_background: bool = True
+) -> UserResearchPlatform:
+    """Create a research session and start ingesting its product documentation in the background.
+
+    For diagnostic sessions with a document the first question depends on the document,
+    so the ingestion job generates it when ``question_in_background`` is set.
+    """
+    platform = new_platform(api_key)
+    platform.project_info = {
+         "project_name": project_name,
+        "goal": goal,
+        "target_audience": target_audience,
+        "improvement_objective": improvement_objective if improvement_objective else "",
+        "research_objective": improvement_objective if improvement_objective else "",
+        "product_name": product_name,
+        "product_context": product_context
+    }
+
+    # Process the document if provided
+    if product_doc:
+        # Get file extension
+        file_extension = product_doc.filename.split('.')[-1] if '.' in product_doc.filename else ''
+        if not file_extension:
+            raise HTTPException(status_code=400, detail="Document processing error: File has no extension")
+        if not is_supported_format(file_extension):
+            raise HTTPException(
+                status_code=400,
+                detail=f"Document processing error: Unsupported file type: {file_extension}. "
+                       f"Supported formats are: {', '.join(SUPPORTED_FORMATS)}"
+            )
 
-    except Exception as e:
-        print(f"Error processing file: {str(e)}")  # Debug log
-        raise ValueError(f"Error processing {file_type} file: {str(e)}")
+        document_path = await spool_upload(product_doc, suffix=f".{file_extension}")
+        job = IngestionJob(session_id)
+
+        async def on_finished():
+            # Persist the outcome so status polls served by other workers see it, keeping turns
+            # those workers recorded meanwhile; the platform only changes here, on the loop
+            state = await asyncio.to_thread(research_sessions.newer_state, session_id)
+            if state is not None:
+                platform.restore_snapshot(dict(state, document_version=platform.document_version))
+            platform.ingestion_status = job.to_dict()
+            await save_session(session_id, platform)
+
+        job.start(
+            platform,
+            stream_document_pages(document_path, file_extension, delete_after=True),
+            product_context if goal == "diagnostic" else None,
+            generate_question=goal == "diagnostic" and question_in_background,
+            on_finished=on_finished
+        )
+        ingestion_jobs[session_id] = job
+        platform.ingestion_status = job.to_dict()
+
+    return platform
 
 
 @app.post("/api/start-project")
@@ -108,79 +250,148 @@ async def start_project(
         product_name: Optional[str] = Form(None),
         product_context: Optional[str] = Form(None)
 ):
+    """Start a session. With a diagnostic document this returns before the first question
+    exists; poll /api/project-status/{session_id} until it is ``ready``."""
     try:
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise HTTPException(status_code=500, detail="OpenAI API key not found")
 
-        platform = UserResearchPlatform(api_key)
-        platform.project_info = {
-             "project_name": project_name,
-            "goal": goal,
-            "target_audience": target_audience,
-            "improvement_objective": improvement_objective if improvement_objective else "",
-            "research_objective": improvement_objective if improvement_objective else "" , # Add this line
-            "product_name": product_name,
-            "product_context": product_context
-        }
+        session_id = new_session_id(project_name)
+        platform = await create_platform(session_id, api_key, project_name, target_audience, goal,
+                                         improvement_objective, product_doc, product_name, product_context)
+        job = ingestion_jobs.get(session_id)
 
-        # Process the document if provided
-        if product_doc:
-            print(f"Received file: {product_doc.filename}")  # Debug log
-            contents = await product_doc.read()
-            try:
-                # Get file extension
-                file_extension = product_doc.filename.split('.')[-1] if '.' in product_doc.filename else ''
-                if not file_extension:
-                    raise ValueError("File has no extension")
-
-                # Extract text from the document
-                text_content = extract_text_from_document(contents, file_extension)
-
-                if not text_content.strip():
-                    raise ValueError("No text content could be extracted from the document")
-
-                # Set product context with the extracted text
-                success = platform.set_product_context(text_content)
-                if not success:
-                    raise ValueError("Failed to process document context")
-
-            except ValueError as e:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Document processing error: {str(e)}"
-                )
-            except Exception as e:
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"Server error processing document: {str(e)}"
-                )
-
-            if goal == "diagnostic" and product_context:
-                platform.set_product_context(product_context)
-
-        question = platform.generate_next_question()
+        if job and goal == "diagnostic":
+            await save_session(session_id, platform)
+            return {
+                "session_id": session_id,
+                "status": job.stage,
+                "question": None,
+                "api_key": api_key
+            }
+
+        # Discovery questions don't use the document, so ingestion carries on in the background
+        question = await platform.generate_next_question_async()
         if not question:
+            ingestion_jobs.pop(session_id, None)
             raise HTTPException(status_code=500, detail="Failed to generate question")
 
-        session_id = f"{project_name.lower().replace(' ', '_')}_{len(research_sessions)}"
-        research_sessions[session_id] = platform
+        await save_session(session_id, platform)
 
         return {
             "session_id": session_id,
+            "status": "ready",
             "question": question,
             "api_key": api_key
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-# Add new endpoint for document upload
+@app.get("/api/project-status/{session_id}")
+async def project_status(session_id: str):
+    """Progress of a session's document ingestion, plus the first question once it is ready"""
+    platform = await load_session(session_id)
+    if not platform:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    job = ingestion_jobs.get(session_id)
+    if job:
+        status = job.to_dict()
+    elif platform.ingestion_status:
+        # Ingested (or still ingesting) on another worker
+        status = dict(platform.ingestion_status)
+    else:
+        return {
+            "session_id": session_id,
+            "stage": "ready",
+            "progress": 1.0,
+            "question": platform.current_question,
+            "error": None
+        }
+    status["question"] = status["question"] or (
+        platform.current_question if status["stage"] in ("ready", "failed") else None)
+    return status
+
+
+def sse_event(event: str, data: Dict) -> str:
+    """Format one server-sent event; payloads are JSON so newlines in tokens are safe"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def sse_response(events) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/api/start-project/stream")
+async def start_project_stream(
+        project_name: str = Form(...),
+        target_audience: str = Form(...),
+        goal: str = Form(...),
+        improvement_objective: Optional[str] = Form(None),
+        product_doc: Optional[UploadFile] = None,
+        product_name: Optional[str] = Form(None),
+        product_context: Optional[str] = Form(None)
+):
+    """Streaming variant of /api/start-project: emits `session`, `progress` while a diagnostic
+    document is ingested, then `token` events, then `done`"""
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise HTTPException(status_code=500, detail="OpenAI API key not found")
+
+    session_id = new_session_id(project_name)
+    try:
+        platform = await create_platform(session_id, api_key, project_name, target_audience, goal,
+                                         improvement_objective, product_doc, product_name, product_context,
+                                         question_in_background=False)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    await save_session(session_id, platform)
+    job = ingestion_jobs.get(session_id)
+
+    async def events():
+        yield sse_event("session", {"session_id": session_id, "api_key": api_key})
+        if job and goal == "diagnostic":
+            while not job.done:
+                yield sse_event("progress", job.to_dict())
+                try:
+                    await asyncio.wait_for(job.wait(), timeout=0.5)
+                except asyncio.TimeoutError:
+                    pass
+            if job.error:
+                yield sse_event("error", {"detail": f"Document processing error: {job.error}"})
+                return
+        try:
+            async for token in platform.stream_next_question_async():
+                yield sse_event("token", {"text": token})
+        except Exception as e:
+            await delete_session(session_id)
+            yield sse_event("error", {"detail": f"Failed to generate question: {e}"})
+            return
+        await save_session(session_id, platform)
+        yield sse_event("done", {"session_id": session_id, "question": platform.current_question})
+
+    return sse_response(events())
+
+
 @app.post("/api/upload-document")
 async def upload_document(file: UploadFile = File(...)):
     try:
-        content = await file.read()
-        content_str = content.decode()
+        path = await spool_upload(file)
+        try:
+            content_str = await asyncio.to_thread(extract_text_from_document, path, "txt")
+        finally:
+            os.remove(path)
 
         # Process the document based on its content type
         result = document_processor.process_document(
@@ -195,54 +406,80 @@ async def upload_document(file: UploadFile = File(...)):
             "message": "Document processed successfully",
             "result": result
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def finish_turn(session_id: str, platform: UserResearchPlatform, next_question: str) -> Dict:
+    """Turn the generated next question into the submit-response payload"""
+    if next_question == "RESCHEDULE":
+        await save_session(session_id, platform)
+        return {
+            "status": "reschedule",
+            "question": "I notice we might not be getting detailed responses. Would you prefer to continue this conversation at a better time?"
+        }
+
+    if next_question == "END_INTERVIEW":
+        analysis = await platform.analyze_interview_async(platform.conversation_history)
+        analysis["result_id"] = platform.save_results(analysis, document_processor.results_store, session_id)
+        await delete_session(session_id)
+        ingestion_jobs.pop(session_id, None)
+        return {
+            "status": "ended",
+            "analysis": analysis,
+            "message": "Interview ended"
+        }
+
+    await save_session(session_id, platform)
+    return {
+        "status": "continue",
+        "question": next_question,
+        "can_finish": len(platform.conversation_history) >= 2
+    }
+
+
 # main.py
 @app.post("/api/submit-response/{session_id}")
 async def submit_response(session_id: str, response: ResponseModel):
     try:
-        platform = research_sessions.get(session_id)
+        platform = await load_session(session_id)
         if not platform:
             raise HTTPException(status_code=404, detail="Session not found")
 
-        platform.conversation_history.append({
-            "question": platform.current_question,
-            "response": response.response
-        })
+        platform.record_response(response.response)
+
+        next_question = await platform.generate_next_question_async()
+        return await finish_turn(session_id, platform, next_question)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        next_question = platform.generate_next_question()
 
-        if next_question == "RESCHEDULE":
-            return {
-                "status": "reschedule",
-                "question": "I notice we might not be getting detailed responses. Would you prefer to continue this conversation at a better time?"
-            }
+@app.post("/api/submit-response/{session_id}/stream")
+async def submit_response_stream(session_id: str, response: ResponseModel):
+    """Streaming variant of /api/submit-response: emits `token` events, then `done` with the usual payload"""
+    platform = await load_session(session_id)
+    if not platform:
+        raise HTTPException(status_code=404, detail="Session not found")
 
-        if next_question == "END_INTERVIEW":
-            analysis = platform.analyze_interview(platform.conversation_history)
-            platform.save_results(analysis)
-            del research_sessions[session_id]
-            return {
-                "status": "ended",
-                "analysis": analysis,
-                "message": "Interview ended"
-            }
+    platform.record_response(response.response)
 
-        return {
-            "status": "continue",
-            "question": next_question,
-            "can_finish": len(platform.conversation_history) >= 2
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    async def events():
+        try:
+            async for token in platform.stream_next_question_async():
+                yield sse_event("token", {"text": token})
+            yield sse_event("done", await finish_turn(session_id, platform, platform.current_question))
+        except Exception as e:
+            yield sse_event("error", {"detail": str(e)})
+
+    return sse_response(events())
 
 
 @app.post("/api/analyze/{session_id}")
 async def analyze_interview(session_id: str):
     try:
-        platform = research_sessions.get(session_id)
+        platform = await load_session(session_id)
         if not platform:
             return JSONResponse(
                 status_code=404,
@@ -258,14 +495,13 @@ async def analyze_interview(session_id: str):
 
 
 
-        analysis = platform.analyze_interview(platform.conversation_history)
-        filepath = document_processor.save_results(analysis)
-        print(f"Analysis saved to: {filepath}")
-
-      ### platform.save_results(analysis)
-
-        # Save analysis results using document processor
-
+        analysis = await platform.analyze_interview_async(platform.conversation_history)
+        if not analysis.get("cached"):
+            analysis["result_id"] = document_processor.save_results(analysis, session_id, platform.project_info)
+            if platform.last_analysis and platform.last_analysis["analysis"] == analysis["analysis"]:
+                # Persist the analysis with the session so any worker can answer a repeat call
+                platform.last_analysis["result_id"] = analysis["result_id"]
+                await save_session(session_id, platform)
 
         # Don't delete the session immediately
         # research_sessions[session_id] = platform
@@ -278,6 +514,107 @@ async def analyze_interview(session_id: str):
         )
 
 
+@app.get("/api/results")
+async def list_results(
+        project_name: Optional[str] = None,
+        goal: Optional[str] = None,
+        target_audience: Optional[str] = None,
+        kind: Optional[str] = None,
+        session_id: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        limit: int = 50,
+        offset: int = 0
+):
+    """Saved interviews and analyses, newest first, filtered by any of the query parameters"""
+    results = await asyncio.to_thread(
+        document_processor.results_store.query, kind=kind, session_id=session_id, project_name=project_name,
+        goal=goal, target_audience=target_audience, since=since, until=until,
+        limit=max(1, min(limit, 500)), offset=max(0, offset)
+    )
+    return {"results": results}
+
+
+@app.get("/api/results/{result_id}")
+async def get_result(result_id: str):
+    result = await asyncio.to_thread(document_processor.results_store.get, result_id)
+    if not result:
+        raise HTTPException(status_code=404, detail="Result not found")
+    return result
+
+
+@app.get("/api/usage")
+async def usage():
+    """OpenAI rate-limit headroom and token totals, including the share of prompt tokens served from cache"""
+    return get_scheduler().stats()
+
+
+@app.get("/metrics")
+async def metrics():
+    """Stage latencies, token counts and cache hit rates in the Prometheus text format"""
+    return PlainTextResponse(await asyncio.to_thread(REGISTRY.render), media_type="text/plain; version=0.0.4")
+
+
+@app.on_event("shutdown")
+def close_results_store():
+    """Write out results still queued for the background writer"""
+    document_processor.results_store.close()
+    model_router.close()
+
+
+@app.post("/api/synthesize")
+async def synthesize_corpus(request: SynthesisRequest):
+    """Start (or resume from its checkpoint) a cross-interview synthesis over the saved interviews.
+
+    Returns right away; poll /api/synthesize/{job_id} for progress and the result.
+    """
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise HTTPException(status_code=500, detail="OpenAI API key not found")
+
+    corpus_dirs = INTERVIEW_CORPUS_DIRS.split(os.pathsep)
+    path = checkpoint_path(request.project_name, document_processor.results_dir,
+                           sources=corpus_dirs + [document_processor.results_store.path])
+    job_id = os.path.splitext(os.path.basename(path))[0]
+    job = synthesis_jobs.get(job_id)
+    if job and job["status"] == "running":
+        return synthesis_status_payload(job_id)
+
+    synthesis = CorpusSynthesis(api_key, path, workers=max(1, min(request.workers, 16)),
+                                project_name=request.project_name)
+    job = {"status": "running", "synthesis": synthesis, "result": None, "error": None}
+    synthesis_jobs[job_id] = job
+
+    async def run():
+        try:
+            job["result"] = await synthesis.run(corpus_dirs, store=document_processor.results_store)
+            job["status"] = "done"
+        except Exception as e:
+            print(f"Corpus synthesis failed: {e}")
+            job["status"], job["error"] = "failed", str(e)
+
+    job["task"] = asyncio.get_running_loop().create_task(run())
+    return synthesis_status_payload(job_id)
+
+
+def synthesis_status_payload(job_id: str) -> Dict:
+    job = synthesis_jobs[job_id]
+    return {
+        "job_id": job_id,
+        "status": job["status"],
+        **job["synthesis"].status(),
+        "result": job["result"],
+        "error": job["error"]
+    }
+
+
+@app.get("/api/synthesize/{job_id}")
+async def synthesis_status(job_id: str):
+    if job_id not in synthesis_jobs:
+        raise HTTPException(status_code=404, detail="Synthesis job not found")
+    return synthesis_status_payload(job_id)
+
+
 if __name__ == "__main__":
     import uvicorn
 
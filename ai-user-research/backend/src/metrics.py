@@ -0,0 +1,143 @@
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Tuple
+import functools
+import os
+import random
+import threading
+import time
+
+PREFIX = "user_research"
+# Seconds; spans range from sub-millisecond lookups to multi-second model calls
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+STAGE_HELP = ("Duration of hot-path stages: extract, chunk, embed, retrieve, prompt_build, llm_call "
+              "(to the response, or to the first byte when streamed) and analysis")
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict) -> Labels:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(labels: Labels, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class MetricsRegistry:
+    """Counters and latency histograms kept in process, rendered in the Prometheus text format.
+
+    Recording is a dict update under a lock, cheap enough for every request. Values owned
+    by other components (cache hit counts, scheduler token totals) are read at scrape time
+    through registered collectors instead of being mirrored on every change.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help: Dict[str, Tuple[str, str]] = {}  # name -> (type, help)
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, List[float]]] = {}  # bucket counts..., sum, count
+        self._collectors: List[Callable[[], Iterator[Tuple[str, str, str, Dict, float]]]] = []
+
+    def describe(self, name: str, kind: str, help_text: str):
+        self._help.setdefault(name, (kind, help_text))
+
+    def inc(self, name: str, value: float = 1.0, help_text: str = "", **labels):
+        self.describe(name, "counter", help_text)
+        key = _labels(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, seconds: float, help_text: str = "", **labels):
+        self.describe(name, "histogram", help_text)
+        key = _labels(labels)
+        with self._lock:
+            values = self._histograms.setdefault(name, {}).setdefault(key, [0.0] * (len(BUCKETS) + 2))
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    values[i] += 1
+            values[-2] += seconds
+            values[-1] += 1
+
+    def observe_stage(self, stage: str, seconds: float, **labels):
+        self.observe(f"{PREFIX}_stage_duration_seconds", seconds, STAGE_HELP, stage=stage, **labels)
+
+    @contextmanager
+    def span(self, stage: str, **labels):
+        """Time the enclosed block as one ``stage`` observation (failures are labelled ``error``)"""
+        start = time.perf_counter()
+        outcome = "ok"
+        try:
+            yield
+        except BaseException:
+            outcome = "error"
+            raise
+        finally:
+            self.observe_stage(stage, time.perf_counter() - start, outcome=outcome, **labels)
+
+    def register_collector(self, collector: Callable[[], Iterator[Tuple[str, str, str, Dict, float]]]):
+        """Add a callable yielding ``(name, type, help, labels, value)`` samples at scrape time"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            histograms = {name: {key: list(values) for key, values in series.items()}
+                          for name, series in self._histograms.items()}
+
+        collected: Dict[str, List[Tuple[Labels, float]]] = {}
+        for collector in self._collectors:
+            try:
+                for name, kind, help_text, labels, value in collector():
+                    self.describe(name, kind, help_text)
+                    collected.setdefault(name, []).append((_labels(labels), value))
+            except Exception as e:
+                print(f"Error collecting metrics: {e}")
+
+        for name in sorted(set(counters) | set(histograms) | set(collected)):
+            kind, help_text = self._help[name]
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key, value in sorted(counters.get(name, {}).items()):
+                lines.append(f"{name}{_format_labels(key)} {value:g}")
+            for key, value in collected.get(name, []):
+                lines.append(f"{name}{_format_labels(key)} {value:g}")
+            for key, values in sorted(histograms.get(name, {}).items()):
+                for bound, count in zip(BUCKETS, values):
+                    lines.append(f"{name}_bucket{_format_labels(key, (('le', f'{bound:g}'),))} {count:g}")
+                lines.append(f"{name}_bucket{_format_labels(key, (('le', '+Inf'),))} {values[-1]:g}")
+                lines.append(f"{name}_sum{_format_labels(key)} {values[-2]:.6f}")
+                lines.append(f"{name}_count{_format_labels(key)} {values[-1]:g}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+span = REGISTRY.span
+
+
+def timed(stage: str, **labels):
+    """Decorator form of ``span`` for synchronous functions"""
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(stage, **labels):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def log_prompt(kind: str, messages: List[Dict]):
+    """Print a sampled share of outgoing prompts; off unless PROMPT_LOG_SAMPLE_RATE is set (0-1)"""
+    rate = float(os.getenv("PROMPT_LOG_SAMPLE_RATE", 0))
+    if rate <= 0 or random.random() >= rate:
+        return
+    print(f"\n=== {kind} prompt ===")
+    for message in messages:
+        print(f"[{message['role']}]\n{message['content']}")
+    print("=================\n")
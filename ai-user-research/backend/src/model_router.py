@@ -0,0 +1,146 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Awaitable, Callable, Dict, Optional
+import asyncio
+import hashlib
+
+from metrics import PREFIX, REGISTRY
+
+# Task types the platform routes: a follow-up to a short answer, the opening question,
+# every later question, and the interview analysis
+TASKS = ("elaboration", "first_question", "question", "analysis")
+
+# Route "model" for answering without any request, from the templates below
+TEMPLATE = "template"
+
+# Follow-ups that quote a short answer back, and plain ones for one-word answers ("no", "sometimes")
+ELABORATION_TEMPLATES = (
+    'You said "{answer}". Could you tell me a bit more about that, maybe with a specific example?',
+    'Thanks for that. When you say "{answer}", what does that look like for you day to day?',
+    'Interesting, "{answer}". Could you walk me through the last time that came up?',
+)
+GENERIC_ELABORATIONS = (
+    "I'd love to hear more about that. Could you share a specific example?",
+    "Could you tell me a bit more about that? What happened the last time it came up?",
+    "Thanks. What makes you say that? A recent example would really help.",
+)
+
+
+def template_elaboration(answer: str) -> str:
+    """A follow-up to a short answer; the same answer always gets the same template"""
+    answer = " ".join(answer.split()).strip(" .!?,;:\"'").replace('"', "'")
+    templates = ELABORATION_TEMPLATES if len(answer.split()) > 1 else GENERIC_ELABORATIONS
+    index = int(hashlib.sha1(answer.lower().encode("utf-8")).hexdigest(), 16) % len(templates)
+    return templates[index].format(answer=answer)
+
+
+class Route:
+    """Model for one task type, with an optional faster model raced in once ``deadline`` seconds pass"""
+
+    def __init__(self, model: str, fallback: Optional[str] = None, deadline: Optional[float] = None):
+        self.model = model
+        self.fallback = fallback
+        self.deadline = deadline
+
+    def to_dict(self) -> Dict:
+        return {"model": self.model, "fallback": self.fallback, "deadline": self.deadline}
+
+
+# Every task on the baseline model with no fallback; templated elaborations and cheaper
+# fallback models are opt-in through overrides
+DEFAULT_ROUTES = {task: Route("gpt-4") for task in TASKS}
+
+
+class ModelRouter:
+    """Picks the model for each task type and enforces its latency budget.
+
+    ``overrides`` maps task types to ``{"model", "fallback", "deadline"}`` dicts (missing
+    keys keep the default), e.g. from the MODEL_ROUTES environment variable. When the
+    primary model has not answered by the deadline, the fallback model is called as well
+    and whichever answers first is used; the slower request is cancelled (async) or its
+    answer discarded (sync). A failing primary hands over to the fallback straight away.
+    Cancelling an async caller cancels its requests too. ``close`` stops the threads the
+    sync path races requests on.
+    """
+
+    def __init__(self, overrides: Optional[Dict[str, Dict]] = None):
+        self.routes = {task: Route(**route.to_dict()) for task, route in DEFAULT_ROUTES.items()}
+        for task, override in (overrides or {}).items():
+            if task not in TASKS:
+                raise ValueError(f"Unknown task type {task!r}, expected one of {', '.join(TASKS)}")
+            self.routes[task] = Route(**{**self.routes[task].to_dict(), **override})
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def route(self, task: str) -> Route:
+        return self.routes[task]
+
+    def is_templated(self, task: str) -> bool:
+        return self.routes[task].model == TEMPLATE
+
+    @staticmethod
+    def record(task: str, model: str, result: str):
+        REGISTRY.inc(f"{PREFIX}_model_route_requests_total",
+                      help_text="Routed completions by task type, answering model and result "
+                                "(primary, fallback after the deadline or an error, template)",
+                      task=task, model=model, result=result)
+
+    def complete(self, task: str, call: Callable[[str], str]) -> str:
+        """``call(model)`` for the task's route, racing the fallback model after the deadline"""
+        route = self.routes[task]
+        if not route.fallback or route.deadline is None:
+            response = call(route.model)
+            self.record(task, route.model, "primary")
+            return response
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="model-router")
+        primary = self._executor.submit(call, route.model)
+        done, _ = wait([primary], timeout=route.deadline)
+        if done and primary.exception() is None:
+            self.record(task, route.model, "primary")
+            return primary.result()
+
+        calls = {primary: route.model, self._executor.submit(call, route.fallback): route.fallback}
+        pending = set(calls) - set(done)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    self.record(task, calls[future], "primary" if future is primary else "fallback")
+                    return future.result()
+        raise next(future.exception() for future in calls if future is not primary)
+
+    async def complete_async(self, task: str, call: Callable[[str], Awaitable[str]]) -> str:
+        """Async variant of ``complete``"""
+        route = self.routes[task]
+        if not route.fallback or route.deadline is None:
+            response = await call(route.model)
+            self.record(task, route.model, "primary")
+            return response
+
+        primary = asyncio.ensure_future(call(route.model))
+        calls = {primary: route.model}
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=route.deadline)
+            if done and primary.exception() is None:
+                self.record(task, route.model, "primary")
+                return primary.result()
+
+            calls[asyncio.ensure_future(call(route.fallback))] = route.fallback
+            pending = set(calls) - done
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        self.record(task, calls[future], "primary" if future is primary else "fallback")
+                        return future.result()
+            raise next(future.exception() for future in calls if future is not primary)
+        finally:
+            # Also reached when the caller is cancelled while a request is still running
+            for future in calls:
+                if not future.done():
+                    future.cancel()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,270 @@
+from typing import Any, Callable, Dict, Optional, Tuple
+import asyncio
+import importlib
+import os
+import random
+import threading
+import time
+
+import openai
+from openai import OpenAI, AsyncOpenAI
+
+from metrics import PREFIX, REGISTRY, span
+
+# Request priorities: live interview turns go ahead of ingestion, summaries and analysis
+INTERACTIVE = 0
+BACKGROUND = 1
+
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+_clients: Dict[str, Tuple[OpenAI, AsyncOpenAI]] = {}
+_clients_lock = threading.Lock()
+_scheduler = None
+
+
+def _connection_limits():
+    # Limits from the HTTP library the installed SDK is built on: httpx, or httpx2 in newer releases
+    http = importlib.import_module(openai.DefaultHttpxClient.__mro__[1].__module__.split(".")[0])
+    return http.Limits(
+        max_connections=int(os.getenv("OPENAI_MAX_CONNECTIONS", 100)),
+        max_keepalive_connections=int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", 20)),
+        keepalive_expiry=float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", 60)),
+    )
+
+
+def shared_clients(api_key: str) -> Tuple[OpenAI, AsyncOpenAI]:
+    """Process-wide sync and async clients for ``api_key``.
+
+    Sessions share one keep-alive connection pool instead of opening their own, so turns
+    reuse warm TLS connections. The SDK's own retries are off; ``RequestScheduler`` retries.
+    """
+    with _clients_lock:
+        if api_key not in _clients:
+            timeout = float(os.getenv("OPENAI_TIMEOUT", 60))
+            _clients[api_key] = (
+                OpenAI(api_key=api_key, max_retries=0, timeout=timeout,
+                       http_client=openai.DefaultHttpxClient(limits=_connection_limits(), timeout=timeout)),
+                AsyncOpenAI(api_key=api_key, max_retries=0, timeout=timeout,
+                            http_client=openai.DefaultAsyncHttpxClient(limits=_connection_limits(),
+                                                                        timeout=timeout)),
+            )
+        return _clients[api_key]
+
+
+def estimate_tokens(texts, completion_tokens: int = 0) -> int:
+    """Rough up-front token cost (about four characters per token); responses settle the difference"""
+    return sum(len(text) for text in texts) // 4 + 1 + completion_tokens
+
+
+def usage_counts(response: Any) -> Optional[Dict]:
+    """Prompt, cached prompt and completion tokens of a chat completion; None for other responses"""
+    usage = getattr(response, "usage", None)
+    if usage is None or getattr(usage, "completion_tokens", None) is None:
+        return None
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "prompt_tokens": usage.prompt_tokens,
+        "cached_tokens": getattr(details, "cached_tokens", None) or 0,
+        "completion_tokens": usage.completion_tokens,
+    }
+
+
+def get_scheduler() -> "RequestScheduler":
+    """The process-wide scheduler, configured from OPENAI_RPM and OPENAI_TPM"""
+    global _scheduler
+    with _clients_lock:
+        if _scheduler is None:
+            _scheduler = RequestScheduler(
+                requests_per_minute=int(os.getenv("OPENAI_RPM", 500)),
+                tokens_per_minute=int(os.getenv("OPENAI_TPM", 150_000)),
+            )
+        return _scheduler
+
+
+class RequestScheduler:
+    """Token-bucket RPM/TPM accounting with priorities and jittered retries for OpenAI calls.
+
+    Both buckets refill continuously up to one minute's allowance. Background requests may
+    not dip into the last ``interactive_reserve`` share of either bucket and wait while any
+    interactive request is waiting, so bulk ingestion or analysis never starves a live turn.
+    Token costs are estimated up front and corrected from the response's ``usage``, which
+    is also totalled to report how much of the prompt traffic hit the provider's prompt cache.
+    Rate limits (429), server errors (5xx) and connection failures are retried with
+    exponential backoff and full jitter, honouring ``Retry-After``.
+    """
+
+    def __init__(self, requests_per_minute: int = 500, tokens_per_minute: int = 150_000,
+                 interactive_reserve: float = 0.2, max_retries: int = 4,
+                 base_delay: float = 0.5, max_delay: float = 20.0):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.interactive_reserve = interactive_reserve
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._lock = threading.Lock()
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._refilled_at = time.monotonic()
+        self._interactive_waiting = 0
+        self._usage = {"responses": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0}
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._refilled_at
+        self._refilled_at = now
+        self._requests = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60)
+        self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
+
+    def _try_acquire(self, tokens: int, priority: int) -> float:
+        """Take capacity for one request and return 0, or return how long to wait before retrying"""
+        with self._lock:
+            self._refill()
+            if priority == INTERACTIVE:
+                reserve_requests = reserve_tokens = 0.0
+            else:
+                if self._interactive_waiting:
+                    return 0.05
+                reserve_requests = self.requests_per_minute * self.interactive_reserve
+                reserve_tokens = self.tokens_per_minute * self.interactive_reserve
+            # A request larger than the bucket could hold would otherwise wait forever
+            tokens = min(tokens, self.tokens_per_minute - reserve_tokens)
+
+            request_deficit = reserve_requests + 1 - self._requests
+            token_deficit = reserve_tokens + tokens - self._tokens
+            if request_deficit <= 0 and token_deficit <= 0:
+                self._requests -= 1
+                self._tokens -= tokens
+                return 0.0
+            return max(request_deficit * 60 / self.requests_per_minute,
+                       token_deficit * 60 / self.tokens_per_minute, 0.01)
+
+    def _set_waiting(self, priority: int, delta: int):
+        if priority == INTERACTIVE:
+            with self._lock:
+                self._interactive_waiting += delta
+
+    @staticmethod
+    def _record_wait(priority: int, seconds: float):
+        REGISTRY.observe(f"{PREFIX}_scheduler_wait_seconds", seconds, "Time requests waited for rate-limit capacity",
+                         priority=PRIORITY_NAMES.get(priority, priority))
+
+    async def acquire(self, tokens: int, priority: int = INTERACTIVE):
+        """Wait until one request of ``tokens`` fits the rate limits"""
+        wait = self._try_acquire(tokens, priority)
+        if not wait:
+            self._record_wait(priority, 0.0)
+            return
+        start = time.perf_counter()
+        self._set_waiting(priority, 1)
+        try:
+            while wait:
+                await asyncio.sleep(min(wait, 1.0))
+                wait = self._try_acquire(tokens, priority)
+        finally:
+            self._set_waiting(priority, -1)
+            self._record_wait(priority, time.perf_counter() - start)
+
+    def acquire_sync(self, tokens: int, priority: int = INTERACTIVE):
+        """Blocking variant of ``acquire`` for the sync code paths and worker threads"""
+        wait = self._try_acquire(tokens, priority)
+        if not wait:
+            self._record_wait(priority, 0.0)
+            return
+        start = time.perf_counter()
+        self._set_waiting(priority, 1)
+        try:
+            while wait:
+                time.sleep(min(wait, 1.0))
+                wait = self._try_acquire(tokens, priority)
+        finally:
+            self._set_waiting(priority, -1)
+            self._record_wait(priority, time.perf_counter() - start)
+
+    def settle(self, estimated_tokens: int, response: Any):
+        """Correct the token bucket once the response reports what the request actually cost"""
+        usage = getattr(response, "usage", None)
+        total = getattr(usage, "total_tokens", None)
+        if total is None:
+            return
+        counts = usage_counts(response)
+        with self._lock:
+            self._tokens = min(self.tokens_per_minute, self._tokens + estimated_tokens - total)
+            if counts:
+                self._usage["responses"] += 1
+                for name, value in counts.items():
+                    self._usage[name] += value
+
+    def _retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """Backoff before the next attempt, or None if ``error`` is not worth retrying"""
+        if isinstance(error, openai.APIStatusError):
+            if error.status_code != 429 and error.status_code < 500:
+                return None
+        elif not isinstance(error, openai.APIConnectionError):
+            return None
+        if attempt >= self.max_retries:
+            return None
+        REGISTRY.inc(f"{PREFIX}_openai_retries_total", help_text="OpenAI requests retried after a transient failure",
+                     status=getattr(error, "status_code", "connection"))
+
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        try:
+            delay = max(delay, float(retry_after)) if retry_after else delay
+        except ValueError:
+            pass
+        return delay
+
+    async def call(self, request: Callable, *, tokens: int, priority: int = INTERACTIVE, stage: str = "llm_call",
+                   **kwargs) -> Any:
+        """Await ``request(**kwargs)`` within the rate limits, retrying transient failures.
+
+        Each attempt is timed as a ``stage`` span ("llm_call", or "embed" for embeddings).
+        """
+        attempt = 0
+        while True:
+            await self.acquire(tokens, priority)
+            try:
+                with span(stage, priority=PRIORITY_NAMES.get(priority, priority)):
+                    response = await request(**kwargs)
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            self.settle(tokens, response)
+            return response
+
+    def call_sync(self, request: Callable, *, tokens: int, priority: int = INTERACTIVE, stage: str = "llm_call",
+                  **kwargs) -> Any:
+        """Blocking variant of ``call``"""
+        attempt = 0
+        while True:
+            self.acquire_sync(tokens, priority)
+            try:
+                with span(stage, priority=PRIORITY_NAMES.get(priority, priority)):
+                    response = request(**kwargs)
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                time.sleep(delay)
+                continue
+            self.settle(tokens, response)
+            return response
+
+    def stats(self) -> Dict:
+        with self._lock:
+            self._refill()
+            return {
+                "requests_available": round(self._requests, 1),
+                "tokens_available": round(self._tokens),
+                "interactive_waiting": self._interactive_waiting,
+                **self._usage,
+                "cached_token_ratio": round(self._usage["cached_tokens"] / max(self._usage["prompt_tokens"], 1), 3),
+            }
@@ -0,0 +1,92 @@
+from typing import Callable, Dict, List, Optional
+
+
+class PromptBuilder:
+    """Fit variable prompt sections into a fixed token budget.
+
+    Each section is a list of items (conversation turns, retrieved chunks, a document)
+    with a priority; lower numbers are more important. When the rendered prompt would
+    exceed ``max_tokens``, sections are first trimmed down to their ``reserve`` and then,
+    if that is not enough, further, least important section first. Trimming drops whole
+    items from the end a section does not keep and then cuts the last remaining item
+    token by token. The template renders every section exactly once.
+
+    ``token_counts`` maps item texts to token counts worked out beforehand (for instance
+    while the interviewee is still typing); items found there are not tokenized again.
+    """
+
+    def __init__(self, tokenizer, max_tokens: int, token_counts: Optional[Dict[str, int]] = None):
+        self.tokenizer = tokenizer
+        self.max_tokens = max_tokens
+        self.token_counts = token_counts or {}
+        self.sections = {}
+        self.section_tokens = {}
+        self.total_tokens = 0
+
+    def count(self, text: str) -> int:
+        return len(self.tokenizer.encode(text, disallowed_special=()))
+
+    def add_section(self, name: str, items: List[str], priority: int, keep: str = "head",
+                    reserve: int = 0, separator: str = "\n") -> "PromptBuilder":
+        """Register a section; ``keep`` is the end that survives trimming ("head" or "tail")"""
+        items = [item for item in items if item]
+        self.sections[name] = {
+            "items": items,
+            "tokens": [self.token_counts.get(item) or self.count(item) for item in items],
+            "priority": priority,
+            "keep": keep,
+            "reserve": reserve,
+            "separator": separator,
+        }
+        return self
+
+    def _section_total(self, section: Dict) -> int:
+        separators = max(len(section["items"]) - 1, 0) * self.count(section["separator"])
+        return sum(section["tokens"]) + separators
+
+    def _truncate(self, section: Dict, index: int, tokens: int):
+        encoded = self.tokenizer.encode(section["items"][index], disallowed_special=())
+        kept = encoded[:tokens] if section["keep"] == "head" else encoded[len(encoded) - tokens:]
+        section["items"][index] = self.tokenizer.decode(kept) if tokens > 0 else ""
+        section["tokens"][index] = len(kept) if tokens > 0 else 0
+
+    def _trim(self, section: Dict, excess: int, floor: int) -> int:
+        """Trim ``section`` by up to ``excess`` tokens without going below ``floor``; return what is left over"""
+        items, tokens = section["items"], section["tokens"]
+        drop_at = -1 if section["keep"] == "head" else 0
+        separator_tokens = self.count(section["separator"])
+        while excess > 0 and len(items) > 1 and self._section_total(section) - tokens[drop_at] - separator_tokens >= floor:
+            excess -= tokens[drop_at] + separator_tokens
+            items.pop(drop_at)
+            tokens.pop(drop_at)
+
+        allowed = self._section_total(section) - floor
+        if excess > 0 and allowed > 0:
+            # Cut into the item nearest the trimmed end
+            index = len(items) - 1 if section["keep"] == "head" else 0
+            cut = min(excess, allowed, tokens[index])
+            self._truncate(section, index, tokens[index] - cut)
+            excess -= cut
+        return excess
+
+    def _fit(self, available: int):
+        excess = sum(self._section_total(section) for section in self.sections.values()) - available
+        by_priority = sorted(self.sections.values(), key=lambda section: -section["priority"])
+        for section in by_priority:
+            if excess > 0:
+                excess = self._trim(section, excess, section["reserve"])
+        for section in by_priority:
+            if excess > 0:
+                excess = self._trim(section, excess, 0)
+
+    def render(self, template: Callable[[Dict[str, str]], str]) -> str:
+        """Render ``template`` with every section trimmed so the prompt fits the budget"""
+        overhead = self.count(template({name: "" for name in self.sections}))
+        self._fit(max(self.max_tokens - overhead, 0))
+
+        texts = {name: section["separator"].join(item for item in section["items"] if item)
+                 for name, section in self.sections.items()}
+        self.section_tokens = {name: self._section_total(section) for name, section in self.sections.items()}
+        prompt = template(texts)
+        self.total_tokens = self.count(prompt)
+        return prompt
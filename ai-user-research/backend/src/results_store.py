@@ -0,0 +1,178 @@
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+
+KINDS = ("interview", "analysis")
+
+
+class ResultsStore:
+    """Append-only store of finished interviews and analyses, indexed for lookup.
+
+    Every result is a row keyed by a generated result id and tagged with its session,
+    project, goal, target audience and creation time. ``append`` only queues the row; a
+    single writer thread inserts queued rows in batches, so request handlers never wait
+    on disk. Reads use their own connection and see rows once the writer has committed
+    them (``flush`` waits for that).
+    """
+
+    def __init__(self, path: str, batch_size: int = 100):
+        self.path = path
+        self.batch_size = batch_size
+        self.written = 0
+        self.failed = 0
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                result_id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                session_id TEXT,
+                project_name TEXT,
+                goal TEXT,
+                target_audience TEXT,
+                created_at REAL NOT NULL,
+                payload TEXT NOT NULL
+            )
+        """)
+        for column in ("project_name", "goal", "target_audience"):
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS results_{column} ON results ({column}, created_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_created_at ON results (created_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_session_id ON results (session_id)")
+
+        self._queue: queue.Queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="results-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    def append(self, kind: str, payload: Dict, session_id: Optional[str] = None,
+               project_info: Optional[Dict] = None) -> str:
+        """Queue a result for writing and return its id; does not block on I/O"""
+        if kind not in KINDS:
+            raise ValueError(f"Unknown result kind: {kind}")
+        project_info = project_info or {}
+        result_id = uuid.uuid4().hex
+        self._queue.put((
+            result_id, kind, session_id, project_info.get("project_name"), project_info.get("goal"),
+            project_info.get("target_audience"), time.time(), json.dumps(payload)
+        ))
+        return result_id
+
+    def _write_loop(self):
+        conn = self._connect()
+        while True:
+            rows = [self._queue.get()]
+            # Whatever queued up while the last batch was written goes into one transaction
+            while len(rows) < self.batch_size:
+                try:
+                    rows.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in rows
+            rows = [row for row in rows if row is not None]
+            try:
+                if rows:
+                    with conn:
+                        conn.execute("BEGIN")
+                        conn.executemany("INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                    self.written += len(rows)
+            except Exception as e:
+                print(f"Error writing {len(rows)} results: {e}")
+                self.failed += len(rows)
+            finally:
+                for _ in range(len(rows) + stop):
+                    self._queue.task_done()
+            if stop:
+                conn.close()
+                return
+
+    def flush(self):
+        """Block until every queued result has been written"""
+        self._queue.join()
+
+    def close(self):
+        """Write what is queued and stop the writer thread"""
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+
+    @staticmethod
+    def _row(row) -> Dict:
+        result_id, kind, session_id, project_name, goal, target_audience, created_at, payload = row
+        return {
+            "result_id": result_id,
+            "kind": kind,
+            "session_id": session_id,
+            "project_info": {"project_name": project_name, "goal": goal, "target_audience": target_audience},
+            "created_at": datetime.fromtimestamp(created_at).isoformat(timespec="seconds"),
+            **json.loads(payload),
+        }
+
+    def get(self, result_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM results WHERE result_id = ?", (result_id,)).fetchone()
+        return self._row(row) if row else None
+
+    def _where(self, filters: Dict) -> tuple:
+        clauses, params = [], []
+        for column in ("kind", "session_id", "project_name", "goal", "target_audience"):
+            if filters.get(column) is not None:
+                clauses.append(f"{column} = ?")
+                params.append(filters[column])
+        if filters.get("since") is not None:
+            clauses.append("created_at >= ?")
+            params.append(filters["since"].timestamp())
+        if filters.get("until") is not None:
+            clauses.append("created_at < ?")
+            params.append(filters["until"].timestamp())
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def query(self, kind: Optional[str] = None, session_id: Optional[str] = None,
+              project_name: Optional[str] = None, goal: Optional[str] = None,
+              target_audience: Optional[str] = None, since: Optional[datetime] = None,
+              until: Optional[datetime] = None, limit: int = 50, offset: int = 0) -> List[Dict]:
+        """Matching results, newest first; every filter is optional and they combine with AND"""
+        where, params = self._where(locals())
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM results{where} ORDER BY created_at DESC LIMIT ? OFFSET ?", [*params, limit, offset]
+            ).fetchall()
+        return [self._row(row) for row in rows]
+
+    def iter_results(self, kind: Optional[str] = None, project_name: Optional[str] = None,
+                     batch_size: int = 200) -> Iterator[Dict]:
+        """Every matching result, oldest first, read in batches so memory stays flat"""
+        where, params = self._where({"kind": kind, "project_name": project_name})
+        last_rowid = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT rowid, * FROM results{where}{' AND' if where else ' WHERE'} rowid > ? "
+                    f"ORDER BY rowid LIMIT ?", [*params, last_rowid, batch_size]
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield self._row(row[1:])
+            last_rowid = rows[-1][0]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stored = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        return {"stored": stored, "queued": self._queue.qsize(), "written": self.written, "failed": self.failed}
@@ -0,0 +1,242 @@
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, Optional
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+
+from user_research_platform import UserResearchPlatform
+
+
+def new_session_id(project_name: str) -> str:
+    """Collision-free session id; the project name prefix only makes ids readable in logs"""
+    slug = re.sub(r"[^a-z0-9]+", "-", project_name.lower()).strip("-")[:32]
+    return f"{slug or 'session'}_{uuid.uuid4().hex}"
+
+
+class _Entry:
+    __slots__ = ("platform", "version", "document_version", "footprint", "last_access")
+
+    def __init__(self, platform: UserResearchPlatform, version: int, document_version: int):
+        self.platform = platform
+        self.version = version
+        self.document_version = document_version
+        self.footprint = platform.memory_footprint()
+        self.last_access = time.time()
+
+
+class SessionStore:
+    """Bounded in-memory session cache backed by SQLite snapshots.
+
+    At most ``max_sessions`` platforms (and roughly ``max_bytes`` of documents and indexes)
+    stay in memory; the least recently used, and any idle for longer than ``idle_ttl``
+    seconds, are dropped and rehydrated from their snapshot on the next request. Every
+    write bumps the snapshot's version, so a worker holding an older copy reloads it and
+    requests for one interview can land on any worker sharing the database file.
+    Snapshots untouched for ``snapshot_ttl`` seconds are deleted.
+    """
+
+    def __init__(self, path: str, create_platform: Callable[[], UserResearchPlatform],
+                 max_sessions: int = 200, max_bytes: int = 1024 * 1024 * 1024,
+                 idle_ttl: float = 30 * 60, snapshot_ttl: float = 7 * 24 * 3600):
+        self.path = path
+        self.create_platform = create_platform
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self.snapshot_ttl = snapshot_ttl
+        # Least recently used first
+        self._sessions: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._last_purge = 0.0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                version INTEGER NOT NULL,
+                state BLOB NOT NULL,
+                document_version INTEGER NOT NULL,
+                document BLOB NOT NULL,
+                index_meta TEXT NOT NULL,
+                index_matrix BLOB NOT NULL,
+                index_scales BLOB NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at)")
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.get(session_id) is not None
+
+    def __getitem__(self, session_id: str) -> UserResearchPlatform:
+        platform = self.get(session_id)
+        if platform is None:
+            raise KeyError(session_id)
+        return platform
+
+    def __setitem__(self, session_id: str, platform: UserResearchPlatform):
+        self.save(session_id, platform)
+
+    def __delitem__(self, session_id: str):
+        with self._lock:
+            self._forget(session_id)
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def __len__(self) -> int:
+        """Sessions currently held in memory"""
+        return len(self._sessions)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._sessions))
+
+    def get(self, session_id: str) -> Optional[UserResearchPlatform]:
+        """Return the live platform, rehydrating it if it was evicted or changed on another worker"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT version FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            entry = self._sessions.get(session_id)
+
+            if row is None:
+                # Deleted or expired elsewhere
+                self._forget(session_id)
+                return None
+            if entry is None or entry.version != row[0]:
+                entry = self._load(session_id, entry.platform if entry else None)
+
+            self._touch(session_id, entry)
+            return entry.platform
+
+    def save(self, session_id: str, platform: Optional[UserResearchPlatform] = None,
+             snapshot: Optional[Dict] = None):
+        """Write the session's snapshot; call after every request that changes it.
+
+        The document and its index are only rewritten when they changed since the last write.
+        ``snapshot`` is ``platform.to_snapshot()`` taken by the caller on the thread that
+        changes the platform, leaving only serialization and the write to this call.
+        """
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if platform is None:
+                if entry is None:
+                    return
+                platform = entry.platform
+
+            if snapshot is None:
+                snapshot = platform.to_snapshot()
+            document_version = snapshot["state"]["document_version"]
+            state = zlib.compress(json.dumps(snapshot["state"]).encode("utf-8"))
+            now = time.time()
+
+            row = None
+            if entry is not None and entry.platform is platform and entry.document_version == document_version:
+                row = self._conn.execute(
+                    "UPDATE sessions SET version = version + 1, state = ?, updated_at = ? "
+                    "WHERE session_id = ? RETURNING version",
+                    (state, now, session_id)
+                ).fetchone()
+            if row is None:
+                index = snapshot["index"]
+                row = self._conn.execute("""
+                    INSERT INTO sessions (session_id, version, state, document_version, document,
+                                          index_meta, index_matrix, index_scales, updated_at)
+                    VALUES (?, 1, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (session_id) DO UPDATE SET
+                        version = version + 1, state = excluded.state,
+                        document_version = excluded.document_version, document = excluded.document,
+                        index_meta = excluded.index_meta, index_matrix = excluded.index_matrix,
+                        index_scales = excluded.index_scales, updated_at = excluded.updated_at
+                    RETURNING version
+                """, (
+                    session_id,
+                    state,
+                    document_version,
+                    zlib.compress(json.dumps(snapshot["document"]).encode("utf-8")),
+                    json.dumps({"dtype": index["dtype"], "dimensions": index["dimensions"], "space": index["space"]}),
+                    index["matrix"],
+                    index["scales"],
+                    now,
+                )).fetchone()
+
+            self._forget(session_id)
+            self._touch(session_id, _Entry(platform, row[0], document_version))
+
+    def newer_state(self, session_id: str) -> Optional[Dict]:
+        """The stored conversation state, if another worker wrote the session since this one did.
+
+        Background ingestion restores it before saving, so turns recorded elsewhere meanwhile survive.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT version, state FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            entry = self._sessions.get(session_id)
+            if row is None or (entry is not None and entry.version == row[0]):
+                return None
+        return json.loads(zlib.decompress(row[1]))
+
+    def _load(self, session_id: str, platform: Optional[UserResearchPlatform]) -> _Entry:
+        """Rehydrate from the snapshot, reusing ``platform`` and its document when still current"""
+        version, state, document_version = self._conn.execute(
+            "SELECT version, state, document_version FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        state = json.loads(zlib.decompress(state))
+
+        document = index = None
+        if platform is None or platform.document_version != document_version:
+            document, meta, matrix, scales = self._conn.execute(
+                "SELECT document, index_meta, index_matrix, index_scales FROM sessions WHERE session_id = ?",
+                (session_id,)
+            ).fetchone()
+            document = json.loads(zlib.decompress(document))
+            index = dict(json.loads(meta), matrix=matrix, scales=scales)
+        if platform is None:
+            platform = self.create_platform()
+        platform.restore_snapshot(state, document, index)
+
+        self._forget(session_id)
+        return _Entry(platform, version, document_version)
+
+    def _forget(self, session_id: str):
+        entry = self._sessions.pop(session_id, None)
+        if entry is not None:
+            self._bytes -= entry.footprint
+
+    def _touch(self, session_id: str, entry: _Entry):
+        if session_id not in self._sessions:
+            self._sessions[session_id] = entry
+            self._bytes += entry.footprint
+        entry.last_access = time.time()
+        self._sessions.move_to_end(session_id)
+        self._evict(entry.last_access)
+
+    def _evict(self, now: float):
+        """Drop idle and least recently used sessions from memory; their snapshots stay on disk"""
+        while len(self._sessions) > 1:
+            session_id, oldest = next(iter(self._sessions.items()))
+            if now - oldest.last_access > self.idle_ttl or len(self._sessions) > self.max_sessions \
+                    or self._bytes > self.max_bytes:
+                self._forget(session_id)
+            else:
+                break
+
+        if now - self._last_purge > 3600:
+            self._last_purge = now
+            self._conn.execute("DELETE FROM sessions WHERE updated_at < ?", (now - self.snapshot_ttl,))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stored = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+            return {"in_memory": len(self._sessions), "memory_bytes": self._bytes, "stored": stored}
@@ -0,0 +1,30 @@
+from typing import List
+
+
+class TextChunker:
+    """Incremental version of ``UserResearchPlatform._create_chunks``.
+
+    Text is fed in pieces as it is extracted and complete chunks come out as soon as
+    enough text has arrived; the chunks match those of chunking the whole text at once.
+    """
+
+    def __init__(self, chunk_size: int = 1000, overlap: int = 200):
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self._buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        buffer = self._buffer + text
+        chunks = []
+        start = 0
+        while len(buffer) - start >= self.chunk_size:
+            chunks.append(buffer[start:start + self.chunk_size])
+            start += self.chunk_size - self.overlap
+        self._buffer = buffer[start:]
+        return chunks
+
+    def finish(self) -> List[str]:
+        """Flush the final partial chunk"""
+        chunks = [self._buffer] if self._buffer else []
+        self._buffer = ""
+        return chunks
@@ -1,24 +1,175 @@
-from openai import OpenAI
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Callable, AsyncIterator, Tuple
+from collections import OrderedDict
 import json
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import logging
+import time
 import numpy as np
 import tiktoken
-from sklearn.metrics.pairwise import cosine_similarity
-import io  # Add this import
+from embedding_cache import EmbeddingCache
+from chunk_index import ChunkIndex
+from embedding_space import EmbeddingSpace, EmbeddingSpaceMismatch
+from lexical_index import LexicalIndex, reciprocal_rank_fusion
+from prompt_builder import PromptBuilder
+from conversation_memory import ConversationMemory
+from text_chunker import TextChunker
+from analysis_engine import ANALYSIS_SECTIONS, ANALYST_SYSTEM_MESSAGE, DocumentSummaryCache, MapReduceAnalyzer, \
+    document_hash
+from openai_scheduler import INTERACTIVE, BACKGROUND, estimate_tokens, get_scheduler, shared_clients, usage_counts
+from metrics import PREFIX, REGISTRY, log_prompt, span, timed
+from completion_cache import CompletionCache
+from model_router import TEMPLATE, ModelRouter, template_elaboration
+
+logger = logging.getLogger(__name__)
 
 
 class UserResearchPlatform:
-    def __init__(self, api_key: str):
-        self.client = OpenAI(api_key=api_key)
+    def __init__(self, api_key: str, embeddings_cache: Optional[EmbeddingCache] = None,
+                 summary_cache: Optional[DocumentSummaryCache] = None,
+                 completion_cache: Optional[CompletionCache] = None, router: Optional[ModelRouter] = None):
+        # Clients and their connection pool are shared by all sessions; every request goes
+        # through the process-wide rate-limit scheduler
+        self.client, self.async_client = shared_clients(api_key)
+        self.scheduler = get_scheduler()
+        self.embeddings_cache = embeddings_cache
+        # Question and analysis completions, shared by all sessions; see CompletionCache for the modes
+        self.completion_cache = completion_cache
+        # Model and latency budget per task type (elaboration, first question, question, analysis)
+        self.router = router or ModelRouter()
         self.conversation_history = []
         self.project_info = {}
         self.current_question = None
         self.doc_chunks = []
-        self.chunk_embeddings = []
+        # Compact embedding storage: "float32", "float16" or "int8" rows, optionally with
+        # fewer dimensions requested from the text-embedding-3 models
+        self.embedding_storage_dtype = "float32"
+        self.embedding_dimensions = None
+        self.chunk_index = ChunkIndex(self.embedding_storage_dtype)
+        # BM25 over the same chunks; "dense" (default) uses only the embedding index, "hybrid" fuses
+        # both rankings and "lexical" answers from BM25 alone, without a query embedding call
+        self.lexical_index = LexicalIndex()
+        self.retrieval_mode = "dense"
+        # Chunks and queries are embedded in the same space (model + dimensions); an index
+        # left in an older space is re-embedded in the background, see _migrate_embeddings_async
         self.embedding_model = "text-embedding-3-small"
+        self._migration_task: Optional[asyncio.Task] = None
         self.tokenizer = tiktoken.get_encoding("cl100k_base")
-        self.product_context = None  # Add this line
+        self.product_context = None
+
+        # Embedding ingestion: chunks are packed into batches bounded by these budgets
+        self.embedding_batch_max_tokens = 8000
+        self.embedding_batch_max_items = 256
+        self.embedding_concurrency = 4
+        # While streaming a document, chunks are sent for embedding in groups of this size
+        self.ingest_group_chunks = 32
+
+        # Prompt size limits in tokens; history, retrieved chunks and product context are trimmed to fit
+        self.prompt_token_budget = 6000
+        self.analysis_token_budget = 6000
+        # "single" sends one (trimmed) prompt, "map_reduce" analyses transcript windows concurrently
+        # and merges them; "auto" switches to map-reduce once the material exceeds the budget
+        self.analysis_mode = "auto"
+        self.summary_cache = summary_cache
+        self.document_summary = None  # (document hash, summary)
+        # The last analysis and the inputs it was made from: repeated calls on the same inputs
+        # return it as is, and after new turns it is updated instead of redone, at most
+        # max_incremental_updates times in a row before a full analysis
+        self.last_analysis: Optional[Dict] = None
+        self.max_incremental_updates = 4
+        self._document_hash = None  # (document version, chunk count, hash)
+        self.last_prompt_tokens = {}
+        # Per-interview prompt prefix, rebuilt when the document or project info changes
+        self._prompt_prefix: Optional[Dict] = None
+        # Prompt tokens of the last chat request and how many the provider served from its cache;
+        # empty when the completion cache answered it
+        self.last_usage = {}
+        # Expected completion sizes, charged against the tokens-per-minute budget up front
+        self.question_completion_tokens = 300
+        self.analysis_completion_tokens = 1500
+
+        # "rolling" keeps recent turns verbatim and folds older ones into a running summary;
+        # "full" re-sends the whole transcript every turn
+        self.memory_mode = "rolling"
+        self.conversation_memory = ConversationMemory()
+        self.summary_model = "gpt-4"
+
+        # Work for the next turn that does not need the answer, started once a question is sent;
+        # see prepare_next_turn
+        self.speculate = True
+        self._speculation: Optional[Dict] = None  # {"turns", "document_version", "task"}
+        self._token_counts: Dict[str, int] = {}
+        # Recent query embeddings, keyed by (space, query). Conversation queries are one-off, so
+        # they stay out of the shared chunk embedding cache, where they would push out chunks
+        self._query_embeddings: "OrderedDict[Tuple[str, str], List[float]]" = OrderedDict()
+        self.query_embedding_cache_size = 32
+
+        # Bumped whenever chunks or the index change so session snapshots rewrite them only then
+        self.document_version = 0
+        # Last known document ingestion status, kept for workers that did not run the job
+        self.ingestion_status = None
+
+    def to_snapshot(self) -> Dict:
+        """Serializable session state, split so the document part is only rewritten when it changes.
+
+        Lists and the index are copied, so the snapshot can be serialized on another thread
+        while ingestion or the next turn keeps changing the session.
+        """
+        return {
+            "state": {
+                "project_info": dict(self.project_info),
+                "conversation_history": list(self.conversation_history),
+                "current_question": self.current_question,
+                "memory_summary": self.conversation_memory.summary,
+                "memory_summarized_count": self.conversation_memory.summarized_count,
+                "embedding_storage_dtype": self.embedding_storage_dtype,
+                "embedding_dimensions": self.embedding_dimensions,
+                "document_version": self.document_version,
+                "ingestion_status": self.ingestion_status,
+                "last_analysis": self.last_analysis,
+            },
+            "document": {
+                "doc_chunks": list(self.doc_chunks),
+                "product_context": self.product_context,
+            },
+            "index": self.chunk_index.to_state(),
+        }
+
+    def restore_snapshot(self, state: Dict, document: Optional[Dict] = None, index: Optional[Dict] = None):
+        """Load state written by ``to_snapshot``, possibly on another worker"""
+        self.project_info = state["project_info"]
+        self.conversation_history = state["conversation_history"]
+        self.current_question = state["current_question"]
+        self.conversation_memory.summary = state["memory_summary"]
+        self.conversation_memory.summarized_count = state["memory_summarized_count"]
+        self.embedding_storage_dtype = state["embedding_storage_dtype"]
+        self.embedding_dimensions = state["embedding_dimensions"]
+        self.document_version = state["document_version"]
+        self.ingestion_status = state["ingestion_status"]
+        self.last_analysis = state.get("last_analysis")
+        if document is not None:
+            self.doc_chunks = document["doc_chunks"]
+            self.product_context = document["product_context"]
+            self.lexical_index = LexicalIndex()
+            self.lexical_index.add(self.doc_chunks)
+        if index is not None:
+            self.chunk_index = ChunkIndex.from_state(index)
+
+    def memory_footprint(self) -> int:
+        """Approximate bytes held by this session, dominated by the document and its index"""
+        text = sum(len(chunk) for chunk in self.doc_chunks) + len(self.product_context or "")
+        history = sum(len(entry["question"] or "") + len(entry["response"]) for entry in self.conversation_history)
+        return self.chunk_index.nbytes + text + history
+
+    def record_response(self, response: str):
+        """Append the answer to the current question and refresh the rolling memory in the background"""
+        self.conversation_history.append({
+            "question": self.current_question,
+            "response": response
+        })
+        if self.memory_mode == "rolling":
+            self.conversation_memory.schedule_update(self.async_client, self.summary_model, self.conversation_history,
+                                                     scheduler=self.scheduler)
 
     def process_document(self, document_text: str):
         # Split document into chunks with overlap
@@ -26,37 +177,173 @@ class UserResearchPlatform:
         overlap = 200
         chunks = self._create_chunks(document_text, chunk_size, overlap)
 
-        # Store chunks
-        self.doc_chunks = chunks
+        # Generate embeddings for chunks and keep the ones that were embedded
+        self._store_chunks(chunks, self._generate_embeddings(chunks))
 
-        # Generate embeddings for chunks
-        self.chunk_embeddings = self._generate_embeddings(chunks)
+    async def process_document_async(self, document_text: str):
+        """Async variant of ``process_document``"""
+        chunks = self._create_chunks(document_text, 1000, 200)
+        self._store_chunks(chunks, await self._generate_embeddings_async(chunks))
+
+    def _store_chunks(self, chunks: List[str], embeddings: List[Optional[List[float]]]):
+        """Replace the document chunks and their index"""
+        self.doc_chunks = []
+        self.chunk_index = self._new_chunk_index()
+        self.lexical_index = LexicalIndex()
+        self.document_version += 1
+        self._append_chunks(chunks, embeddings)
+
+    def _append_chunks(self, chunks: List[str], embeddings: List[Optional[List[float]]]):
+        """Keep chunks aligned with their embeddings, dropping chunks that could not be embedded"""
+        embedded = [(chunk, embedding) for chunk, embedding in zip(chunks, embeddings) if embedding is not None]
+        self.doc_chunks.extend(chunk for chunk, _ in embedded)
+        self.chunk_index.add([embedding for _, embedding in embedded])
+        self.lexical_index.add(chunk for chunk, _ in embedded)
+        self.document_version += 1
 
     def _create_chunks(self, text: str, chunk_size: int = 1000, overlap: int = 200) -> List[str]:
         """Split text into overlapping chunks"""
         chunks = []
         start = 0
-        while start < len(text):
-            end = start + chunk_size
-            chunk = text[start:end]
-            chunks.append(chunk)
-            start = end - overlap
+        with span("chunk"):
+            while start < len(text):
+                end = start + chunk_size
+                chunk = text[start:end]
+                chunks.append(chunk)
+                start = end - overlap
         return chunks
 
-    def _generate_embeddings(self, chunks: List[str]) -> List[List[float]]:
-        """Generate embeddings for text chunks using OpenAI"""
-        try:
-            embeddings = []
-            for chunk in chunks:
-                response = self.client.embeddings.create(
-                    input=chunk,
-                    model="text-embedding-ada-002"
-                )
-                embeddings.append(response.data[0].embedding)
-            return embeddings
-        except Exception as e:
-            print(f"Error generating embeddings: {e}")
-            return []
+    @property
+    def embedding_space(self) -> EmbeddingSpace:
+        return EmbeddingSpace(self.embedding_model, self.embedding_dimensions)
+
+    def _new_chunk_index(self) -> ChunkIndex:
+        return ChunkIndex(self.embedding_storage_dtype, self.embedding_space.key)
+
+    def _plan_embedding_batches(self, chunks: List[str]) -> List[List[int]]:
+        """Group chunk indices into batches bounded by the token and item budgets"""
+        batches = []
+        current, current_tokens = [], 0
+        for i, chunk in enumerate(chunks):
+            n_tokens = len(self.tokenizer.encode(chunk, disallowed_special=()))
+            if current and (current_tokens + n_tokens > self.embedding_batch_max_tokens
+                            or len(current) >= self.embedding_batch_max_items):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(i)
+            current_tokens += n_tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def _embed_batch(self, batch: List[str]) -> List[List[float]]:
+        """Embed one batch of chunks in a single request, in input order"""
+        space = self.embedding_space
+        response = self.scheduler.call_sync(
+            self.client.embeddings.create,
+            tokens=estimate_tokens(batch),
+            priority=BACKGROUND,
+            stage="embed",
+            input=batch,
+            model=space.model,
+            **space.request_options()
+        )
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+    def _generate_embeddings(self, chunks: List[str]) -> List[Optional[List[float]]]:
+        """Generate embeddings for text chunks, consulting the embedding cache first.
+
+        The result is aligned with ``chunks``; a chunk whose batch still fails after the
+        scheduler's retries gets ``None``.
+        """
+        if self.embeddings_cache is None:
+            return self._request_embeddings(chunks)
+
+        cache_key = self.embedding_space.key
+        embeddings = self.embeddings_cache.get_many(cache_key, chunks)
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            fresh = self._request_embeddings([chunks[i] for i in missing])
+            self.embeddings_cache.put_many(cache_key, [chunks[i] for i in missing], fresh)
+            for i, embedding in zip(missing, fresh):
+                embeddings[i] = embedding
+        return embeddings
+
+    def _request_embeddings(self, chunks: List[str]) -> List[Optional[List[float]]]:
+        """Embed chunks with batched, concurrent OpenAI requests; a failed batch only loses its own chunks"""
+        embeddings = [None] * len(chunks)
+        with ThreadPoolExecutor(max_workers=self.embedding_concurrency) as executor:
+            futures = [
+                (executor.submit(self._embed_batch, [chunks[i] for i in batch]), batch)
+                for batch in self._plan_embedding_batches(chunks)
+            ]
+            for future, batch in futures:
+                try:
+                    for i, embedding in zip(batch, future.result()):
+                        embeddings[i] = embedding
+                except Exception as e:
+                    logger.error("Error generating embeddings for batch of %s chunks: %s", len(batch), e)
+        return embeddings
+
+    async def _embed_batch_async(self, batch: List[str]) -> List[List[float]]:
+        """Async variant of ``_embed_batch``"""
+        space = self.embedding_space
+        response = await self.scheduler.call(
+            self.async_client.embeddings.create,
+            tokens=estimate_tokens(batch),
+            priority=BACKGROUND,
+            stage="embed",
+            input=batch,
+            model=space.model,
+            **space.request_options()
+        )
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+    async def _generate_embeddings_async(self, chunks: List[str],
+                                         on_embedded: Optional[Callable[[int], None]] = None
+                                         ) -> List[Optional[List[float]]]:
+        """Async variant of ``_generate_embeddings``; cache lookups run in a worker thread.
+
+        ``on_embedded`` is called with the number of chunks each time some become available.
+        """
+        if self.embeddings_cache is None:
+            return await self._request_embeddings_async(chunks, on_embedded)
+
+        cache_key = self.embedding_space.key
+        embeddings = await asyncio.to_thread(self.embeddings_cache.get_many, cache_key, chunks)
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if on_embedded and len(missing) < len(chunks):
+            on_embedded(len(chunks) - len(missing))
+        if missing:
+            fresh = await self._request_embeddings_async([chunks[i] for i in missing], on_embedded)
+            await asyncio.to_thread(self.embeddings_cache.put_many, cache_key, [chunks[i] for i in missing], fresh)
+            for i, embedding in zip(missing, fresh):
+                embeddings[i] = embedding
+        return embeddings
+
+    async def _request_embeddings_async(self, chunks: List[str],
+                                        on_embedded: Optional[Callable[[int], None]] = None
+                                        ) -> List[Optional[List[float]]]:
+        """Async variant of ``_request_embeddings``, bounded by a semaphore instead of a thread pool"""
+        embeddings = [None] * len(chunks)
+        batches = self._plan_embedding_batches(chunks)
+        semaphore = asyncio.Semaphore(self.embedding_concurrency)
+
+        async def embed(batch: List[int]) -> List[List[float]]:
+            async with semaphore:
+                result = await self._embed_batch_async([chunks[i] for i in batch])
+            if on_embedded:
+                on_embedded(len(batch))
+            return result
+
+        results = await asyncio.gather(*(embed(batch) for batch in batches), return_exceptions=True)
+        for batch, result in zip(batches, results):
+            if isinstance(result, Exception):
+                logger.error("Error generating embeddings for batch of %s chunks: %s", len(batch), result)
+                continue
+            for i, embedding in zip(batch, result):
+                embeddings[i] = embedding
+        return embeddings
 
     def set_product_context(self, document_text: str) -> bool:
         """Set product context by processing the document"""
@@ -64,51 +351,269 @@ class UserResearchPlatform:
             # Split document into chunks with overlap
             chunk_size = 1000
             overlap = 200
-            self.doc_chunks = self._create_chunks(document_text, chunk_size, overlap)
+            chunks = self._create_chunks(document_text, chunk_size, overlap)
 
             # Generate embeddings for chunks
-            self.chunk_embeddings = self._generate_embeddings(self.doc_chunks)
+            self._store_chunks(chunks, self._generate_embeddings(chunks))
 
             # Store the full document text as product context
             self.product_context = document_text
+            self.document_version += 1
 
-            print(f"Document processed: {len(self.doc_chunks)} chunks created")
+            logger.info("Document processed: %s chunks created", len(self.doc_chunks))
             return True
         except Exception as e:
-            print(f"Error processing document: {e}")
+            logger.error("Error processing document: %s", e)
             return False
 
+    async def set_product_context_async(self, document_text: str,
+                                        progress: Optional[Callable[[str, int, int], None]] = None) -> bool:
+        """Async variant of ``set_product_context``.
+
+        ``progress(stage, done, total)`` is called as the document moves through the
+        chunking, embedding and indexing stages.
+        """
+        def report(stage: str, done: int = 0, total: int = 0):
+            if progress:
+                progress(stage, done, total)
+
+        try:
+            report("chunking")
+            chunks = self._create_chunks(document_text, 1000, 200)
+
+            embedded = 0
+
+            def on_embedded(count: int):
+                nonlocal embedded
+                embedded += count
+                report("embedding", embedded, len(chunks))
+
+            report("embedding", 0, len(chunks))
+            embeddings = await self._generate_embeddings_async(chunks, on_embedded)
+
+            report("indexing", embedded, len(chunks))
+            self._store_chunks(chunks, embeddings)
+            self.product_context = document_text
+            self.document_version += 1
+
+            logger.info("Document processed: %s chunks created", len(self.doc_chunks))
+            return True
+        except Exception as e:
+            logger.error("Error processing document: %s", e)
+            return False
+
+    async def set_product_context_from_pages_async(self, pages: AsyncIterator[str],
+                                                   progress: Optional[Callable[[str, int, int], None]] = None):
+        """Stream a document through chunking, embedding and indexing while it is still being extracted.
+
+        Chunks are embedded in groups as soon as enough pages have arrived, and the index
+        grows in document order as groups finish. Raises ValueError if no text was extracted;
+        extraction errors propagate.
+        """
+        def report(stage: str, done: int = 0, total: int = 0):
+            if progress:
+                progress(stage, done, total)
+
+        chunker = TextChunker(1000, 200)
+        text_parts = []
+        pending = []
+        groups = []
+        produced = 0
+        embedded = 0
+        slots = asyncio.Semaphore(self.embedding_concurrency)
+        extracting = True
+
+        def on_embedded(count: int):
+            nonlocal embedded
+            embedded += count
+            report("extracting" if extracting else "embedding", embedded, produced)
+
+        async def embed(chunks: List[str]):
+            async with slots:
+                return chunks, await self._generate_embeddings_async(chunks, on_embedded)
+
+        def flush():
+            nonlocal pending, produced
+            if pending:
+                produced += len(pending)
+                groups.append(asyncio.ensure_future(embed(pending)))
+                pending = []
+
+        async def index_finished_groups(wait: bool):
+            while groups and (wait or groups[0].done()):
+                chunks, embeddings = await groups.pop(0)
+                self._append_chunks(chunks, embeddings)
+
+        self.doc_chunks = []
+        self.chunk_index = self._new_chunk_index()
+        self.lexical_index = LexicalIndex()
+        report("extracting")
+        try:
+            async for page in pages:
+                text_parts.append(page)
+                with span("chunk"):
+                    pending.extend(chunker.feed(page))
+                if len(pending) >= self.ingest_group_chunks:
+                    flush()
+                await index_finished_groups(wait=False)
+            pending.extend(chunker.finish())
+            flush()
+            extracting = False
+
+            report("embedding", embedded, produced)
+            await index_finished_groups(wait=True)
+        finally:
+            for group in groups:
+                group.cancel()
+
+        document_text = "".join(text_parts)
+        if not document_text.strip():
+            raise ValueError("No text content could be extracted from the document")
+
+        report("indexing", embedded, produced)
+        self.product_context = document_text
+        self.document_version += 1
+        logger.info("Document processed: %s chunks created", len(self.doc_chunks))
+
+    def _rank_chunks(self, query: str, query_embedding: Optional[List[float]], top_k: int,
+                     fuse_lexical: bool = False) -> List[str]:
+        """Top chunks for the retrieval mode; without a query embedding only BM25 is used.
+
+        ``fuse_lexical`` fuses the dense ranking with BM25 over ``query`` in any mode, for an
+        embedding that does not cover the whole query.
+        """
+        space = self.embedding_space.key
+        try:
+            if query_embedding is None:
+                top_indices = self.lexical_index.search(query, top_k)
+            elif self.retrieval_mode == "hybrid" or fuse_lexical:
+                candidates = max(top_k * 10, 20)
+                top_indices = reciprocal_rank_fusion([
+                    self.lexical_index.search(query, candidates),
+                    self.chunk_index.search(query_embedding, candidates, space=space)
+                ], top_k)
+            else:
+                top_indices = self.chunk_index.search(query_embedding, top_k, space=space)
+        except EmbeddingSpaceMismatch as e:
+            logger.warning("Falling back to lexical retrieval: %s", e)
+            top_indices = self.lexical_index.search(query, top_k)
+        return [self.doc_chunks[i] for i in top_indices]
+
+    def _dense_index_ready(self) -> bool:
+        """Whether the chunk index is in the current embedding space.
+
+        If not, a background re-embed into the current space is started (when an event loop
+        is running) and retrieval uses BM25 until it finishes, so a model or dimension
+        change never blocks a turn on a full re-ingest.
+        """
+        if self.chunk_index.space in (None, self.embedding_space.key):
+            return True
+        if self._migration_task is None or self._migration_task.done():
+            try:
+                self._migration_task = asyncio.get_running_loop().create_task(self._migrate_embeddings_async())
+            except RuntimeError:
+                self._migration_task = None
+        return False
+
+    async def _migrate_embeddings_async(self):
+        """Re-embed the current chunks in the current space and swap the index in when done"""
+        space, chunks, version = self.embedding_space, list(self.doc_chunks), self.document_version
+        logger.info("Re-embedding %s chunks from %s into %s", len(chunks), self.chunk_index.space, space.key)
+        try:
+            embeddings = await self._generate_embeddings_async(chunks)
+        except Exception as e:
+            logger.error("Error migrating embeddings: %s", e)
+            return
+        if self.document_version != version or self.embedding_space != space:
+            # The document or the space changed meanwhile; the next retrieval starts over
+            return
+        self._store_chunks(chunks, embeddings)
+
+    def _remember_query_embedding(self, key: Tuple[str, str], embedding: List[float]) -> List[float]:
+        self._query_embeddings[key] = embedding
+        self._query_embeddings.move_to_end(key)
+        while len(self._query_embeddings) > self.query_embedding_cache_size:
+            self._query_embeddings.popitem(last=False)
+        return embedding
+
+    def _embed_query(self, query: str) -> List[float]:
+        space = self.embedding_space
+        cache_key = (space.key, query)
+        if cache_key in self._query_embeddings:
+            self._query_embeddings.move_to_end(cache_key)
+            return self._query_embeddings[cache_key]
+        embedding = self.scheduler.call_sync(
+            self.client.embeddings.create,
+            tokens=estimate_tokens([query]),
+            stage="embed",
+            model=space.model,
+            input=query,
+            **space.request_options()
+        ).data[0].embedding
+        return self._remember_query_embedding(cache_key, embedding)
+
+    async def _embed_query_async(self, query: str) -> List[float]:
+        """Async variant of ``_embed_query``"""
+        space = self.embedding_space
+        cache_key = (space.key, query)
+        if cache_key in self._query_embeddings:
+            self._query_embeddings.move_to_end(cache_key)
+            return self._query_embeddings[cache_key]
+        response = await self.scheduler.call(
+            self.async_client.embeddings.create,
+            tokens=estimate_tokens([query]),
+            stage="embed",
+            model=space.model,
+            input=query,
+            **space.request_options()
+        )
+        return self._remember_query_embedding(cache_key, response.data[0].embedding)
+
     def _get_relevant_chunks(self, query: str, top_k: int = 2) -> List[str]:
         # Return empty list if no chunks or embeddings exist
-        if not self.doc_chunks or not self.chunk_embeddings:
+        if not self.doc_chunks or not len(self.chunk_index):
             return []
 
-        try:
-            # Get embedding for query
-            query_embedding = self.client.embeddings.create(
-                model=self.embedding_model,
-                input=query
-            ).data[0].embedding
-
-            # Convert embeddings to numpy arrays and reshape
-            query_embedding_array = np.array([query_embedding])  # Shape: (1, embedding_dim)
-            chunk_embeddings_array = np.array(self.chunk_embeddings)  # Shape: (n_chunks, embedding_dim)
-
-            # Calculate similarities
-            similarities = cosine_similarity(
-                query_embedding_array,
-                chunk_embeddings_array
-            )[0]
-
-            # Get top k chunks
-            top_indices = np.argsort(similarities)[-top_k:][::-1]
-            return [self.doc_chunks[i] for i in top_indices]
-        except Exception as e:
-            print(f"Error in _get_relevant_chunks: {e}")
+        query_embedding = None
+        if self.retrieval_mode != "lexical" and self._dense_index_ready():
+            try:
+                query_embedding = self._embed_query(query)
+            except Exception as e:
+                # BM25 still answers locally
+                logger.warning("Error in _get_relevant_chunks: %s", e)
+        with span("retrieve", mode=self.retrieval_mode):
+            return self._rank_chunks(query, query_embedding, top_k)
+
+    async def _get_relevant_chunks_async(self, query: str, top_k: int = 2,
+                                         query_embedding: Optional[List[float]] = None) -> List[str]:
+        """Async variant of ``_get_relevant_chunks``.
+
+        A given ``query_embedding`` is the speculative one from ``prepare_next_turn``, made
+        before the last answer existed: it saves the embedding request, and its ranking is
+        fused with BM25 over the full ``query`` so the answer still steers retrieval.
+        """
+        if not self.doc_chunks or not len(self.chunk_index):
             return []
 
-    def generate_next_question(self) -> str:
-        conversation = self._format_conversation_history()
+        speculative = query_embedding is not None
+        if query_embedding is None and self.retrieval_mode != "lexical" and self._dense_index_ready():
+            try:
+                query_embedding = await self._embed_query_async(query)
+            except Exception as e:
+                logger.warning("Error in _get_relevant_chunks_async: %s", e)
+        with span("retrieve", mode=self.retrieval_mode):
+            return self._rank_chunks(query, query_embedding, top_k, fuse_lexical=speculative)
+
+    def _needs_elaboration(self) -> bool:
+        """Short last answers get a follow-up asking for more detail"""
+        return bool(self.conversation_history) and len(self.conversation_history[-1]['response'].split()) < 5
+
+    def _needs_doc_context(self) -> bool:
+        return self.project_info['goal'] == 'diagnostic'
+
+    @timed("prompt_build", prompt="question")
+    def _build_question_prompt(self, relevant_chunks: List[str]) -> str:
+        """The per-turn part of a question prompt; it follows the fixed ``_get_prompt_prefix``"""
         one_word_count = sum(1 for r in self.conversation_history if len(r['response'].split()) == 1)
         conversation_stage = len(self.conversation_history)
 
@@ -117,39 +622,207 @@ class UserResearchPlatform:
             self.conversation_history) >= 3 else self.conversation_history
         low_quality_count = sum(1 for r in recent_responses if len(r['response'].split()) < 3)
 
+        budget = self._turn_token_budget()
+        builder = PromptBuilder(self.tokenizer, budget, self._token_counts)
+        builder.add_section("conversation", self._format_conversation_turns(), priority=0, keep="tail",
+                            reserve=budget // 3)
+        if self._needs_doc_context():
+            # A product context sent whole in the prefix already contains any chunk cut from it
+            if self._prompt_prefix["product_context_whole"]:
+                product_context = self.product_context or self.project_info.get('product_context') or ''
+                relevant_chunks = [chunk for chunk in relevant_chunks if chunk not in product_context]
+            builder.add_section("doc_context", relevant_chunks, priority=1, reserve=budget // 3)
+
+        # Get the turn prompt based on project goal and conversation stage, then add quality metrics and style guide
+        prompt = builder.render(lambda sections: self._add_quality_metrics_and_style(
+            self._get_turn_prompt(sections, conversation_stage), low_quality_count, one_word_count))
+        self.last_prompt_tokens = {"prefix": self._prompt_prefix["tokens"], **builder.section_tokens,
+                                   "total": self._prompt_prefix["tokens"] + builder.total_tokens}
+        return prompt
+
+    def generate_next_question(self) -> str:
         # Handle short responses first
-        if self.conversation_history and len(self.conversation_history[-1]['response'].split()) < 5:
-            return self._generate_elaboration_question(conversation)
+        if self._needs_elaboration():
+            return self._generate_elaboration_question()
+
+        conversation = self._format_conversation_history()
+        relevant_chunks = self._get_relevant_chunks(conversation) if self._needs_doc_context() else []
+        prompt = self._build_question_prompt(relevant_chunks)
 
-        # Get base prompt based on project goal and conversation stage
-        base_prompt = self._get_base_prompt(conversation, conversation_stage)
+        try:
+            return self._make_gpt_call(prompt, self._question_task())
+        except Exception as e:
+            logger.error("Error generating question: %s", e)
+            return None
 
-        # Add quality metrics and style guide
-        prompt = self._add_quality_metrics_and_style(base_prompt, low_quality_count, one_word_count)
+    async def generate_next_question_async(self) -> str:
+        """Async variant of ``generate_next_question``; never blocks the event loop on OpenAI"""
+        question = await self._generate_next_question_async()
+        if question:
+            self.prepare_next_turn()
+        return question
+
+    async def _generate_next_question_async(self) -> str:
+        if self._needs_elaboration():
+            return await self._generate_elaboration_question_async()
+
+        conversation = self._format_conversation_history()
+        query_embedding = await self._speculative_query_embedding()
+        relevant_chunks = await self._get_relevant_chunks_async(
+            conversation, query_embedding=query_embedding) if self._needs_doc_context() else []
+        prompt = self._build_question_prompt(relevant_chunks)
 
         try:
-            return self._make_gpt_call(prompt)
+            return await self._make_gpt_call_async(prompt, self._question_task())
         except Exception as e:
-            print(f"Error generating question: {e}")
+            logger.error("Error generating question: %s", e)
             return None
 
-    def _get_base_prompt(self, conversation: str, conversation_stage: int) -> str:
-        """Get the appropriate base prompt based on project goal and conversation stage."""
-        is_diagnostic = self.project_info['goal'] == 'diagnostic'
-        is_first_question = conversation_stage == 0
-        if is_diagnostic:
-            objective = self.project_info.get('improvement_objective', '')
-            relevant_chunks = self._get_relevant_chunks(conversation) if hasattr(self, 'doc_chunks') else []
-            doc_context = "\n".join(relevant_chunks)
-            product_context = self.product_context or self.project_info.get('product_context', '')
-            product_name = self.project_info.get('product_name', '')
+    async def stream_next_question_async(self):
+        """Stream the next question as text deltas; ``current_question`` is set once it completes"""
+        elaborating = self._needs_elaboration()
 
-            return f"""
+        if elaborating and self.router.is_templated("elaboration"):
+            yield self._template_elaboration_question()
+            self.prepare_next_turn()
+            return
+        if elaborating:
+            task, prompt = "elaboration", self._get_elaboration_prompt()
+        else:
+            conversation = self._format_conversation_history()
+            query_embedding = await self._speculative_query_embedding()
+            relevant_chunks = await self._get_relevant_chunks_async(
+                conversation, query_embedding=query_embedding) if self._needs_doc_context() else []
+            task, prompt = self._question_task(), self._build_question_prompt(relevant_chunks)
+
+        streamed = False
+        try:
+            async for token in self._stream_gpt_call_async(prompt, task):
+                streamed = True
+                yield token
+        except Exception:
+            if streamed or not elaborating:
+                raise
+            self.current_question = "I'd love to hear more about that. Could you share a specific example?"
+            yield self.current_question
+        self.prepare_next_turn()
+
+    def prepare_next_turn(self):
+        """Start the next turn's work that does not depend on the answer, once a question is sent.
+
+        While the interviewee types, the prompt prefix is brought up to date, the conversation
+        so far is tokenized and, in dense and hybrid retrieval, the next query is embedded from
+        the history and the question just asked. The next turn then only ranks chunks locally,
+        fusing that embedding's ranking with BM25 over the history including the new answer,
+        and tokenizes the answer before its model request. Needs a running event loop.
+        """
+        previous = self._speculation
+        if previous and not previous["task"].done():
+            previous["task"].cancel()
+        self._speculation = None
+        if not self.speculate or not self.current_question:
+            return
+        try:
+            task = asyncio.get_running_loop().create_task(self._speculate())
+        except RuntimeError:
+            return
+        self._speculation = {"turns": len(self.conversation_history), "document_version": self.document_version,
+                             "task": task}
+
+    def _count_turn_tokens(self, turns: List[str]) -> Dict[str, int]:
+        self._get_prompt_prefix()
+        return {turn: len(self.tokenizer.encode(turn, disallowed_special=())) for turn in turns}
+
+    async def _speculate(self) -> Optional[List[float]]:
+        """Background part of ``prepare_next_turn``; returns the speculative query embedding, if any"""
+        try:
+            turns = self._format_conversation_turns()
+            self._token_counts = await asyncio.to_thread(self._count_turn_tokens, turns)
+            if not (self._needs_doc_context() and self.doc_chunks and len(self.chunk_index)
+                    and self.retrieval_mode != "lexical" and self._dense_index_ready()):
+                return None
+            return await self._embed_query_async("\n".join(turns + [f"Q: {self.current_question}\nA: "]))
+        except Exception as e:
+            logger.error("Error preparing the next turn: %s", e)
+            return None
+
+    async def _speculative_query_embedding(self) -> Optional[List[float]]:
+        """The query embedding from ``prepare_next_turn``, if it was made for this turn and document"""
+        speculation, self._speculation = self._speculation, None
+        if speculation is None:
+            return None
+        task = speculation["task"]
+        if (speculation["turns"] != len(self.conversation_history) - 1
+                or speculation["document_version"] != self.document_version or task.cancelled()):
+            task.cancel()
+            result, embedding = "stale", None
+        else:
+            embedding = await task
+            result = "hit" if embedding is not None else "none"
+        REGISTRY.inc(f"{PREFIX}_speculative_turns_total",
+                     help_text="Turns prepared while the interviewee typed, by whether a query embedding "
+                               "was reused (hit), not needed (none) or outdated (stale)",
+                     result=result)
+        return embedding
+
+    def _question_task(self) -> str:
+        return "question" if self.conversation_history else "first_question"
+
+    def _turn_token_budget(self) -> int:
+        """Tokens left for the per-turn prompt once the fixed prefix is accounted for"""
+        return max(self.prompt_token_budget - self._get_prompt_prefix_tokens(), self.prompt_token_budget // 2)
+
+    def _get_prompt_prefix_tokens(self) -> int:
+        self._get_prompt_prefix()
+        return self._prompt_prefix["tokens"]
+
+    def _get_prompt_prefix(self) -> str:
+        """Instructions that are identical on every turn of this interview, sent as the system message.
+
+        The role, guidelines and product context come first and never change between turns,
+        so the provider can serve them from its prompt cache; only the retrieved chunks and
+        the conversation (``_get_turn_prompt``) follow. The product context is cut to a fixed
+        share of the budget so the prefix does not shift as the conversation grows.
+        """
+        key = (self.document_version, json.dumps(self.project_info, sort_keys=True, default=str))
+        if self._prompt_prefix and self._prompt_prefix["key"] == key:
+            return self._prompt_prefix["text"]
+
+        system_message = """You are having a natural, friendly conversation. Your role is to:
+                - Sound warm and genuinely interested
+                - Use conversational language and transitions
+                - Make people feel comfortable sharing their experiences
+                - Always acknowledge what they've said before asking something new
+                - Never sound like you're conducting a formal interview
+                """
+        product_context_whole = True
+        if self._needs_doc_context():
+            product_context = self.product_context or self.project_info.get('product_context') or ''
+            limit = self.prompt_token_budget // 4
+            # A token is rarely longer than ten characters, so this much text holds the first ``limit`` tokens
+            tokens = self.tokenizer.encode(product_context[:limit * 10], disallowed_special=())
+            if len(tokens) > limit or len(product_context) > limit * 10:
+                product_context = self.tokenizer.decode(tokens[:limit])
+                product_context_whole = False
+            instructions = self._get_diagnostic_instructions(product_context)
+        else:
+            instructions = self._get_discovery_instructions()
+
+        text = f"{system_message}\n{instructions}"
+        self._prompt_prefix = {"key": key, "text": text,
+                               "tokens": len(self.tokenizer.encode(text, disallowed_special=())),
+                               "product_context_whole": product_context_whole}
+        return text
+
+    def _get_diagnostic_instructions(self, product_context: str) -> str:
+        objective = self.project_info.get('improvement_objective', '')
+        product_name = self.project_info.get('product_name', '')
+        return f"""
                                    ROLE: You are a professional research interviewer conducting diagnostic research to uncover insights about {product_name}. 
                                    Your goal is to identify user challenges, blockers, and opportunities for improvement.
 
                                    Objective: Your task is to explore the reasons behind the specific issue outlined in the  {objective} and gather actionable insights to improve the user experience. 
-                                   You will use the {product_context} and/OR {doc_context} to ask smarter, context-aware questions and ensure the conversation stays focused on achieving the Objective.:
+                                   You will use the PRODUCT CONTEXT and/OR DOC CONTEXT below to ask smarter, context-aware questions and ensure the conversation stays focused on achieving the Objective.:
 
                                                "Interviewing Users" by Steve Portigal (for effective interviewing techniques)
 
@@ -170,7 +843,7 @@ class UserResearchPlatform:
                                        1. PRODUCT NAME: {product_name}
                                        2. PRODUCT CONTEXT: {product_context}
                                        3. OBJECTIVE: {objective}
-                                       4. DOC CONTEXT: {doc_context}
+                                       4. DOC CONTEXT: given with each turn, after these instructions
 
                                     GUIDELINES:
                                        1. **Tone**: Use a friendly, conversational, and non-judgmental tone.
@@ -194,7 +867,7 @@ class UserResearchPlatform:
                                    Explore problems they mention and ask for concrete examples.
                                    Understand the frequency and impact of the issues.
                                    Investigate workarounds or alternatives and their preferences.
-                                   Leverage {product_context} to enrich the conversation.
+                                   Leverage the PRODUCT CONTEXT to enrich the conversation.
                                    Use additional data where necessary to provide insights.
 
 
@@ -204,8 +877,6 @@ class UserResearchPlatform:
                                    Probe for context and follow issues upstream.
                                    Record frequency and severity of challenges.
 
-                                   Previous Conversation: {conversation}
-
                                        OUTPUT REQUIREMENTS:
                                        Generate one clear, natural question that:
                                        1. Aligns with the current stage and {objective}.
@@ -215,18 +886,15 @@ class UserResearchPlatform:
 
                                    Output: Conduct the interview as a natural conversation, 
                                    adapting your questions based on the user's responses. 
-                                   Use the {product_context} to ask smarter, more relevant questions and ensure the conversation stays 
+                                   Use the PRODUCT CONTEXT to ask smarter, more relevant questions and ensure the conversation stays 
                                    focused on achieving the {objective}.  
 
                                    """
-        else:
-            # Original discovery case remains unchanged
-            base_prompt = f"""
+
+    def _get_discovery_instructions(self) -> str:
+        return f"""
                                    You are having a friendly conversation with a {self.project_info['target_audience']} about their experiences and work.
                                    Project Context: {self.project_info['project_name']}
-                                   Conversation Stage: {'First question - Start fresh' if is_first_question else 'Continuing conversation'}
-
-                                   {'' if is_first_question else f'Conversation History:\n{conversation}'}
 
                                    First Question Strategy:
                                    - For teens: Start with a simple, specific question about their interests or daily life
@@ -256,18 +924,35 @@ class UserResearchPlatform:
                                    - Ask about specific activities or habits
                                    - Let them guide the conversation to challenges naturally
                                    - Use concrete examples they can relate to
+
+                                   3. Follow-up Strategy (after the first question):
+                                   - Reference specific details from their previous answers
+                                   - Build naturally on what they've shared
+                                   - Show genuine interest in their perspective
+                                   - Use their own words when possible
+                                   """
+
+    def _get_turn_prompt(self, sections: Dict[str, str], conversation_stage: int) -> str:
+        """The part of the prompt that changes every turn, based on project goal and conversation stage.
+
+        ``sections`` holds the budgeted conversation and, for diagnostic projects, doc context;
+        each is interpolated exactly once.
+        """
+        is_first_question = conversation_stage == 0
+        conversation = sections["conversation"]
+        if self._needs_doc_context():
+            return f"""
+                                   DOC CONTEXT: {sections["doc_context"]}
+
+                                   Previous Conversation: {conversation}
                                    """
 
-            if not is_first_question:
-                base_prompt += """
-                                       3. Follow-up Strategy:
-                                       - Reference specific details from their previous answers
-                                       - Build naturally on what they've shared
-                                       - Show genuine interest in their perspective
-                                       - Use their own words when possible
-                                       """
+        history = '' if is_first_question else f"Conversation History:\n{conversation}"
+        return f"""
+                                   Conversation Stage: {'First question - Start fresh' if is_first_question else 'Continuing conversation'}
 
-            return base_prompt
+                                   {history}
+                                   """
 
     def _add_quality_metrics_and_style(self, base_prompt: str, low_quality_count: int, one_word_count: int) -> str:
         """Add response quality metrics and style guide to the prompt."""
@@ -290,10 +975,37 @@ class UserResearchPlatform:
                 3. Asks about their experiences
                 """
 
-    def _generate_elaboration_question(self, conversation: str) -> str:
+    def _template_elaboration_question(self) -> str:
+        """Follow-up for a short response built from a template, without a model request"""
+        self.last_usage = {}
+        self.current_question = template_elaboration(self.conversation_history[-1]['response'])
+        self.router.record("elaboration", TEMPLATE, "template")
+        return self.current_question
+
+    def _generate_elaboration_question(self) -> str:
         """Generate a follow-up question for short responses."""
+        if self.router.is_templated("elaboration"):
+            return self._template_elaboration_question()
+        try:
+            return self._make_gpt_call(self._get_elaboration_prompt(), "elaboration")
+        except Exception:
+            return "I'd love to hear more about that. Could you share a specific example?"
+
+    async def _generate_elaboration_question_async(self) -> str:
+        """Async variant of ``_generate_elaboration_question``"""
+        if self.router.is_templated("elaboration"):
+            return self._template_elaboration_question()
+        try:
+            return await self._make_gpt_call_async(self._get_elaboration_prompt(), "elaboration")
+        except Exception:
+            return "I'd love to hear more about that. Could you share a specific example?"
+
+    @timed("prompt_build", prompt="elaboration")
+    def _get_elaboration_prompt(self) -> str:
         last_response = self.conversation_history[-1]['response']
-        elaboration_prompt = f"""
+        builder = PromptBuilder(self.tokenizer, self._turn_token_budget(), self._token_counts)
+        builder.add_section("conversation", self._format_conversation_turns(), priority=0, keep="tail")
+        prompt = builder.render(lambda sections: f"""
             Their response was: "{last_response}"
     
             Create a warm, friendly follow-up that:
@@ -303,128 +1015,372 @@ class UserResearchPlatform:
             4. Uses casual, conversational language
     
             Previous conversation:
-            {conversation}
+            {sections["conversation"]}
     
             Remember to:
             - Use their exact words in your acknowledgment
             - Keep the tone friendly and curious
             - Make them feel comfortable sharing more
-            """
-
-        try:
-            return self._make_gpt_call(elaboration_prompt)
-        except Exception:
-            return "I'd love to hear more about that. Could you share a specific example?"
-
-    def _make_gpt_call(self, prompt: str) -> str:
-            """Make the API call to GPT-4."""
-            system_message = """You are having a natural, friendly conversation. Your role is to:
-                - Sound warm and genuinely interested
-                - Use conversational language and transitions
-                - Make people feel comfortable sharing their experiences
-                - Always acknowledge what they've said before asking something new
-                - Never sound like you're conducting a formal interview
-                """
-
-            print("\n=== GPT Prompt ===")
-            print(prompt)
-            print("=================\n")
-
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": system_message},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7
+            """)
+        self.last_prompt_tokens = {**builder.section_tokens, "total": builder.total_tokens}
+        return prompt
+
+    def _get_question_messages(self, prompt: str) -> List[Dict]:
+        """Fixed per-interview prefix as the system message, then this turn's prompt"""
+        messages = [
+            {"role": "system", "content": self._get_prompt_prefix()},
+            {"role": "user", "content": prompt}
+        ]
+        log_prompt("question", messages)
+        return messages
+
+    def _estimate_chat_tokens(self, messages: List[Dict], completion_tokens: int) -> int:
+        """Up-front rate-limit cost of a chat request; the scheduler corrects it from ``usage``"""
+        return estimate_tokens([message["content"] for message in messages], completion_tokens)
+
+    def _chat_completion(self, messages: List[Dict], completion_tokens: int, priority: int, task: str,
+                         temperature: float = 0.7) -> str:
+        """Text of one chat completion on the task's routed model, served from the completion cache
+        when it holds it (keyed on the primary model, whichever model answered)"""
+        def call(model: str) -> str:
+            response = self.scheduler.call_sync(
+                self.client.chat.completions.create,
+                tokens=self._estimate_chat_tokens(messages, completion_tokens),
+                priority=priority,
+                model=model,
+                messages=messages,
+                temperature=temperature
             )
-            question = response.choices[0].message.content.strip()
-            self.current_question = question
-            return question
-
-    def _format_conversation_history(self) -> str:
+            self.last_usage = usage_counts(response) or {}
+            return response.choices[0].message.content.strip()
+
+        def routed() -> str:
+            return self.router.complete(task, call)
+
+        self.last_usage = {}
+        if self.completion_cache is None:
+            return routed()
+        return self.completion_cache.complete(self.router.route(task).model, temperature, messages, routed)
+
+    async def _chat_completion_async(self, messages: List[Dict], completion_tokens: int, priority: int, task: str,
+                                     temperature: float = 0.7) -> str:
+        """Async variant of ``_chat_completion``"""
+        async def call(model: str) -> str:
+            response = await self.scheduler.call(
+                self.async_client.chat.completions.create,
+                tokens=self._estimate_chat_tokens(messages, completion_tokens),
+                priority=priority,
+                model=model,
+                messages=messages,
+                temperature=temperature
+            )
+            self.last_usage = usage_counts(response) or {}
+            return response.choices[0].message.content.strip()
+
+        async def routed() -> str:
+            return await self.router.complete_async(task, call)
+
+        self.last_usage = {}
+        if self.completion_cache is None:
+            return await routed()
+        return await self.completion_cache.complete_async(self.router.route(task).model, temperature, messages,
+                                                          routed)
+
+    def _make_gpt_call(self, prompt: str, task: str = "question") -> str:
+        """Make the API call for a question on the model routed for ``task``."""
+        messages = self._get_question_messages(prompt)
+        question = self._chat_completion(messages, self.question_completion_tokens, INTERACTIVE, task)
+        self.current_question = question
+        return question
+
+    async def _make_gpt_call_async(self, prompt: str, task: str = "question") -> str:
+        """Async variant of ``_make_gpt_call``"""
+        messages = self._get_question_messages(prompt)
+        question = await self._chat_completion_async(messages, self.question_completion_tokens, INTERACTIVE, task)
+        self.current_question = question
+        return question
+
+    async def _open_question_stream(self, model: str, messages: List[Dict], tokens: int):
+        """Start a streamed question and wait for its first chunk; returns (stream, chunks iterator, first chunk)"""
+        stream = await self.scheduler.call(
+            self.async_client.chat.completions.create,
+            tokens=tokens,
+            priority=INTERACTIVE,
+            model=model,
+            messages=messages,
+            temperature=0.7,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        chunks = stream.__aiter__()
+        try:
+            return stream, chunks, await chunks.__anext__()
+        except BaseException:
+            await stream.close()
+            raise
+
+    async def _stream_gpt_call_async(self, prompt: str, task: str = "question"):
+        """Streaming variant of ``_make_gpt_call_async``; a cached question arrives as one delta.
+
+        The route's deadline bounds the wait for the first chunk: past it (or on an error)
+        the question is streamed from the fallback model instead.
+        """
+        messages = self._get_question_messages(prompt)
+        route = self.router.route(task)
+        self.last_usage = {}
+        key = None
+        if self.completion_cache is not None:
+            key, question = await self.completion_cache.lookup_async(route.model, 0.7, messages)
+            if question is not None:
+                self.current_question = question
+                yield question
+                return
+        tokens = self._estimate_chat_tokens(messages, self.question_completion_tokens)
+        model, result = route.model, "primary"
+        if route.fallback and route.deadline is not None:
+            try:
+                opened = await asyncio.wait_for(self._open_question_stream(model, messages, tokens),
+                                                route.deadline)
+            except Exception:
+                model, result = route.fallback, "fallback"
+                opened = await self._open_question_stream(model, messages, tokens)
+        else:
+            opened = await self._open_question_stream(model, messages, tokens)
+        self.router.record(task, model, result)
+        stream, chunks, first = opened
+
+        async def all_chunks():
+            yield first
+            async for chunk in chunks:
+                yield chunk
+
+        parts = []
+        async for chunk in all_chunks():
+            if getattr(chunk, "usage", None):
+                # Only the final chunk reports usage
+                self.scheduler.settle(tokens, chunk)
+                self.last_usage = usage_counts(chunk) or {}
+            if not chunk.choices:
+                continue
+            token = chunk.choices[0].delta.content
+            if token:
+                parts.append(token)
+                yield token
+        self.current_question = "".join(parts).strip()
+        if key is not None:
+            await self.completion_cache.put_async(key, route.model, self.current_question)
+
+    def _format_conversation_turns(self, full: bool = False) -> List[str]:
+        """One Q/A block per exchange, oldest first; in rolling mode older turns come as a summary"""
         if not self.conversation_history:
-            return "No previous conversation."
+            return ["No previous conversation."]
+        if self.memory_mode == "rolling" and not full:
+            return self.conversation_memory.format_turns(self.conversation_history)
+        return [f"Q: {entry['question']}\nA: {entry['response']}" for entry in self.conversation_history]
 
-        formatted = []
-        for entry in self.conversation_history:
-            formatted.append(f"Q: {entry['question']}")
-            formatted.append(f"A: {entry['response']}")
-        return "\n".join(formatted)
+    def _format_conversation_history(self, full: bool = False) -> str:
+        return "\n".join(self._format_conversation_turns(full))
 
-    def analyze_interview(self, responses: List[Dict]) -> Dict:
+    @timed("prompt_build", prompt="analysis")
+    def _get_analysis_messages(self) -> List[Dict]:
         # Get document context
-        doc_context = ""
+        doc_context = []
         if self.product_context:
-            doc_context = self.product_context
+            doc_context = [self.product_context]
         elif self.doc_chunks:
-            doc_context = "\n".join(self.doc_chunks)
+            doc_context = self.doc_chunks
 
-        analysis_prompt = f"""
+        builder = PromptBuilder(self.tokenizer, self.analysis_token_budget)
+        builder.add_section("conversation", self._format_conversation_turns(full=True), priority=0, keep="tail",
+                            reserve=self.analysis_token_budget // 2)
+        builder.add_section("doc_context", doc_context, priority=1, reserve=self.analysis_token_budget // 4)
+        analysis_prompt = builder.render(lambda sections: f"""
             Analyze the user research interview for {self.project_info['project_name']}.
             Context: {self.project_info['goal']} research with {self.project_info['target_audience']}
     
             Product Documentation Context:
-            {doc_context}
+            {sections["doc_context"]}
     
             Conversation:
-            {self._format_conversation_history()}
+            {sections["conversation"]}
     
             Provide analysis in these sections:
-    
-            1. Key Findings and Documentation Alignment
-            - Compare user responses with product documentation
-            - Highlight any misalignments or misconceptions
-            - Identify feature requests that align/don't align with current capabilities
-    
-            2. Sentiment Analysis
-            - Overall emotional response [Positive/Negative/Neutral]
-            - Pain points and frustrations [Negative]
-            - Areas of enthusiasm [Positive]
-            - Concerns and uncertainties [Neutral]
-            - Each bullet point must include sentiment tag
-    
-            3. Market Opportunity
-            - Clear description of the problem worth solving
-            - Existing solutions and their limitations (based on documentation)
-            - Gaps between user needs and current capabilities
-    
-            4. Action Items
-            - List 3-5 specific next steps to validate these findings
-            - Each action item should be concrete and measurable
-            - Include expected outcome for each action
-    
-            5. Recommendations
-            - Specific features or solutions to consider
-            - Potential risks and mitigation strategies
-            - Priority order for implementation
-            """
+            {ANALYSIS_SECTIONS}""")
+        self.last_prompt_tokens = {**builder.section_tokens, "total": builder.total_tokens}
+
+        messages = [
+            {"role": "system", "content": ANALYST_SYSTEM_MESSAGE},
+            {"role": "user", "content": analysis_prompt}
+        ]
+        log_prompt("analysis", messages)
+        return messages
+
+    def _use_map_reduce(self) -> bool:
+        if self.analysis_mode != "auto":
+            return self.analysis_mode == "map_reduce"
+        document = [self.product_context] if self.product_context else self.doc_chunks
+        material = estimate_tokens(document + self._format_conversation_turns(full=True))
+        return material > self.analysis_token_budget
+
+    def _analysis_context_hash(self) -> str:
+        """Hash of everything besides the transcript that an analysis depends on"""
+        version = (self.document_version, len(self.doc_chunks))
+        if not self._document_hash or self._document_hash[:2] != version:
+            text = self.product_context or "\n".join(self.doc_chunks)
+            self._document_hash = (*version, document_hash(text))
+        return document_hash(json.dumps([self._document_hash[2], self.project_info, self.analysis_mode],
+                                        sort_keys=True, default=str))
+
+    def _history_hash(self, turns: Optional[int] = None) -> str:
+        history = self.conversation_history if turns is None else self.conversation_history[:turns]
+        return document_hash(json.dumps(history, sort_keys=True))
+
+    def _cached_analysis(self, context: str) -> Optional[Dict]:
+        last = self.last_analysis
+        if (last and last["context"] == context and last["turns"] == len(self.conversation_history)
+                and last["history"] == self._history_hash()):
+            return {"analysis": last["analysis"], "cached": True, "result_id": last.get("result_id")}
+        return None
+
+    def _can_update_analysis(self, context: str) -> bool:
+        """Whether the last analysis covers a prefix of this transcript and can be extended with the rest"""
+        last = self.last_analysis
+        if not last or last["context"] != context or last["updates"] >= self.max_incremental_updates:
+            return False
+        if not 0 < last["turns"] < len(self.conversation_history) or last["history"] != self._history_hash(last["turns"]):
+            return False
+        new_turns = self._format_new_turns(last["turns"])
+        return estimate_tokens(new_turns + [last["analysis"]]) <= self.analysis_token_budget * 3 // 4
+
+    def _format_new_turns(self, since: int) -> List[str]:
+        return [f"Q: {entry['question']}\nA: {entry['response']}" for entry in self.conversation_history[since:]]
+
+    @timed("prompt_build", prompt="incremental_analysis")
+    def _get_incremental_analysis_messages(self, relevant_chunks: List[str]) -> List[Dict]:
+        last = self.last_analysis
+        builder = PromptBuilder(self.tokenizer, self.analysis_token_budget)
+        builder.add_section("new_turns", self._format_new_turns(last["turns"]), priority=0, keep="tail")
+        builder.add_section("doc_context", relevant_chunks, priority=1)
+        analysis_prompt = builder.render(lambda sections: f"""
+            You analyzed the first {last["turns"]} exchanges of a user research interview for
+            {self.project_info['project_name']}.
+            Context: {self.project_info['goal']} research with {self.project_info['target_audience']}
 
+            Your analysis so far:
+            {last["analysis"]}
+
+            New exchanges since that analysis:
+            {sections["new_turns"]}
+
+            Product documentation relevant to the new exchanges:
+            {sections["doc_context"]}
+
+            Update the analysis to take the new exchanges into account. Revise or drop points the
+            new answers contradict, add what they reveal, and leave the rest as it was. Return the
+            complete updated analysis in the same sections:
+            {ANALYSIS_SECTIONS}""")
+        self.last_prompt_tokens = {**builder.section_tokens, "total": builder.total_tokens}
+
+        messages = [
+            {"role": "system", "content": ANALYST_SYSTEM_MESSAGE},
+            {"role": "user", "content": analysis_prompt}
+        ]
+        log_prompt("analysis", messages)
+        return messages
+
+    def _remember_analysis(self, context: str, analysis: str, incremental: bool) -> Dict:
+        self.last_analysis = {
+            "context": context,
+            "turns": len(self.conversation_history),
+            "history": self._history_hash(),
+            "updates": self.last_analysis["updates"] + 1 if incremental else 0,
+            "analysis": analysis,
+            "result_id": None,
+        }
+        return {"analysis": analysis, "incremental": incremental}
+
+    @staticmethod
+    def _record_analysis(result: Dict, seconds: float):
+        if result.get("cached"):
+            kind = "cached"
+        elif "incremental" in result:
+            kind = "incremental" if result["incremental"] else "full"
+        else:
+            kind = "failed"
+        REGISTRY.observe_stage("analysis", seconds, outcome="error" if kind == "failed" else "ok", result=kind)
+        REGISTRY.inc(f"{PREFIX}_analysis_requests_total", help_text="Interview analyses by how they were produced",
+                     result=kind)
+
+    def analyze_interview(self, responses: List[Dict]) -> Dict:
+        start = time.perf_counter()
+        result = self._analyze_interview(responses)
+        self._record_analysis(result, time.perf_counter() - start)
+        return result
+
+    async def analyze_interview_async(self, responses: List[Dict]) -> Dict:
+        """Async variant of ``analyze_interview``"""
+        start = time.perf_counter()
+        result = await self._analyze_interview_async(responses)
+        self._record_analysis(result, time.perf_counter() - start)
+        return result
+
+    def _analyze_interview(self, responses: List[Dict]) -> Dict:
+        context = self._analysis_context_hash()
+        cached = self._cached_analysis(context)
+        if cached:
+            return cached
+        incremental = self._can_update_analysis(context)
+        # Map-reduce runs on the async client only; in "auto" mode sync callers get the single
+        # prompt, trimmed to the analysis budget
+        if self.analysis_mode == "map_reduce" and not incremental:
+            raise RuntimeError("Map-reduce analysis is async only, use analyze_interview_async")
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system",
-                     "content": "You are an expert user researcher and business analyst. Always verify information against provided documentation before making statements about product capabilities."},
-                    {"role": "user", "content": analysis_prompt}
-                ],
-                temperature=0.7
-            )
-            return {"analysis": response.choices[0].message.content.strip()}
+            if incremental:
+                new_turns = "\n".join(self._format_new_turns(self.last_analysis["turns"]))
+                messages = self._get_incremental_analysis_messages(self._get_relevant_chunks(new_turns, top_k=3))
+            else:
+                messages = self._get_analysis_messages()
+            analysis = self._chat_completion(messages, self.analysis_completion_tokens, BACKGROUND, "analysis")
+            return self._remember_analysis(context, analysis, incremental)
         except Exception as e:
-            print(f"Error analyzing interview: {e}")
+            logger.error("Error analyzing interview: %s", e)
             return {"analysis": "Analysis failed due to error"}
 
-    def save_results(self, analysis: Dict) -> None:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"interview_{timestamp}.json"
+    async def _analyze_interview_async(self, responses: List[Dict]) -> Dict:
+        context = await asyncio.to_thread(self._analysis_context_hash)
+        cached = self._cached_analysis(context)
+        if cached:
+            return cached
+        incremental = self._can_update_analysis(context)
+        if self._use_map_reduce() and not incremental:
+            try:
+                analyzer = MapReduceAnalyzer(self, self.summary_cache, model=self.router.route("analysis").model)
+                analysis = await analyzer.analyze()
+                return self._remember_analysis(context, analysis, incremental=False)
+            except Exception as e:
+                logger.error("Error analyzing interview: %s", e)
+                return {"analysis": "Analysis failed due to error"}
+        try:
+            if incremental:
+                new_turns = "\n".join(self._format_new_turns(self.last_analysis["turns"]))
+                relevant_chunks = await self._get_relevant_chunks_async(new_turns, top_k=3)
+                messages = self._get_incremental_analysis_messages(relevant_chunks)
+            else:
+                messages = self._get_analysis_messages()
+            analysis = await self._chat_completion_async(messages, self.analysis_completion_tokens, BACKGROUND,
+                                                         "analysis")
+            return self._remember_analysis(context, analysis, incremental)
+        except Exception as e:
+            logger.error("Error analyzing interview: %s", e)
+            return {"analysis": "Analysis failed due to error"}
 
+    def save_results(self, analysis: Dict, store, session_id: Optional[str] = None) -> str:
+        """Queue the finished interview in the results store and return its result id"""
         results = {
             "project_info": self.project_info,
             "conversation_history": self.conversation_history,
             "analysis": analysis["analysis"]
         }
-
-        with open(filename, 'w') as f:
-            json.dump(results, f, indent=2)
-        print(f"\nResults saved to {filename}")
+        result_id = store.append("interview", results, session_id=session_id, project_info=self.project_info)
+        logger.info("Results saved as %s", result_id)
+        return result_id
@@ -0,0 +1,34 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+
+class _Tokenizer:
+    """Stand-in for the cl100k_base encoding, which tiktoken downloads on first use"""
+
+    def encode(self, text, **kwargs):
+        return list(text.encode("utf-8"))
+
+    def decode(self, tokens):
+        return bytes(tokens).decode("utf-8", errors="ignore")
+
+
+@pytest.fixture(autouse=True)
+def offline_tokenizer(monkeypatch):
+    import tiktoken
+    monkeypatch.setattr(tiktoken, "get_encoding", lambda name: _Tokenizer())
+
+
+@pytest.fixture(scope="session")
+def server(tmp_path_factory):
+    """The API module, imported in a scratch directory since it opens its stores under ./results"""
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("server"))
+    try:
+        import main
+    finally:
+        os.chdir(cwd)
+    return main
@@ -0,0 +1,149 @@
+from types import SimpleNamespace
+import asyncio
+
+import pytest
+
+from analysis_engine import DocumentSummaryCache, MapReduceAnalyzer
+from user_research_platform import UserResearchPlatform
+
+
+def interviewed_platform() -> UserResearchPlatform:
+    platform = UserResearchPlatform("sk-test")
+    platform.project_info = {"project_name": "Exports", "goal": "diagnostic", "target_audience": "ops"}
+    platform.product_context = "Acme exports invoices to CSV nightly. " * 400
+    platform.current_question = "How do exports fail?"
+    platform.record_response("They time out on large invoices and we split them by hand.")
+    return platform
+
+
+def test_sync_analysis_refuses_map_reduce():
+    platform = interviewed_platform()
+    platform.analysis_mode = "map_reduce"
+
+    with pytest.raises(RuntimeError, match="analyze_interview_async"):
+        platform.analyze_interview(platform.conversation_history)
+
+
+def test_sync_analysis_uses_the_single_prompt_in_auto_mode(monkeypatch):
+    platform = interviewed_platform()
+    platform.analysis_token_budget = 500
+    assert platform._use_map_reduce()
+    calls = []
+    monkeypatch.setattr(platform, "_chat_completion", lambda messages, *args: calls.append(messages) or "Findings")
+
+    result = platform.analyze_interview(platform.conversation_history)
+
+    assert result["analysis"] == "Findings"
+    assert len(calls) == 1
+
+
+class _AnalysisScheduler:
+    """Answers map, merge and summary prompts with short canned notes and records them"""
+
+    def __init__(self):
+        self.prompts = []
+
+    async def call(self, create, **kwargs):
+        prompt = kwargs["messages"][-1]["content"]
+        self.prompts.append(prompt)
+        if "Summarize this part" in prompt or "Merge these summaries" in prompt:
+            text = "The product exports invoices."
+        elif "Interview excerpt" in prompt:
+            text = "Exports time out."
+        else:
+            text = "Report"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))], usage=None)
+
+
+def test_map_reduce_analyses_each_window_and_reuses_the_document_summary(tmp_path):
+    platform = interviewed_platform()
+    for i in range(5):
+        platform.current_question = f"What happened on day {i}?"
+        platform.record_response("The export of the invoice batch timed out again. " * 10)
+    platform.analysis_mode = "map_reduce"
+    platform.scheduler = _AnalysisScheduler()
+    platform.summary_cache = DocumentSummaryCache(str(tmp_path / "summaries.sqlite3"))
+    windows = MapReduceAnalyzer(platform)._windows(platform._format_conversation_turns(full=True), 2500)
+
+    result = asyncio.run(platform.analyze_interview_async(platform.conversation_history))
+
+    prompts = platform.scheduler.prompts
+    assert result["analysis"] == "Report"
+    assert len(windows) > 1
+    assert sum("Interview excerpt" in prompt for prompt in prompts) == len(windows)
+    assert "The product exports invoices." in prompts[-1]
+    assert "Part 2:" in prompts[-1]
+
+    # Another session on the same document takes the summary from the shared cache
+    other = interviewed_platform()
+    other.analysis_mode = "map_reduce"
+    other.scheduler = _AnalysisScheduler()
+    other.summary_cache = platform.summary_cache
+    asyncio.run(other.analyze_interview_async(other.conversation_history))
+    assert not any("Summarize this part" in prompt for prompt in other.scheduler.prompts)
+
+
+def test_windows_keep_whole_turns_and_cut_a_lone_oversized_one():
+    analyzer = MapReduceAnalyzer(interviewed_platform())
+
+    windows = analyzer._windows(["a" * 4, "b" * 4, "c" * 4, "d" * 20], 10)
+
+    assert windows == [["a" * 4, "b" * 4], ["c" * 4], ["d" * 10]]
+
+
+def answer(platform: UserResearchPlatform, question: str, response: str):
+    platform.current_question = question
+    platform.record_response(response)
+
+
+def recording_completions(platform: UserResearchPlatform, monkeypatch) -> list:
+    prompts = []
+
+    def complete(messages, *args):
+        prompts.append(messages[-1]["content"])
+        return f"Analysis {len(prompts)}"
+
+    monkeypatch.setattr(platform, "_chat_completion", complete)
+    return prompts
+
+
+def test_an_unchanged_interview_reuses_the_last_analysis(monkeypatch):
+    platform = interviewed_platform()
+    prompts = recording_completions(platform, monkeypatch)
+
+    first = platform.analyze_interview(platform.conversation_history)
+    again = platform.analyze_interview(platform.conversation_history)
+
+    assert first == {"analysis": "Analysis 1", "incremental": False}
+    assert again["analysis"] == "Analysis 1" and again["cached"]
+    assert len(prompts) == 1
+
+
+def test_new_turns_update_the_last_analysis(monkeypatch):
+    platform = interviewed_platform()
+    prompts = recording_completions(platform, monkeypatch)
+    platform.analyze_interview(platform.conversation_history)
+
+    answer(platform, "What do you do then?", "We rerun the export by hand the next morning.")
+    result = platform.analyze_interview(platform.conversation_history)
+
+    assert result == {"analysis": "Analysis 2", "incremental": True}
+    assert "Analysis 1" in prompts[1]
+    assert "We rerun the export by hand" in prompts[1]
+    assert "split them by hand" not in prompts[1]
+
+
+def test_a_full_analysis_follows_too_many_updates_or_an_edited_history(monkeypatch):
+    platform = interviewed_platform()
+    recording_completions(platform, monkeypatch)
+    platform.max_incremental_updates = 1
+    platform.analyze_interview(platform.conversation_history)
+
+    answer(platform, "What do you do then?", "We rerun the export by hand the next morning.")
+    assert platform.analyze_interview(platform.conversation_history)["incremental"]
+    answer(platform, "Who notices?", "The finance team, usually on Monday.")
+    assert not platform.analyze_interview(platform.conversation_history)["incremental"]
+
+    platform.conversation_history[0]["response"] = "Exports never fail."
+    answer(platform, "Anything else?", "No, that covers it.")
+    assert not platform.analyze_interview(platform.conversation_history)["incremental"]
@@ -0,0 +1,65 @@
+from types import SimpleNamespace
+import asyncio
+
+from user_research_platform import UserResearchPlatform
+
+
+def chat_response(text: str) -> SimpleNamespace:
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=f" {text} "))], usage=None)
+
+
+class _AsyncScheduler:
+    """Answers chat requests on the async path only; a sync call would block the event loop"""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.requests = []
+
+    async def call(self, create, **kwargs):
+        self.requests.append(kwargs)
+        await asyncio.sleep(0)
+        return chat_response(self.text)
+
+    def call_sync(self, create, **kwargs):
+        raise AssertionError("the async path made a blocking request")
+
+
+def interviewing_platform(answer: str) -> UserResearchPlatform:
+    platform = UserResearchPlatform("sk-test")
+    platform.project_info = {"project_name": "Exports", "goal": "diagnostic", "target_audience": "ops"}
+    platform.current_question = "How do exports fail?"
+    platform.record_response(answer)
+    return platform
+
+
+def test_the_next_question_is_generated_without_blocking_calls():
+    platform = interviewing_platform("They time out on large invoices and we split them by hand.")
+    platform.scheduler = _AsyncScheduler("What happens after you split them?")
+
+    question = asyncio.run(platform.generate_next_question_async())
+
+    assert question == "What happens after you split them?"
+    assert platform.current_question == question
+    assert [request["model"] for request in platform.scheduler.requests] == ["gpt-4"]
+
+
+def test_a_short_answer_gets_an_async_elaboration_question():
+    platform = interviewing_platform("Timeouts")
+    platform.scheduler = _AsyncScheduler("Could you walk me through the last timeout?")
+
+    question = asyncio.run(platform.generate_next_question_async())
+
+    assert question == "Could you walk me through the last timeout?"
+    assert "Timeouts" in platform.scheduler.requests[0]["messages"][-1]["content"]
+
+
+def test_a_failed_request_yields_no_question():
+    platform = interviewing_platform("They time out on large invoices and we split them by hand.")
+
+    async def unavailable(create, **kwargs):
+        raise RuntimeError("service unavailable")
+
+    platform.scheduler = SimpleNamespace(call=unavailable)
+
+    assert asyncio.run(platform.generate_next_question_async()) is None
+    assert platform.current_question == "How do exports fail?"
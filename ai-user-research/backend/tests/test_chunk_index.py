@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from chunk_index import ChunkIndex
+from embedding_space import EmbeddingSpaceMismatch
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float16", "int8"])
+def test_search_ranks_like_exact_cosine_across_row_blocks(dtype, monkeypatch):
+    monkeypatch.setattr(ChunkIndex, "SEARCH_BLOCK_ROWS", 7)
+    rng = np.random.default_rng(0)
+    embeddings = rng.normal(size=(50, 16)).astype(np.float32)
+    index = ChunkIndex(dtype)
+    index.add(embeddings[:20])
+    index.add(embeddings[20:])
+    query = embeddings[33] + 0.01 * rng.normal(size=16)
+
+    normalized = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    expected = np.argsort(-(normalized @ (query / np.linalg.norm(query))))[:3].tolist()
+
+    assert index.search(query, 3) == expected
+    assert index.search(query, 3)[0] == 33
+
+
+def test_search_refuses_queries_from_another_space():
+    index = ChunkIndex(space="text-embedding-3-small")
+    index.add([[1.0, 0.0]])
+
+    with pytest.raises(EmbeddingSpaceMismatch):
+        index.search([1.0, 0.0], 1, space="text-embedding-3-large")
+    assert index.search([1.0, 0.0], 1, space="text-embedding-3-small") == [0]
+
+
+def test_rows_keep_their_order_as_the_matrix_grows():
+    index = ChunkIndex("int8", space="text-embedding-3-small")
+    embeddings = np.eye(40, dtype=np.float32)
+    for start in range(0, 40, 3):
+        index.add(embeddings[start:start + 3])
+
+    assert len(index) == 40
+    assert [index.search(row, 1)[0] for row in embeddings] == list(range(40))
+
+
+def test_state_round_trip_drops_spare_capacity():
+    index = ChunkIndex("float16", space="text-embedding-3-small")
+    index.add([[1.0, 0.0], [0.6, 0.8], [0.0, 1.0]])
+
+    restored = ChunkIndex.from_state(index.to_state())
+
+    assert restored.nbytes == index.nbytes == 3 * 2 * 2
+    assert restored.space == "text-embedding-3-small"
+    assert restored.search([0.5, 0.9], 3) == index.search([0.5, 0.9], 3) == [1, 2, 0]
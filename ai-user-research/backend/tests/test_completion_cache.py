@@ -0,0 +1,69 @@
+import pytest
+
+from completion_cache import CompletionCache, CompletionCacheMiss
+
+MESSAGES = [{"role": "system", "content": "Interviewer"}, {"role": "user", "content": "Ask the first question"}]
+
+
+def answer(responses: list):
+    def call() -> str:
+        responses.append(f"Question {len(responses) + 1}?")
+        return responses[-1]
+    return call
+
+
+def test_off_always_calls_and_stores_nothing(tmp_path):
+    cache, calls = CompletionCache(str(tmp_path / "c.sqlite3"), mode="off"), []
+
+    cache.complete("gpt-4", 0.7, MESSAGES, answer(calls))
+    cache.complete("gpt-4", 0.7, MESSAGES, answer(calls))
+
+    assert calls == ["Question 1?", "Question 2?"]
+    assert cache.stats()["entries"] == 0
+
+
+def test_cache_serves_prompts_that_differ_only_in_whitespace(tmp_path):
+    cache, calls = CompletionCache(str(tmp_path / "c.sqlite3"), mode="cache"), []
+    reindented = [dict(message, content=f"  {message['content']}\n    ") for message in MESSAGES]
+
+    first = cache.complete("gpt-4", 0.7, MESSAGES, answer(calls))
+
+    assert cache.complete("gpt-4", 0.7, reindented, answer(calls)) == first
+    assert cache.complete("gpt-4", 0.2, MESSAGES, answer(calls)) == "Question 2?"
+    assert len(calls) == 2
+
+
+def test_replay_serves_what_record_captured_and_refuses_the_rest(tmp_path):
+    path, calls = str(tmp_path / "c.sqlite3"), []
+    recorder = CompletionCache(path, mode="record")
+    recorded = recorder.complete("gpt-4", 0.7, MESSAGES, answer(calls))
+    # A repeat within the recording run gets the same response without a call
+    assert recorder.complete("gpt-4", 0.7, MESSAGES, answer(calls)) == recorded
+    recorder.close()
+
+    replay = CompletionCache(path, mode="replay")
+
+    assert replay.complete("gpt-4", 0.7, MESSAGES, answer(calls)) == recorded
+    assert calls == [recorded]
+    with pytest.raises(CompletionCacheMiss):
+        replay.complete("gpt-4", 0.7, MESSAGES[:1], answer(calls))
+
+
+def test_a_new_recording_replaces_the_old_one(tmp_path):
+    path = str(tmp_path / "c.sqlite3")
+    CompletionCache(path, mode="record").complete("gpt-4", 0.7, MESSAGES, lambda: "Old question?")
+    CompletionCache(path, mode="record").complete("gpt-4", 0.7, MESSAGES, lambda: "New question?")
+
+    assert CompletionCache(path, mode="replay").complete("gpt-4", 0.7, MESSAGES, lambda: "") == "New question?"
+
+
+def test_the_server_default_is_off(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("COMPLETION_CACHE_MODE", raising=False)
+    from document_processor import DocumentProcessor
+
+    processor = DocumentProcessor()
+    try:
+        assert processor.completion_cache.mode == "off"
+    finally:
+        processor.results_store.close()
@@ -0,0 +1,93 @@
+from types import SimpleNamespace
+import asyncio
+
+from conversation_memory import ConversationMemory
+
+
+def history(turns: int) -> list:
+    return [{"question": f"Question {i}?", "response": f"Answer {i}."} for i in range(turns)]
+
+
+class _SummaryClient:
+    """Async chat client whose summary lists the questions it was asked to fold"""
+
+    def __init__(self, fail: bool = False):
+        self.prompts = []
+        self.fail = fail
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, model, messages, temperature):
+        self.prompts.append(messages[0]["content"])
+        await asyncio.sleep(0)
+        if self.fail:
+            raise RuntimeError("service unavailable")
+        folded = [line for line in messages[0]["content"].splitlines() if line.strip().startswith("Q:")]
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(
+            content=f" Covered {len(folded)} more exchanges. "))])
+
+
+def fold(memory: ConversationMemory, client, turns: list):
+    async def run():
+        memory.schedule_update(client, "gpt-4", turns)
+        if memory._task:
+            await memory._task
+    asyncio.run(run())
+
+
+def test_turns_beyond_the_recent_window_are_folded_into_the_summary():
+    memory = ConversationMemory(recent_turns=3)
+    turns = history(8)
+
+    fold(memory, _SummaryClient(), turns)
+
+    assert memory.summarized_count == 5
+    assert memory.format_turns(turns) == [
+        "Summary of the earlier conversation: Covered 5 more exchanges.",
+        "Q: Question 5?\nA: Answer 5.",
+        "Q: Question 6?\nA: Answer 6.",
+        "Q: Question 7?\nA: Answer 7.",
+    ]
+
+
+def test_turns_added_while_summarizing_are_folded_before_the_task_ends():
+    memory = ConversationMemory(recent_turns=2)
+    turns = history(4)
+    client = _SummaryClient()
+
+    async def run():
+        memory.schedule_update(client, "gpt-4", turns)
+        # Let the first summary request start, then answer three more questions
+        await asyncio.sleep(0)
+        turns.extend(history(7)[4:])
+        # A second update while the first runs is left to it
+        memory.schedule_update(client, "gpt-4", turns)
+        await memory._task
+    asyncio.run(run())
+
+    assert memory.summarized_count == 5
+    assert len(client.prompts) == 2
+    assert "Covered 2 more exchanges." in client.prompts[1]
+
+
+def test_the_recent_window_alone_is_not_summarized():
+    memory = ConversationMemory(recent_turns=6)
+    client = _SummaryClient()
+
+    fold(memory, client, history(6))
+
+    assert client.prompts == []
+    assert len(memory.format_turns(history(6))) == 6
+
+
+def test_no_turn_is_dropped_when_the_summary_fails_or_cannot_run():
+    turns = history(8)
+    failed = ConversationMemory(recent_turns=3)
+    fold(failed, _SummaryClient(fail=True), turns)
+
+    # Sync callers have no event loop to summarize on
+    unscheduled = ConversationMemory(recent_turns=3)
+    unscheduled.schedule_update(_SummaryClient(), "gpt-4", turns)
+
+    for memory in (failed, unscheduled):
+        assert memory.summary == ""
+        assert len(memory.format_turns(turns)) == 8
@@ -0,0 +1,64 @@
+import asyncio
+import json
+
+from corpus_synthesis import CorpusSynthesis, checkpoint_path, load_interview
+
+
+def write_interview(directory, name: str, answer: str):
+    path = directory / f"interview_{name}.json"
+    path.write_text(json.dumps({
+        "project_info": {"project_name": "Exports", "goal": "diagnostic", "target_audience": "ops"},
+        "conversation_history": [
+            {"question": "1. How do exports fail?", "response": answer},
+            {"question": "How do exports fail?", "response": "Mostly at night."},
+        ],
+    }))
+    return path
+
+
+def synthesis(path, calls: list) -> CorpusSynthesis:
+    corpus = CorpusSynthesis("sk-test", str(path), workers=2)
+
+    async def complete(prompt: str, completion_tokens: int) -> str:
+        calls.append(prompt)
+        return json.dumps({"themes": ["exports"], "sentiment": "negative", "pain_points": ["timeouts"],
+                           "quotes": ["It times out."], "summary": "Exports fail."})
+
+    corpus._complete = complete
+    return corpus
+
+
+def test_repeated_questions_merge_into_one_turn(tmp_path):
+    interview = load_interview(str(write_interview(tmp_path, "a", "They time out.")))
+
+    assert interview["turns"] == [{"question": "1. How do exports fail?", "response": "They time out.\nMostly at night."}]
+
+
+def test_checkpoints_are_keyed_by_project_and_input_paths(tmp_path):
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    a, b = str(tmp_path / "a"), str(tmp_path / "b")
+
+    assert checkpoint_path("Exports", sources=[a, b]) == checkpoint_path("Exports", sources=[b, a, a])
+    assert checkpoint_path("Exports", sources=[a]) != checkpoint_path("Exports", sources=[b])
+    assert checkpoint_path("Exports", sources=[a]) != checkpoint_path("Billing", sources=[a])
+
+
+def test_a_rerun_resumes_from_the_checkpoint(tmp_path):
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    for name in "abc":
+        write_interview(corpus, name, f"Answer {name}.")
+    checkpoint, calls = tmp_path / "checkpoint.jsonl", []
+
+    first = asyncio.run(synthesis(checkpoint, calls).run([str(corpus)]))
+    # One analysis per interview plus the synthesis
+    assert len(calls) == 4 and first["interviews"] == 3
+
+    calls.clear()
+    rerun = synthesis(checkpoint, calls)
+    second = asyncio.run(rerun.run([str(corpus)]))
+
+    assert len(calls) == 1
+    assert rerun.status() == {"analyzed": 3, "skipped": 3, "failed": 0}
+    assert second["interviews"] == 3
@@ -0,0 +1,31 @@
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import multiprocessing
+import os
+
+import pytest
+
+import document_extraction
+from document_extraction import stream_document_pages
+
+
+async def read_pages(source: bytes, file_type: str) -> list:
+    return [page async for page in stream_document_pages(source, file_type)]
+
+
+def test_pages_stream_from_the_process_pool():
+    pages = asyncio.run(read_pages(b"Exports fail nightly.", ".txt"))
+
+    assert "".join(pages) == "Exports fail nightly."
+
+
+def test_a_dead_parsing_worker_fails_the_stream(monkeypatch):
+    # The pool's worker is forked after the patch, so it dies on its first document
+    monkeypatch.setattr(document_extraction, "iter_document_pages", lambda source, file_type: os._exit(1))
+    monkeypatch.setattr(document_extraction, "_process_pool",
+                        ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("fork")))
+
+    with pytest.raises(ValueError, match="terminated abruptly"):
+        asyncio.run(read_pages(b"Exports fail nightly.", ".txt"))
+
+    assert document_extraction._process_pool is None
@@ -0,0 +1,76 @@
+from types import SimpleNamespace
+import asyncio
+
+from user_research_platform import UserResearchPlatform
+
+
+def embedding_of(text: str) -> list:
+    return [float(len(text)), 0.0]
+
+
+def reversed_response(batch: list) -> SimpleNamespace:
+    """Embeddings responses carry an index per item and need not arrive in input order"""
+    data = [SimpleNamespace(index=i, embedding=embedding_of(text)) for i, text in enumerate(batch)]
+    return SimpleNamespace(data=list(reversed(data)))
+
+
+class _BatchScheduler:
+    """Records each embeddings request and fails the ones containing ``fail_on``"""
+
+    def __init__(self, fail_on: str = None):
+        self.batches = []
+        self.fail_on = fail_on
+
+    def _respond(self, input):
+        self.batches.append(list(input))
+        if self.fail_on in input:
+            raise RuntimeError("batch rejected")
+        return reversed_response(input)
+
+    def call_sync(self, create, **kwargs):
+        return self._respond(kwargs["input"])
+
+    async def call(self, create, **kwargs):
+        return self._respond(kwargs["input"])
+
+
+def batching_platform(max_items: int = 2, max_tokens: int = 8000) -> UserResearchPlatform:
+    platform = UserResearchPlatform("sk-test")
+    platform.embedding_model = "text-embedding-3-small"
+    platform.embedding_batch_max_items = max_items
+    platform.embedding_batch_max_tokens = max_tokens
+    return platform
+
+
+def test_batches_respect_the_item_and_token_budgets():
+    platform = batching_platform(max_items=3, max_tokens=10)
+
+    # The offline tokenizer counts one token per byte
+    batches = platform._plan_embedding_batches(["aaaa", "bbbb", "ccc", "dddddddddddd", "e", "f", "g", "h"])
+
+    assert batches == [[0, 1], [2], [3], [4, 5, 6], [7]]
+
+
+def test_embeddings_come_back_aligned_with_the_chunks():
+    platform = batching_platform()
+    platform.scheduler = _BatchScheduler()
+    chunks = ["a", "bb", "ccc", "dddd", "eeeee"]
+
+    embeddings = platform._generate_embeddings(chunks)
+
+    # Batches are sent concurrently, so they may reach the scheduler in any order
+    assert sorted(platform.scheduler.batches) == [["a", "bb"], ["ccc", "dddd"], ["eeeee"]]
+    assert embeddings == [embedding_of(chunk) for chunk in chunks]
+
+
+def test_a_failed_batch_only_loses_its_own_chunks():
+    platform = batching_platform()
+    platform.scheduler = _BatchScheduler(fail_on="ccc")
+    chunks = ["a", "bb", "ccc", "dddd", "eeeee"]
+
+    embeddings = platform._generate_embeddings(chunks)
+    async_embeddings = asyncio.run(platform._generate_embeddings_async(chunks))
+
+    expected = [embedding_of("a"), embedding_of("bb"), None, None, embedding_of("eeeee")]
+    assert embeddings == expected
+    assert async_embeddings == expected
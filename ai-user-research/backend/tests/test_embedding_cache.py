@@ -0,0 +1,62 @@
+from types import SimpleNamespace
+
+from embedding_cache import EmbeddingCache
+from user_research_platform import UserResearchPlatform
+
+
+def test_hits_and_misses_are_counted(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "e.sqlite3"))
+    cache.put_many("m", ["exports", "invoices"], [[1.0, 0.0], None])
+
+    assert cache.get_many("m", ["exports", "invoices", "exports"]) == [[1.0, 0.0], None, [1.0, 0.0]]
+    assert cache.get_many("other-model", ["exports"]) == [None]
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "e.sqlite3"), max_entries=2)
+    cache.put_many("m", ["a", "b"], [[1.0], [2.0]])
+    cache.get_many("m", ["a"])
+    cache.put_many("m", ["c"], [[3.0]])
+
+    assert cache.get_many("m", ["a", "b", "c"]) == [[1.0], None, [3.0]]
+    assert cache.stats()["entries"] == 2
+
+
+def test_rewriting_an_entry_does_not_count_it_twice(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "e.sqlite3"), max_entries=2)
+    for _ in range(3):
+        cache.put_many("m", ["a", "b"], [[1.0], [2.0]])
+
+    assert (cache._count, cache._bytes) == (2, 8)
+    assert cache.get_many("m", ["a", "b"]) == [[1.0], [2.0]]
+
+
+def test_size_is_recovered_when_the_cache_is_reopened(tmp_path):
+    path = str(tmp_path / "e.sqlite3")
+    EmbeddingCache(path).put_many("m", ["a", "b"], [[1.0, 2.0], [3.0, 4.0]])
+
+    reopened = EmbeddingCache(path, max_bytes=8)
+    reopened.put_many("m", ["c"], [[5.0, 6.0]])
+
+    assert reopened.stats()["entries"] == 1
+    assert reopened.get_many("m", ["c"]) == [[5.0, 6.0]]
+
+
+def test_a_document_embedded_once_is_not_sent_again(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "e.sqlite3"))
+    requests = []
+
+    def embed(create, **kwargs):
+        requests.append(kwargs["input"])
+        return SimpleNamespace(data=[SimpleNamespace(index=i, embedding=[1.0, float(i)])
+                                     for i in range(len(kwargs["input"]))])
+
+    chunks = ["Exports fail nightly.", "Reports load slowly."]
+    for session in range(2):
+        platform = UserResearchPlatform("sk-test", embeddings_cache=cache)
+        platform.scheduler = SimpleNamespace(call_sync=embed)
+        embeddings = platform._generate_embeddings(chunks)
+
+    assert requests == [chunks]
+    assert embeddings == [[1.0, 0.0], [1.0, 1.0]]
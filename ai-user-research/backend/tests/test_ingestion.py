@@ -0,0 +1,88 @@
+from types import SimpleNamespace
+import asyncio
+
+import pytest
+
+from ingestion import IngestionJob
+from user_research_platform import UserResearchPlatform
+
+
+class _EmbeddingScheduler:
+    async def call(self, create, **kwargs):
+        await asyncio.sleep(0)
+        return SimpleNamespace(data=[SimpleNamespace(index=i, embedding=[1.0, float(i)])
+                                     for i in range(len(kwargs["input"]))])
+
+
+def ingesting_platform() -> UserResearchPlatform:
+    platform = UserResearchPlatform("sk-test")
+    platform.scheduler = _EmbeddingScheduler()
+    platform.ingest_group_chunks = 2
+    return platform
+
+
+async def pages(texts):
+    for text in texts:
+        await asyncio.sleep(0)
+        yield text
+
+
+def run_job(platform: UserResearchPlatform, texts, **kwargs):
+    job = IngestionJob("session-1")
+    stages, finished = [], []
+    track = job._on_progress
+    job._on_progress = lambda stage, done, total: stages.append(stage) or track(stage, done, total)
+
+    async def on_finished():
+        finished.append(job.stage)
+
+    async def run():
+        job.start(platform, pages(texts), on_finished=on_finished, **kwargs)
+        await job.wait()
+    asyncio.run(run())
+    return job, stages, finished
+
+
+def test_a_document_moves_through_every_stage_to_ready():
+    platform = ingesting_platform()
+
+    job, stages, finished = run_job(platform, [f"Page {i}: exports of invoices fail nightly. " * 40 for i in range(5)])
+
+    assert [stage for i, stage in enumerate(stages) if i == 0 or stages[i - 1] != stage] == \
+        ["extracting", "embedding", "indexing"]
+    assert job.to_dict()["stage"] == "ready"
+    assert job.progress == 1.0
+    assert job.chunks_total == job.chunks_embedded == len(platform.doc_chunks) > 2
+    assert finished == ["ready"]
+
+
+def test_an_empty_document_fails_the_job_and_still_finishes_it():
+    job, _, finished = run_job(ingesting_platform(), ["   ", "\n"])
+
+    assert job.stage == "failed"
+    assert "No text content" in job.error
+    assert job.done and job.finished_at is not None
+    assert finished == ["failed"]
+
+
+def test_a_missing_first_question_fails_the_job(monkeypatch):
+    platform = ingesting_platform()
+
+    async def no_question():
+        return None
+
+    monkeypatch.setattr(platform, "generate_next_question_async", no_question)
+
+    job, _, _ = run_job(platform, ["Exports of invoices fail nightly."], generate_question=True)
+
+    assert job.stage == "failed"
+    assert job.error == "Failed to generate question"
+
+
+def test_progress_follows_the_embedded_chunks():
+    job = IngestionJob("session-1")
+
+    job._on_progress("embedding", 5, 10)
+
+    assert job.progress == pytest.approx(0.55)
+    assert job.to_dict()["chunks_embedded"] == 5
@@ -0,0 +1,78 @@
+from types import SimpleNamespace
+import math
+
+import pytest
+
+from lexical_index import LexicalIndex, reciprocal_rank_fusion, tokenize
+from user_research_platform import UserResearchPlatform
+
+CHUNKS = [
+    "Invoices are exported to CSV every night.",
+    "The nightly export fails when invoices are large.",
+    "Reports load slowly on Mondays.",
+    "Support tickets mention the export page.",
+]
+
+
+def test_only_chunks_sharing_a_term_are_returned_best_first():
+    index = LexicalIndex()
+    index.add(CHUNKS)
+
+    assert index.search("Why do large invoice exports fail?", 4) == [1]
+    assert index.search("nightly invoices", 4) == [1, 0]
+    assert index.search("what is the", 4) == []
+
+
+def test_scores_follow_okapi_bm25():
+    index = LexicalIndex(k1=1.5, b=0.75)
+    index.add(["export export invoices", "reports"])
+
+    # "export": in one of two chunks, twice, in a chunk of 3 terms against an average of 2
+    idf = math.log(1 + (2 - 1 + 0.5) / (1 + 0.5))
+    expected = idf * 2 * 2.5 / (2 + 1.5 * (1 - 0.75 + 0.75 * 3 / 2))
+
+    assert index.scores("export export")[0] == pytest.approx(expected)
+    assert index.scores("export")[1] == 0
+
+
+def test_shorter_chunks_win_on_equal_term_counts():
+    index = LexicalIndex()
+    index.add(["export fails with timeout errors in the billing batch job", "export fails"])
+
+    assert index.search("export", 2) == [1, 0]
+
+
+def test_chunks_added_after_a_search_are_found():
+    index = LexicalIndex()
+    index.add(CHUNKS[:2])
+    assert index.search("reports", 2) == []
+
+    index.add(CHUNKS[2:])
+
+    assert len(index) == 4
+    assert index.search("reports", 2) == [2]
+
+
+def test_tokenize_drops_stopwords_and_punctuation():
+    assert tokenize("Q: What's the CSV export's status?") == ["s", "csv", "export", "s", "status"]
+
+
+def test_fusion_favours_chunks_ranked_by_both_lists():
+    lexical = [3, 1, 2]
+    dense = [0, 1, 4]
+
+    assert reciprocal_rank_fusion([lexical, dense], 3) == [1, 3, 0]
+    assert reciprocal_rank_fusion([lexical, dense], 1) == [1]
+
+
+def test_lexical_mode_answers_without_a_query_embedding():
+    platform = UserResearchPlatform("sk-test")
+    platform._store_chunks(CHUNKS, [[1.0, 0.0]] * len(CHUNKS))
+    platform.retrieval_mode = "lexical"
+
+    def no_embeddings(create, **kwargs):
+        raise AssertionError("lexical retrieval requested an embedding")
+
+    platform.scheduler = SimpleNamespace(call_sync=no_embeddings)
+
+    assert platform._get_relevant_chunks("Which reports are slow?", top_k=1) == ["Reports load slowly on Mondays."]
@@ -0,0 +1,84 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from metrics import MetricsRegistry, log_prompt
+
+
+def test_counters_and_histograms_render_in_the_prometheus_format():
+    registry = MetricsRegistry()
+    registry.inc("requests_total", help_text="Requests", route="/api/x")
+    registry.inc("requests_total", 2, route="/api/x")
+    registry.observe("latency_seconds", 0.02, "Latency", stage="embed")
+    registry.observe("latency_seconds", 3.0, stage="embed")
+
+    lines = registry.render().splitlines()
+
+    assert "# TYPE requests_total counter" in lines
+    assert 'requests_total{route="/api/x"} 3' in lines
+    assert "# TYPE latency_seconds histogram" in lines
+    assert 'latency_seconds_bucket{stage="embed",le="0.01"} 0' in lines
+    assert 'latency_seconds_bucket{stage="embed",le="0.025"} 1' in lines
+    assert 'latency_seconds_bucket{stage="embed",le="5"} 2' in lines
+    assert 'latency_seconds_bucket{stage="embed",le="+Inf"} 2' in lines
+    assert 'latency_seconds_sum{stage="embed"} 3.020000' in lines
+    assert 'latency_seconds_count{stage="embed"} 2' in lines
+
+
+def test_a_failing_span_is_labelled_as_an_error():
+    registry = MetricsRegistry()
+
+    with registry.span("retrieve", mode="dense"):
+        pass
+    with pytest.raises(RuntimeError):
+        with registry.span("retrieve", mode="dense"):
+            raise RuntimeError("index unavailable")
+
+    text = registry.render()
+    assert 'user_research_stage_duration_seconds_count{mode="dense",outcome="ok",stage="retrieve"} 1' in text
+    assert 'user_research_stage_duration_seconds_count{mode="dense",outcome="error",stage="retrieve"} 1' in text
+
+
+def test_collectors_are_read_at_scrape_time_and_a_broken_one_is_skipped():
+    registry = MetricsRegistry()
+    queued = [3]
+
+    def broken():
+        raise RuntimeError("store closed")
+        yield
+
+    registry.register_collector(broken)
+    registry.register_collector(lambda: iter([("queued", "gauge", "Queued results", {}, queued[0])]))
+    first = registry.render()
+    queued[0] = 0
+
+    assert "queued 3" in first.splitlines()
+    assert "queued 0" in registry.render().splitlines()
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    registry.inc("errors_total", reason='bad "quote"\nnext')
+
+    assert 'errors_total{reason="bad \\"quote\\"\\nnext"} 1' in registry.render()
+
+
+def test_prompts_are_not_logged_unless_sampling_is_enabled(capsys, monkeypatch):
+    messages = [{"role": "user", "content": "What slows your week down?"}]
+    monkeypatch.delenv("PROMPT_LOG_SAMPLE_RATE", raising=False)
+    log_prompt("question", messages)
+    assert capsys.readouterr().out == ""
+
+    monkeypatch.setenv("PROMPT_LOG_SAMPLE_RATE", "1")
+    log_prompt("question", messages)
+    assert "What slows your week down?" in capsys.readouterr().out
+
+
+def test_the_metrics_endpoint_serves_stage_latencies(server):
+    with server.REGISTRY.span("chunk"):
+        pass
+
+    response = TestClient(server.app).get("/metrics")
+
+    assert response.status_code == 200
+    assert "user_research_stage_duration_seconds_count" in response.text
+    assert "user_research_sessions_in_memory" in response.text
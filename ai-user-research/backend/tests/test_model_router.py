@@ -0,0 +1,121 @@
+from types import SimpleNamespace
+import asyncio
+import time
+
+import pytest
+
+from model_router import TASKS, ModelRouter
+from user_research_platform import UserResearchPlatform
+
+
+def test_defaults_keep_the_baseline_model_without_fallbacks():
+    router = ModelRouter()
+
+    for task in TASKS:
+        assert router.route(task).to_dict() == {"model": "gpt-4", "fallback": None, "deadline": None}
+    assert not router.is_templated("elaboration")
+    assert ModelRouter({"elaboration": {"model": "template"}}).is_templated("elaboration")
+
+
+def test_unknown_task_types_are_rejected():
+    with pytest.raises(ValueError, match="Unknown task type"):
+        ModelRouter({"summary": {"model": "gpt-4o-mini"}})
+
+
+def test_sync_fallback_answers_once_the_deadline_passes():
+    router = ModelRouter({"question": {"fallback": "gpt-4o-mini", "deadline": 0.05}})
+
+    def call(model: str) -> str:
+        time.sleep(0.5 if model == "gpt-4" else 0)
+        return model
+
+    try:
+        assert router.complete("question", call) == "gpt-4o-mini"
+    finally:
+        router.close()
+
+
+def test_async_fallback_answers_once_the_deadline_passes():
+    router = ModelRouter({"question": {"fallback": "gpt-4o-mini", "deadline": 0.05}})
+
+    async def call(model: str) -> str:
+        await asyncio.sleep(0.5 if model == "gpt-4" else 0)
+        return model
+
+    assert asyncio.run(router.complete_async("question", call)) == "gpt-4o-mini"
+
+
+def test_a_failing_primary_hands_over_to_the_fallback():
+    router = ModelRouter({"question": {"fallback": "gpt-4o-mini", "deadline": 5}})
+
+    async def call(model: str) -> str:
+        if model == "gpt-4":
+            raise RuntimeError("overloaded")
+        return model
+
+    assert asyncio.run(router.complete_async("question", call)) == "gpt-4o-mini"
+
+
+def test_cancelling_the_caller_cancels_the_running_request():
+    router = ModelRouter({"question": {"fallback": "gpt-4o-mini", "deadline": 5}})
+    cancelled = []
+
+    async def call(model: str) -> str:
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(model)
+            raise
+        return model
+
+    async def main():
+        caller = asyncio.ensure_future(router.complete_async("question", call))
+        await asyncio.sleep(0.05)
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+    assert cancelled == ["gpt-4"]
+
+
+def routed_platform(routes, answer: str) -> UserResearchPlatform:
+    platform = UserResearchPlatform("sk-test", router=ModelRouter(routes))
+    platform.project_info = {"project_name": "Exports", "goal": "diagnostic", "target_audience": "ops"}
+    platform.current_question = "How do exports fail?"
+    platform.record_response(answer)
+    return platform
+
+
+def test_templated_elaborations_need_no_model_request():
+    platform = routed_platform({"elaboration": {"model": "template"}}, "Timeouts mostly")
+
+    async def no_requests(create, **kwargs):
+        raise AssertionError("a templated elaboration made a request")
+
+    platform.scheduler = SimpleNamespace(call=no_requests)
+
+    question = asyncio.run(platform.generate_next_question_async())
+
+    assert "Timeouts mostly" in question
+    assert platform.current_question == question
+
+
+def test_a_streamed_question_falls_back_when_the_first_token_is_late():
+    platform = routed_platform({"question": {"fallback": "gpt-4o-mini", "deadline": 0.05}},
+                               "They time out on large invoices and we split them by hand.")
+
+    async def stream(model):
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=model))], usage=None)
+
+    async def open_stream(create, **kwargs):
+        await asyncio.sleep(0.5 if kwargs["model"] == "gpt-4" else 0)
+        return SimpleNamespace(__aiter__=lambda: stream(kwargs["model"]), close=lambda: asyncio.sleep(0))
+
+    platform.scheduler = SimpleNamespace(call=open_stream)
+
+    async def run():
+        return [token async for token in platform.stream_next_question_async()]
+
+    assert asyncio.run(run()) == ["gpt-4o-mini"]
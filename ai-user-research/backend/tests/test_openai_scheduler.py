@@ -0,0 +1,109 @@
+from types import SimpleNamespace
+import asyncio
+
+import openai
+import pytest
+
+from openai_scheduler import BACKGROUND, INTERACTIVE, RequestScheduler
+
+
+def status_error(status: int, retry_after: str = None) -> openai.APIStatusError:
+    headers = {"retry-after": retry_after} if retry_after else {}
+    return openai.APIStatusError(f"HTTP {status}", response=SimpleNamespace(status_code=status, headers=headers,
+                                                                            request=None), body=None)
+
+
+def failing(*errors):
+    """A request that raises ``errors`` in turn, then answers"""
+    attempts = []
+
+    def request(**kwargs):
+        attempts.append(kwargs)
+        if len(attempts) <= len(errors):
+            raise errors[len(attempts) - 1]
+        return SimpleNamespace(usage=None)
+    return request, attempts
+
+
+def as_coroutine(request):
+    async def call(**kwargs):
+        return request(**kwargs)
+    return call
+
+
+def test_background_requests_leave_the_interactive_reserve():
+    scheduler = RequestScheduler(requests_per_minute=10, tokens_per_minute=1000, interactive_reserve=0.2)
+
+    taken = 0
+    while not scheduler._try_acquire(10, BACKGROUND):
+        taken += 1
+
+    assert taken == 8
+    assert scheduler._try_acquire(10, INTERACTIVE) == 0
+    assert scheduler._try_acquire(10, INTERACTIVE) == 0
+
+
+def test_background_requests_wait_while_an_interactive_one_does():
+    scheduler = RequestScheduler()
+    scheduler._interactive_waiting = 1
+
+    assert scheduler._try_acquire(10, BACKGROUND) > 0
+    assert scheduler._try_acquire(10, INTERACTIVE) == 0
+
+
+def test_an_interactive_request_is_served_before_queued_background_work():
+    scheduler = RequestScheduler(requests_per_minute=600, tokens_per_minute=100_000, interactive_reserve=0.0)
+    scheduler._requests = 0.0
+    order = []
+
+    async def request(name, priority):
+        await scheduler.acquire(1, priority)
+        order.append(name)
+
+    async def run():
+        # The background request starts waiting first
+        await asyncio.gather(request("background", BACKGROUND), request("interactive", INTERACTIVE))
+    asyncio.run(run())
+
+    assert order == ["interactive", "background"]
+
+
+def test_retry_after_sets_the_minimum_backoff():
+    scheduler = RequestScheduler(base_delay=0.01)
+
+    assert scheduler._retry_delay(status_error(429, retry_after="3"), 0) == 3.0
+    assert scheduler._retry_delay(status_error(503), 0) <= 0.01
+    assert scheduler._retry_delay(status_error(400), 0) is None
+    assert scheduler._retry_delay(status_error(429), scheduler.max_retries) is None
+
+
+def test_transient_failures_are_retried_and_client_errors_are_not():
+    scheduler = RequestScheduler(base_delay=0, max_retries=2)
+
+    request, attempts = failing(status_error(429), status_error(502))
+    scheduler.call_sync(request, tokens=10, input="x")
+    assert len(attempts) == 3
+
+    request, attempts = failing(status_error(429), status_error(429), status_error(429))
+    with pytest.raises(openai.APIStatusError):
+        scheduler.call_sync(request, tokens=10)
+    assert len(attempts) == 3
+
+    request, attempts = failing(status_error(400))
+    with pytest.raises(openai.APIStatusError):
+        asyncio.run(scheduler.call(as_coroutine(request), tokens=10))
+    assert len(attempts) == 1
+
+
+def test_reported_usage_corrects_the_token_bucket():
+    scheduler = RequestScheduler(tokens_per_minute=1000)
+    scheduler.acquire_sync(300)
+    usage = SimpleNamespace(total_tokens=120, prompt_tokens=100, completion_tokens=20,
+                            prompt_tokens_details=SimpleNamespace(cached_tokens=64))
+
+    scheduler.settle(300, SimpleNamespace(usage=usage))
+
+    stats = scheduler.stats()
+    assert 880 <= stats["tokens_available"] <= 1000
+    assert stats["cached_tokens"] == 64
+    assert stats["cached_token_ratio"] == 0.64
@@ -0,0 +1,67 @@
+import tiktoken
+
+from prompt_builder import PromptBuilder
+
+TURNS = ["Q1 A1", "Q2 A2", "Q3 A3"]
+CHUNKS = ["a" * 10, "b" * 10]
+
+
+def template(sections):
+    return f"C:{sections['conversation']}|D:{sections['doc']}"
+
+
+def builder(max_tokens: int, doc_reserve: int = 0, token_counts=None) -> PromptBuilder:
+    # The offline tokenizer counts one token per byte
+    prompt = PromptBuilder(tiktoken.get_encoding("cl100k_base"), max_tokens, token_counts)
+    prompt.add_section("conversation", list(TURNS), priority=0, keep="tail")
+    prompt.add_section("doc", list(CHUNKS), priority=1, reserve=doc_reserve)
+    return prompt
+
+
+def test_a_prompt_within_budget_is_left_whole():
+    prompt = builder(100)
+
+    assert prompt.render(template) == "C:Q1 A1\nQ2 A2\nQ3 A3|D:" + "a" * 10 + "\n" + "b" * 10
+    assert prompt.section_tokens == {"conversation": 17, "doc": 21}
+    assert prompt.total_tokens == 43
+
+
+def test_the_least_important_section_loses_whole_items_first():
+    prompt = builder(33)
+
+    assert prompt.render(template) == "C:Q1 A1\nQ2 A2\nQ3 A3|D:" + "a" * 10
+    assert prompt.total_tokens <= 33
+
+
+def test_the_conversation_keeps_its_latest_turns():
+    prompt = builder(20)
+
+    assert prompt.render(template) == "C:Q2 A2\nQ3 A3|D:"
+    assert prompt.total_tokens <= 20
+
+
+def test_a_reserve_keeps_a_section_from_being_trimmed_away():
+    prompt = builder(20, doc_reserve=10)
+
+    assert prompt.render(template) == "C:Q3 A3|D:" + "a" * 10
+
+
+def test_the_last_item_is_cut_token_by_token():
+    prompt = PromptBuilder(tiktoken.get_encoding("cl100k_base"), 12)
+    prompt.add_section("doc", ["Exports of invoices fail nightly"], priority=0)
+
+    assert prompt.render(lambda sections: sections["doc"]) == "Exports of i"
+
+
+def test_precounted_items_are_not_tokenized_again():
+    encoded = []
+
+    class CountingTokenizer:
+        def encode(self, text, **kwargs):
+            encoded.append(text)
+            return list(text.encode("utf-8"))
+
+    prompt = PromptBuilder(CountingTokenizer(), 100, token_counts={turn: 5 for turn in TURNS})
+    prompt.add_section("conversation", list(TURNS), priority=0)
+
+    assert not set(TURNS) & set(encoded)
@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+import time
+
+import pytest
+
+from results_store import ResultsStore
+
+EXPORTS = {"project_name": "Exports", "goal": "diagnostic", "target_audience": "ops"}
+ONBOARDING = {"project_name": "Onboarding", "goal": "discovery", "target_audience": "admins"}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.sqlite3"), batch_size=3)
+    yield store
+    store.close()
+
+
+def test_appended_results_are_readable_after_a_flush(store):
+    result_id = store.append("interview", {"analysis": "Exports time out."}, session_id="s1", project_info=EXPORTS)
+
+    store.flush()
+
+    result = store.get(result_id)
+    assert result["analysis"] == "Exports time out."
+    assert result["session_id"] == "s1"
+    assert result["project_info"] == EXPORTS
+    assert store.stats() == {"stored": 1, "queued": 0, "written": 1, "failed": 0}
+
+
+def test_unknown_kinds_are_refused(store):
+    with pytest.raises(ValueError):
+        store.append("summary", {})
+
+
+def test_queries_filter_and_return_newest_first(store):
+    first = store.append("interview", {"n": 1}, project_info=EXPORTS)
+    # Results are ordered by creation time
+    time.sleep(0.01)
+    store.append("interview", {"n": 2}, project_info=ONBOARDING)
+    time.sleep(0.01)
+    third = store.append("analysis", {"n": 3}, project_info=EXPORTS)
+    store.flush()
+
+    assert [r["result_id"] for r in store.query(project_name="Exports")] == [third, first]
+    assert [r["n"] for r in store.query(kind="interview", goal="discovery")] == [2]
+    assert store.query(since=datetime.now() + timedelta(minutes=1)) == []
+    assert [r["n"] for r in store.query(limit=1, offset=1)] == [2]
+
+
+def test_iteration_visits_every_match_oldest_first_across_batches(store):
+    for n in range(7):
+        store.append("interview", {"n": n}, project_info=EXPORTS if n % 2 == 0 else ONBOARDING)
+    store.flush()
+
+    assert [r["n"] for r in store.iter_results(batch_size=2)] == list(range(7))
+    assert [r["n"] for r in store.iter_results(project_name="Exports", batch_size=2)] == [0, 2, 4, 6]
+
+
+def test_close_writes_what_is_still_queued(tmp_path):
+    path = str(tmp_path / "results.sqlite3")
+    store = ResultsStore(path)
+    ids = [store.append("interview", {"n": n}) for n in range(250)]
+    store.close()
+
+    reopened = ResultsStore(path)
+    try:
+        assert reopened.stats()["stored"] == 250
+        assert reopened.get(ids[-1])["n"] == 249
+    finally:
+        reopened.close()
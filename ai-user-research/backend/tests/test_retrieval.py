@@ -0,0 +1,96 @@
+from types import SimpleNamespace
+import asyncio
+
+from embedding_cache import EmbeddingCache
+from user_research_platform import UserResearchPlatform
+
+
+def platform_with_chunks() -> UserResearchPlatform:
+    platform = UserResearchPlatform("sk-test")
+    platform.embedding_model = "text-embedding-3-small"
+    platform._store_chunks(["Exports fail nightly.", "Reports load slowly.", "Invoices are split by hand."],
+                           [[1.0, 0.0, 0.0, 0.0], [0.8, 0.6, 0.0, 0.0], [0.0, 0.0, 1.0, 0.0]])
+    return platform
+
+
+class _QueryScheduler:
+    """Answers every embeddings request with ``embedding``"""
+
+    def __init__(self, embedding):
+        self.embedding = embedding
+
+    def call_sync(self, create, **kwargs):
+        return SimpleNamespace(data=[SimpleNamespace(embedding=self.embedding)])
+
+
+def test_dense_retrieval_returns_the_most_similar_chunks_best_first():
+    platform = platform_with_chunks()
+    platform.scheduler = _QueryScheduler([0.9, 0.5, 0.0, 0.0])
+
+    chunks = platform._get_relevant_chunks("Which pages are slow?", top_k=2)
+
+    assert chunks == ["Reports load slowly.", "Exports fail nightly."]
+
+
+def test_chunks_that_could_not_be_embedded_are_left_out_of_the_index():
+    platform = UserResearchPlatform("sk-test")
+    platform.embedding_model = "text-embedding-3-small"
+    platform._store_chunks(["Exports fail nightly.", "Reports load slowly.", "Invoices are split by hand."],
+                           [[1.0, 0.0], None, [0.0, 1.0]])
+    platform.scheduler = _QueryScheduler([0.1, 1.0])
+
+    assert platform.doc_chunks == ["Exports fail nightly.", "Invoices are split by hand."]
+    assert len(platform.chunk_index) == 2
+    assert platform._get_relevant_chunks("Who splits invoices?", top_k=1) == ["Invoices are split by hand."]
+
+
+def test_a_speculative_embedding_is_fused_with_the_answer():
+    platform = platform_with_chunks()
+    # Embedded before the answer: close to the export chunks only
+    speculative = [1.0, 0.0, 0.0, 0.0]
+    query = "Q: What slows your week down?\nA: Invoices are split by hand every Friday"
+
+    dense = platform._rank_chunks(query, speculative, 2)
+    chunks = asyncio.run(platform._get_relevant_chunks_async(query, top_k=2, query_embedding=speculative))
+
+    assert "Invoices are split by hand." not in dense
+    assert "Invoices are split by hand." in chunks
+
+
+class _EmbeddingScheduler:
+    """Answers every embeddings request with the same vector and counts them"""
+
+    def __init__(self):
+        self.requests = 0
+
+    def call_sync(self, create, **kwargs):
+        self.requests += 1
+        return SimpleNamespace(data=[SimpleNamespace(embedding=[1.0, 0.0, 0.0, 0.0])])
+
+
+def test_query_embeddings_stay_out_of_the_shared_cache(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "e.sqlite3"))
+    platform = UserResearchPlatform("sk-test", embeddings_cache=cache)
+    platform.embedding_model = "text-embedding-3-small"
+    platform.scheduler = _EmbeddingScheduler()
+
+    platform._embed_query("How do exports fail?")
+    platform._embed_query("How do exports fail?")
+
+    assert platform.scheduler.requests == 1
+    assert cache.stats()["entries"] == 0
+
+
+def test_a_failed_query_embedding_is_logged_and_bm25_answers(caplog):
+    platform = platform_with_chunks()
+
+    def unavailable(create, **kwargs):
+        raise RuntimeError("embeddings unavailable")
+
+    platform.scheduler = SimpleNamespace(call_sync=unavailable)
+
+    with caplog.at_level("WARNING", logger="user_research_platform"):
+        chunks = platform._get_relevant_chunks("Invoices are split by hand", top_k=1)
+
+    assert chunks == ["Invoices are split by hand."]
+    assert "embeddings unavailable" in caplog.text
@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+from session_store import SessionStore
+from user_research_platform import UserResearchPlatform
+
+
+def new_platform() -> UserResearchPlatform:
+    platform = UserResearchPlatform("sk-test")
+    platform.embedding_model = "text-embedding-3-small"
+    return platform
+
+
+def saved_session(path) -> UserResearchPlatform:
+    platform = new_platform()
+    platform.project_info = {"project_name": "Round trip", "goal": "diagnostic", "target_audience": "ops"}
+    platform._store_chunks(["Exports fail nightly.", "Invoices are split by hand."],
+                           [[1.0, 0.0, 0.0, 0.0], [0.0, 1.0, 0.0, 0.0]])
+    SessionStore(str(path), create_platform=new_platform).save("s1", platform)
+    return platform
+
+
+def test_snapshot_keeps_the_index_embedding_space(tmp_path):
+    live = saved_session(tmp_path / "sessions.sqlite3")
+
+    # Another worker sharing the database rehydrates the session
+    restored = SessionStore(str(tmp_path / "sessions.sqlite3"), create_platform=new_platform).get("s1")
+
+    assert restored.chunk_index.space == live.chunk_index.space == live.embedding_space.key
+    assert restored.doc_chunks == live.doc_chunks
+    assert restored._dense_index_ready()
+
+
+def test_snapshots_without_a_space_are_refused(tmp_path):
+    path = tmp_path / "sessions.sqlite3"
+    saved_session(path)
+    store = SessionStore(str(path), create_platform=new_platform)
+    meta = json.loads(store._conn.execute("SELECT index_meta FROM sessions").fetchone()[0])
+    del meta["space"]
+    store._conn.execute("UPDATE sessions SET index_meta = ?", (json.dumps(meta),))
+
+    with pytest.raises(ValueError, match="embedding space"):
+        SessionStore(str(path), create_platform=new_platform).get("s1")
+
+
+def test_a_snapshot_taken_before_a_change_is_what_gets_written(tmp_path):
+    path = tmp_path / "sessions.sqlite3"
+    platform = new_platform()
+    platform.project_info = {"project_name": "Point in time", "goal": "diagnostic", "target_audience": "ops"}
+    platform._store_chunks(["Exports fail nightly."], [[1.0, 0.0, 0.0, 0.0]])
+    snapshot = platform.to_snapshot()
+
+    # Ingestion keeps adding chunks while the snapshot is written on another thread
+    platform.doc_chunks.append("Invoices are split by hand.")
+    platform.chunk_index.add([[0.0, 1.0, 0.0, 0.0]])
+    platform.document_version += 1
+    SessionStore(str(path), create_platform=new_platform).save("s1", platform, snapshot=snapshot)
+
+    restored = SessionStore(str(path), create_platform=new_platform).get("s1")
+
+    assert restored.doc_chunks == ["Exports fail nightly."]
+    assert len(restored.chunk_index) == 1
+    assert restored.document_version == snapshot["state"]["document_version"]
+
+
+def test_newer_state_is_only_returned_after_another_worker_wrote(tmp_path):
+    path = tmp_path / "sessions.sqlite3"
+    saved_session(path)
+    ingesting = SessionStore(str(path), create_platform=new_platform)
+    ingesting.get("s1")
+    assert ingesting.newer_state("s1") is None
+
+    # A turn recorded on another worker while the document was being ingested here
+    other = SessionStore(str(path), create_platform=new_platform)
+    platform = other.get("s1")
+    platform.current_question = "How do exports fail?"
+    platform.record_response("They time out on large invoices.")
+    other.save("s1", platform)
+
+    state = ingesting.newer_state("s1")
+    assert state["conversation_history"][-1]["response"] == "They time out on large invoices."
@@ -0,0 +1,83 @@
+from types import SimpleNamespace
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+
+from user_research_platform import UserResearchPlatform
+
+
+def delta(text: str) -> SimpleNamespace:
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))], usage=None)
+
+
+class _Stream:
+    """Chat completion stream of ``tokens``, ending with the usage-only chunk"""
+
+    def __init__(self, tokens):
+        self.chunks = [delta(token) for token in tokens]
+        self.chunks.append(SimpleNamespace(choices=[], usage=SimpleNamespace(prompt_tokens=40, completion_tokens=6,
+                                                                             prompt_tokens_details=None)))
+        self.closed = False
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            await asyncio.sleep(0)
+            yield chunk
+
+    async def close(self):
+        self.closed = True
+
+
+class _StreamScheduler:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.settled = []
+
+    async def call(self, create, **kwargs):
+        assert kwargs["stream"]
+        return _Stream(self.tokens)
+
+    def settle(self, tokens, response):
+        self.settled.append(tokens)
+
+
+def streaming_platform(tokens) -> UserResearchPlatform:
+    platform = UserResearchPlatform("sk-test")
+    platform.project_info = {"project_name": "Exports", "goal": "diagnostic", "target_audience": "ops"}
+    platform.current_question = "How do exports fail?"
+    platform.record_response("They time out on large invoices and we split them by hand.")
+    platform.scheduler = _StreamScheduler(tokens)
+    return platform
+
+
+def collect(platform: UserResearchPlatform) -> list:
+    async def run():
+        return [token async for token in platform.stream_next_question_async()]
+    return asyncio.run(run())
+
+
+def test_question_tokens_are_streamed_as_they_arrive():
+    platform = streaming_platform(["How ", "often ", "does ", "that ", "happen?"])
+
+    tokens = collect(platform)
+
+    assert tokens == ["How ", "often ", "does ", "that ", "happen?"]
+    assert platform.current_question == "How often does that happen?"
+    assert len(platform.scheduler.settled) == 1
+
+
+def test_the_stream_endpoint_sends_tokens_then_the_turn_payload(server):
+    platform = streaming_platform(["What ", "breaks?"])
+    server.research_sessions["stream-test"] = platform
+
+    # Without the context manager the shutdown handler, which closes the shared stores, does not run
+    body = TestClient(server.app).post("/api/submit-response/stream-test/stream",
+                                       json={"response": "The nightly export times out on big invoices."}).text
+
+    events = [(block.split("\n")[0][len("event: "):], json.loads(block.split("\n")[1][len("data: "):]))
+              for block in body.strip().split("\n\n")]
+    assert events[:-1] == [("token", {"text": "What "}), ("token", {"text": "breaks?"})]
+    assert events[-1][0] == "done"
+    assert events[-1][1]["question"] == "What breaks?"
+    assert events[-1][1]["status"] == "continue"
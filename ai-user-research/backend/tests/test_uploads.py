@@ -0,0 +1,49 @@
+import asyncio
+import io
+import tempfile
+
+import pytest
+from fastapi import HTTPException, UploadFile
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def spool_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    return tmp_path
+
+
+def upload(data: bytes) -> UploadFile:
+    return UploadFile(io.BytesIO(data), filename="notes.txt")
+
+
+def test_an_upload_is_spooled_to_disk_block_by_block(server, spool_dir, monkeypatch):
+    monkeypatch.setattr(server, "UPLOAD_BLOCK_BYTES", 4)
+    data = b"Exports of invoices fail nightly.\n" * 10
+
+    path = asyncio.run(server.spool_upload(upload(data), suffix=".txt"))
+
+    assert path.endswith(".txt")
+    with open(path, "rb") as f:
+        assert f.read() == data
+
+
+def test_an_oversized_upload_is_refused_and_its_file_removed(server, spool_dir, monkeypatch):
+    monkeypatch.setattr(server, "UPLOAD_BLOCK_BYTES", 4)
+    monkeypatch.setattr(server, "MAX_UPLOAD_BYTES", 10)
+
+    with pytest.raises(HTTPException) as refused:
+        asyncio.run(server.spool_upload(upload(b"x" * 11)))
+
+    assert refused.value.status_code == 413
+    assert list(spool_dir.iterdir()) == []
+
+
+def test_the_upload_endpoint_answers_413_past_the_limit(server, spool_dir, monkeypatch):
+    monkeypatch.setattr(server, "MAX_UPLOAD_BYTES", 10)
+
+    response = TestClient(server.app).post("/api/upload-document",
+                                           files={"file": ("notes.txt", b"x" * 11, "text/plain")})
+
+    assert response.status_code == 413
+    assert list(spool_dir.iterdir()) == []
@@ -0,0 +1,101 @@
+"""Memory and recall of the compact chunk embedding storage modes.
+
+Compares the per-session footprint of chunk embeddings held as Python lists with
+ChunkIndex rows in float32, float16 and int8, and with reduced dimensions, and
+reports recall@k against exact float32 search at full dimension.
+
+Vectors come from the embedding cache when one is given (real document chunks),
+otherwise from a synthetic clustered corpus. Reduced dimensions are simulated the
+way the text-embedding-3 ``dimensions`` parameter works: keep the leading
+components and re-normalize.
+
+    python benchmarks/embedding_storage.py --cache results/embeddings.sqlite3
+"""
+import argparse
+import os
+import sqlite3
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend", "src"))
+from chunk_index import ChunkIndex  # noqa: E402
+
+
+def load_vectors(args) -> np.ndarray:
+    if args.cache and os.path.exists(args.cache):
+        conn = sqlite3.connect(args.cache)
+        rows = conn.execute("SELECT vector FROM embeddings LIMIT ?", (args.chunks,)).fetchall()
+        conn.close()
+        vectors = [np.frombuffer(blob, dtype=np.float32) for (blob,) in rows]
+        dims = {len(vector) for vector in vectors}
+        if vectors and len(dims) == 1:
+            print(f"Using {len(vectors)} cached embeddings from {args.cache}")
+            return np.stack(vectors)
+        print("Cache is empty or mixes dimensions, falling back to synthetic vectors")
+
+    rng = np.random.default_rng(args.seed)
+    centers = rng.normal(size=(max(args.chunks // 10, 1), args.dim))
+    assignment = rng.integers(0, len(centers), size=args.chunks)
+    return (centers[assignment] + 0.5 * rng.normal(size=(args.chunks, args.dim))).astype(np.float32)
+
+
+def make_queries(vectors: np.ndarray, count: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed + 1)
+    picks = vectors[rng.integers(0, len(vectors), size=count)]
+    return picks + 0.3 * picks.std() * rng.normal(size=picks.shape).astype(np.float32)
+
+
+def list_bytes(vectors: np.ndarray) -> int:
+    """Size of the old representation: a list of lists of boxed Python floats"""
+    rows = vectors.tolist()
+    return sys.getsizeof(rows) + sum(sys.getsizeof(row) + sum(sys.getsizeof(x) for x in row) for row in rows)
+
+
+def recall(index: ChunkIndex, queries: np.ndarray, truth, top_k: int) -> float:
+    hits = sum(len(set(index.search(query, top_k)) & expected) for query, expected in zip(queries, truth))
+    return hits / (len(queries) * top_k)
+
+
+def truncate(vectors: np.ndarray, dims: int) -> np.ndarray:
+    reduced = vectors[:, :dims]
+    return reduced / np.linalg.norm(reduced, axis=1, keepdims=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cache", default=os.path.join("results", "embeddings.sqlite3"))
+    parser.add_argument("--chunks", type=int, default=400)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    vectors = load_vectors(args)
+    queries = make_queries(vectors, args.queries, args.seed)
+
+    exact = ChunkIndex("float32")
+    exact.add(vectors)
+    truth = [set(exact.search(query, args.top_k)) for query in queries]
+
+    baseline = list_bytes(vectors)
+    print(f"{len(vectors)} chunks x {vectors.shape[1]} dims, recall@{args.top_k} vs exact float32 search\n")
+    print(f"{'mode':<22}{'bytes/session':>15}{'bytes/chunk':>13}{'saved':>9}{'recall':>9}")
+    print(f"{'python lists':<22}{baseline:>15,}{baseline // len(vectors):>13,}{'-':>9}{1.0:>9.3f}")
+
+    dims_options = [vectors.shape[1]] + [d for d in (512, 256) if d < vectors.shape[1]]
+    for dims in dims_options:
+        reduced_vectors = truncate(vectors, dims)
+        reduced_queries = truncate(queries, dims)
+        for dtype in ChunkIndex.STORAGE_DTYPES:
+            index = ChunkIndex(dtype)
+            index.add(reduced_vectors)
+            saved = 1 - index.nbytes / baseline
+            label = f"{dtype} @ {dims}d"
+            print(f"{label:<22}{index.nbytes:>15,}{index.nbytes // len(vectors):>13,}{saved:>9.1%}"
+                  f"{recall(index, reduced_queries, truth, args.top_k):>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
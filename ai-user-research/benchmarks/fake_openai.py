@@ -0,0 +1,196 @@
+"""Offline stand-in for the OpenAI API, for load tests that must not spend real quota.
+
+Serves ``/v1/chat/completions`` (plain and streamed, with ``include_usage``) and
+``/v1/embeddings`` (float and base64 encodings, ``dimensions``) with the response shapes
+the SDK expects. Latency is simulated per request and per generated token, with jitter;
+a share of requests can be answered with 429 and a ``Retry-After`` header. Embeddings are
+deterministic per text. Prompt caching is imitated too: a system message of at least
+1024 tokens seen before is reported back as ``cached_tokens``.
+
+    python benchmarks/fake_openai.py --port 8100 --latency 400 --error-rate 0.02
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1 OPENAI_API_KEY=sk-local python backend/src/main.py
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import random
+import time
+from collections import OrderedDict
+
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+DIMENSIONS = {"text-embedding-ada-002": 1536, "text-embedding-3-small": 1536, "text-embedding-3-large": 3072}
+WORDS = ("workflow export dashboard invoice deploy report sync team customer delay "
+         "friction workaround release approval budget onboarding").split()
+
+
+class StandIn:
+    def __init__(self, latency_ms: float = 300, token_latency_ms: float = 15, embedding_latency_ms: float = 80,
+                 jitter: float = 0.3, error_rate: float = 0.0, retry_after: float = 1.0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.token_latency_ms = token_latency_ms
+        self.embedding_latency_ms = embedding_latency_ms
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.prefixes = OrderedDict()
+        self.counts = {"chat": 0, "embeddings": 0, "rate_limited": 0}
+
+    async def delay(self, milliseconds: float):
+        if milliseconds > 0:
+            await asyncio.sleep(milliseconds * (1 + self.random.uniform(-self.jitter, self.jitter)) / 1000)
+
+    def rate_limited(self):
+        if self.error_rate and self.random.random() < self.error_rate:
+            self.counts["rate_limited"] += 1
+            return JSONResponse(
+                status_code=429,
+                headers={"retry-after": str(self.retry_after)},
+                content={"error": {"message": "Rate limit reached (stand-in)", "type": "requests",
+                                   "code": "rate_limit_exceeded"}}
+            )
+        return None
+
+    @staticmethod
+    def count(text: str) -> int:
+        return len(text) // 4 + 1
+
+    def cached_tokens(self, messages: list) -> int:
+        """Tokens of a long system message seen before, in 128-token steps like the real cache"""
+        if not messages or messages[0].get("role") != "system":
+            return 0
+        tokens = self.count(messages[0].get("content") or "")
+        if tokens < 1024:
+            return 0
+        key = hashlib.sha256((messages[0].get("content") or "").encode()).hexdigest()
+        seen = key in self.prefixes
+        self.prefixes[key] = True
+        self.prefixes.move_to_end(key)
+        if len(self.prefixes) > 10_000:
+            self.prefixes.popitem(last=False)
+        return tokens // 128 * 128 if seen else 0
+
+    def reply(self, messages: list) -> str:
+        prompt = "\n".join(message.get("content") or "" for message in messages)
+        words = [self.random.choice(WORDS) for _ in range(6)]
+        if "Reply with JSON only" in prompt:
+            return json.dumps({"themes": words[:3], "sentiment": "mixed", "pain_points": words[3:5],
+                               "quotes": [f"The {words[0]} keeps slowing us down"], "summary": "Stand-in summary."})
+        if "Provide analysis in these sections" in prompt or "same sections" in prompt:
+            sections = ["Key Findings and Documentation Alignment", "Sentiment Analysis", "Market Opportunity",
+                        "Action Items", "Recommendations"]
+            return "\n\n".join(f"{i}. {title}\n- Users mention {' '.join(words)} [Neutral]"
+                               for i, title in enumerate(sections, 1))
+        return f"Could you walk me through the last time the {words[0]} {words[1]} got in your way?"
+
+    def usage(self, messages: list, completion: str) -> dict:
+        prompt_tokens = sum(self.count(message.get("content") or "") for message in messages)
+        completion_tokens = self.count(completion)
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": self.cached_tokens(messages)},
+        }
+
+
+def create_app(stand_in: StandIn) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stand_in.counts["chat"] += 1
+        limited = stand_in.rate_limited()
+        if limited:
+            return limited
+        messages, model = body.get("messages", []), body.get("model", "gpt-4")
+        text = stand_in.reply(messages)
+        usage = stand_in.usage(messages, text)
+        completion_id, created = f"chatcmpl-{random.getrandbits(64):016x}", int(time.time())
+        await stand_in.delay(stand_in.latency_ms)
+
+        if not body.get("stream"):
+            await stand_in.delay(stand_in.token_latency_ms * usage["completion_tokens"])
+            return {
+                "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": usage,
+            }
+
+        def chunk(delta: dict, finish_reason=None, chunk_usage=None) -> str:
+            choices = [] if chunk_usage else [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+            return "data: " + json.dumps({
+                "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                "choices": choices, "usage": chunk_usage,
+            }) + "\n\n"
+
+        async def events():
+            yield chunk({"role": "assistant", "content": ""})
+            for word in text.split(" "):
+                await stand_in.delay(stand_in.token_latency_ms)
+                yield chunk({"content": word + " "})
+            yield chunk({}, finish_reason="stop")
+            if (body.get("stream_options") or {}).get("include_usage"):
+                yield chunk({}, chunk_usage=usage)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        stand_in.counts["embeddings"] += 1
+        limited = stand_in.rate_limited()
+        if limited:
+            return limited
+        texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        model = body.get("model", "text-embedding-3-small")
+        dimensions = body.get("dimensions") or DIMENSIONS.get(model, 1536)
+        await stand_in.delay(stand_in.embedding_latency_ms)
+
+        data = []
+        for index, text in enumerate(texts):
+            seed = int.from_bytes(hashlib.sha256(f"{model}:{text}".encode()).digest()[:8], "little")
+            vector = np.random.default_rng(seed).normal(size=dimensions).astype(np.float32)
+            vector /= np.linalg.norm(vector)
+            embedding = (base64.b64encode(vector.tobytes()).decode() if body.get("encoding_format") == "base64"
+                         else vector.tolist())
+            data.append({"object": "embedding", "index": index, "embedding": embedding})
+        tokens = sum(stand_in.count(str(text)) for text in texts)
+        return {"object": "list", "data": data, "model": model,
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens}}
+
+    @app.get("/stats")
+    async def stats():
+        return stand_in.counts
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=300, help="ms before the first token")
+    parser.add_argument("--token-latency", type=float, default=15, help="ms per generated token")
+    parser.add_argument("--embedding-latency", type=float, default=80, help="ms per embeddings request")
+    parser.add_argument("--jitter", type=float, default=0.3, help="relative +/- spread of every delay")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    import uvicorn
+    stand_in = StandIn(args.latency, args.token_latency, args.embedding_latency, args.jitter,
+                       args.error_rate, args.retry_after, args.seed)
+    uvicorn.run(create_app(stand_in), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""Concurrent-interview load test for the backend API.
+
+Drives ``--sessions`` scripted interviews, ``--concurrency`` at a time, through
+/api/start-project, ``--turns`` calls to /api/submit-response (or its /stream variant,
+whose time to the first token is reported separately) and /api/analyze, then prints
+p50/p95/p99 latency, error count and throughput per endpoint.
+
+Point the backend at the offline stand-in so no quota is spent and no network is needed:
+
+    python benchmarks/fake_openai.py --port 8100 &
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1 OPENAI_API_KEY=sk-local python backend/src/main.py &
+    python benchmarks/load_test.py --sessions 50 --concurrency 10 --save results/load_baseline.json
+
+The backend still applies its OPENAI_RPM/OPENAI_TPM budgets to the stand-in; raise them
+unless the run is meant to include rate-limit queueing.
+
+To gate regressions, compare against a saved report: the run fails (exit status 1) when
+an endpoint's p95 grows by more than ``--tolerance`` or its error rate rises, or when a
+``--max-p95 endpoint=ms`` limit is exceeded.
+
+    python benchmarks/load_test.py --sessions 50 --concurrency 10 --baseline results/load_baseline.json
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import random
+import sys
+import time
+
+import numpy as np
+import openai
+
+# The HTTP client library the OpenAI SDK is built on (httpx, or httpx2 in newer releases),
+# so the load generator needs nothing beyond the backend's own requirements
+http = importlib.import_module(openai.DefaultAsyncHttpxClient.__mro__[1].__module__.split(".")[0])
+
+ANSWERS = [
+    "Mostly I export the weekly report and then fix the numbers by hand in a spreadsheet.",
+    "It usually breaks when the invoice has more than a few hundred lines, so we split it.",
+    "Honestly we just ask the ops team on Slack, the dashboard is too slow to load.",
+    "The last time was Friday, the sync failed and nobody noticed until Monday morning.",
+    "We tried another tool but onboarding the whole team took too long.",
+    "not sure",
+]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+
+    def add(self, endpoint: str, seconds: float, ok: bool = True):
+        self.latencies.setdefault(endpoint, [])
+        self.errors.setdefault(endpoint, 0)
+        if ok:
+            self.latencies[endpoint].append(seconds)
+        else:
+            self.errors[endpoint] += 1
+
+    def report(self, elapsed: float) -> dict:
+        report = {}
+        for endpoint, values in self.latencies.items():
+            ms = np.array(values) * 1000 if values else np.zeros(1)
+            requests = len(values) + self.errors[endpoint]
+            report[endpoint] = {
+                "requests": requests,
+                "errors": self.errors[endpoint],
+                "error_rate": round(self.errors[endpoint] / max(requests, 1), 4),
+                "p50_ms": round(float(np.percentile(ms, 50)), 1),
+                "p95_ms": round(float(np.percentile(ms, 95)), 1),
+                "p99_ms": round(float(np.percentile(ms, 99)), 1),
+                "throughput_rps": round(requests / elapsed, 2),
+            }
+        return report
+
+
+async def timed(recorder: Recorder, endpoint: str, request) -> http.Response:
+    start = time.perf_counter()
+    try:
+        response = await request
+    except http.HTTPError:
+        recorder.add(endpoint, time.perf_counter() - start, ok=False)
+        raise
+    recorder.add(endpoint, time.perf_counter() - start, ok=response.status_code < 400)
+    response.raise_for_status()
+    return response
+
+
+async def stream_turn(client: http.AsyncClient, recorder: Recorder, session_id: str, answer: str) -> dict:
+    start = time.perf_counter()
+    first_token, event, payload = None, None, {}
+    try:
+        async with client.stream("POST", f"/submit-response/{session_id}/stream", json={"response": answer}) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line.startswith("event: "):
+                    event = line[len("event: "):]
+                    if first_token is None and event in ("token", "done"):
+                        first_token = time.perf_counter() - start
+                elif line.startswith("data: ") and event in ("done", "error"):
+                    payload = json.loads(line[len("data: "):])
+    except http.HTTPError:
+        recorder.add("submit-response/stream", time.perf_counter() - start, ok=False)
+        raise
+    ok = event == "done"
+    recorder.add("submit-response/stream", time.perf_counter() - start, ok=ok)
+    if first_token is not None:
+        recorder.add("submit-response/stream ttft", first_token)
+    if not ok:
+        raise RuntimeError(payload.get("detail", "stream ended without a done event"))
+    return payload
+
+
+async def interview(client: http.AsyncClient, recorder: Recorder, args, number: int, rng: random.Random):
+    form = {"project_name": f"Load test {number % 5}", "goal": args.goal, "target_audience": "operations teams"}
+    if args.goal == "diagnostic":
+        form.update(product_name="Acme", improvement_objective="Exports fail on large invoices",
+                    product_context=args.product_context)
+    response = await timed(recorder, "start-project", client.post("/start-project", data=form))
+    session_id = response.json()["session_id"]
+
+    for _ in range(args.turns):
+        answer = rng.choice(ANSWERS)
+        if args.stream:
+            data = await stream_turn(client, recorder, session_id, answer)
+        else:
+            data = (await timed(recorder, "submit-response", client.post(
+                f"/submit-response/{session_id}", json={"response": answer}))).json()
+        if data.get("status") == "ended":
+            return
+
+    await timed(recorder, "analyze", client.post(f"/analyze/{session_id}"))
+    if args.repeat_analyze:
+        await timed(recorder, "analyze (repeat)", client.post(f"/analyze/{session_id}"))
+
+
+async def run(args) -> dict:
+    recorder = Recorder()
+    semaphore = asyncio.Semaphore(args.concurrency)
+    limits = http.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+    failures = 0
+
+    async with http.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        async def one(number: int):
+            nonlocal failures
+            async with semaphore:
+                try:
+                    await interview(client, recorder, args, number, random.Random(args.seed + number))
+                except Exception as e:
+                    failures += 1
+                    print(f"Session {number} failed: {e}", file=sys.stderr)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(number) for number in range(args.sessions)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "sessions": args.sessions,
+        "concurrency": args.concurrency,
+        "failed_sessions": failures,
+        "elapsed_s": round(elapsed, 2),
+        "sessions_per_s": round(args.sessions / elapsed, 3),
+        "endpoints": recorder.report(elapsed),
+    }
+
+
+def print_report(report: dict):
+    print(f"{report['sessions']} sessions, {report['concurrency']} concurrent, {report['elapsed_s']} s, "
+          f"{report['sessions_per_s']} sessions/s, {report['failed_sessions']} failed\n")
+    print(f"{'endpoint':<28}{'requests':>9}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>8}")
+    for endpoint, stats in report["endpoints"].items():
+        print(f"{endpoint:<28}{stats['requests']:>9}{stats['errors']:>8}{stats['p50_ms']:>10.1f}"
+              f"{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}{stats['throughput_rps']:>8.2f}")
+
+
+def regressions(report: dict, baseline: dict, tolerance: float, max_p95: dict) -> list:
+    problems = []
+    for endpoint, stats in report["endpoints"].items():
+        if endpoint in max_p95 and stats["p95_ms"] > max_p95[endpoint]:
+            problems.append(f"{endpoint}: p95 {stats['p95_ms']} ms exceeds the {max_p95[endpoint]} ms limit")
+        before = (baseline or {}).get("endpoints", {}).get(endpoint)
+        if not before:
+            continue
+        if stats["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            problems.append(f"{endpoint}: p95 {stats['p95_ms']} ms vs {before['p95_ms']} ms in the baseline")
+        if stats["error_rate"] > before["error_rate"]:
+            problems.append(f"{endpoint}: error rate {stats['error_rate']} vs {before['error_rate']} in the baseline")
+    if baseline and report["failed_sessions"] > baseline.get("failed_sessions", 0):
+        problems.append(f"{report['failed_sessions']} failed sessions vs {baseline['failed_sessions']} in the baseline")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000/api")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--turns", type=int, default=4)
+    parser.add_argument("--goal", choices=["discovery", "diagnostic"], default="discovery")
+    parser.add_argument("--product-context", default="Acme exports invoices to CSV nightly. " * 40)
+    parser.add_argument("--stream", action="store_true", help="use /submit-response/{id}/stream")
+    parser.add_argument("--repeat-analyze", action="store_true", help="call /analyze twice per session")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="write the report as JSON")
+    parser.add_argument("--baseline", help="report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative p95 growth")
+    parser.add_argument("--max-p95", action="append", default=[], metavar="ENDPOINT=MS")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.save:
+        directory = os.path.dirname(args.save)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    max_p95 = {endpoint: float(ms) for endpoint, ms in (limit.rsplit("=", 1) for limit in args.max_p95)}
+    problems = regressions(report, baseline, args.tolerance, max_p95)
+    if problems:
+        print("\nPerformance regressions:")
+        for problem in problems:
+            print(f"- {problem}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
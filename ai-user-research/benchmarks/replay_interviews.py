@@ -0,0 +1,93 @@
+"""Record and replay saved interviews through the platform's completion cache.
+
+Each ``interview_*.json`` transcript is driven in process through ``UserResearchPlatform``:
+its recorded answers are given in order, the platform generates every question, and the
+interview is analysed at the end. With ``--mode record`` the questions and analysis come
+from the API (or the offline stand-in) and are stored in ``--cache``; with ``--mode replay``
+they are served from that cache alone, so a run needs no network and no key and measures
+only the platform's own overhead. Replay fails (exit status 1) on any prompt that was not
+recorded, which flags changes to prompt construction as well.
+
+    OPENAI_API_KEY=sk-... python benchmarks/replay_interviews.py . --mode record
+    python benchmarks/replay_interviews.py . --mode replay
+
+Conversation memory is kept in "full" mode for both runs: rolling summaries are written in
+the background, so the prompts they feed would not repeat exactly between runs.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend", "src"))
+from completion_cache import CompletionCache  # noqa: E402
+from corpus_synthesis import iter_interview_files, load_interview  # noqa: E402
+from user_research_platform import UserResearchPlatform  # noqa: E402
+
+
+async def replay(interview: dict, cache: CompletionCache, api_key: str) -> float:
+    platform = UserResearchPlatform(api_key, completion_cache=cache)
+    platform.project_info = interview["project_info"]
+    platform.memory_mode = "full"
+    platform.analysis_mode = "single"
+
+    start = time.perf_counter()
+    # Failed calls come back as None or a failed analysis (a replay miss included)
+    if await platform.generate_next_question_async() is None:
+        raise RuntimeError("the first question failed")
+    for turn in interview["turns"]:
+        platform.record_response(turn["response"])
+        if await platform.generate_next_question_async() is None:
+            raise RuntimeError(f"the question after turn {len(platform.conversation_history)} failed")
+    analysis = await platform.analyze_interview_async(platform.conversation_history)
+    if "incremental" not in analysis:
+        raise RuntimeError("the analysis failed")
+    return time.perf_counter() - start
+
+
+async def run(args) -> int:
+    cache = CompletionCache(args.cache, mode=args.mode)
+    api_key = os.getenv("OPENAI_API_KEY") or "sk-replay"
+    durations, failures = [], 0
+    for path in iter_interview_files(args.paths):
+        interview = load_interview(path)
+        if interview is None or not interview["turns"]:
+            continue
+        misses = cache.misses
+        try:
+            durations.append(await replay(interview, cache, api_key))
+        except RuntimeError as e:
+            failures += 1
+            print(f"{path}: {e}", file=sys.stderr)
+            continue
+        if args.mode == "replay" and cache.misses > misses:
+            # Elaboration questions fall back to a canned text instead of failing
+            failures += 1
+            print(f"{path}: {cache.misses - misses} prompts were not recorded", file=sys.stderr)
+
+    stats = cache.stats()
+    print(f"{len(durations)} interviews run, {failures} failed ({args.mode} mode)")
+    if durations:
+        ms = np.array(durations) * 1000
+        print(f"per interview: p50 {np.percentile(ms, 50):.1f} ms, p95 {np.percentile(ms, 95):.1f} ms, "
+              f"total {ms.sum() / 1000:.2f} s")
+    print(f"cache: {stats['entries']} entries, {stats['memory_hits']} memory hits, "
+          f"{stats['disk_hits']} disk hits, {stats['misses']} misses")
+    cache.close()
+    return 1 if failures else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="+", help="interview files or directories holding interview_*.json")
+    parser.add_argument("--mode", choices=["record", "replay", "cache"], default="replay")
+    parser.add_argument("--cache", default=os.path.join("results", "completions.sqlite3"))
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
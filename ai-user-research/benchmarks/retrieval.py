@@ -0,0 +1,172 @@
+"""Latency and agreement of lexical, hybrid and dense chunk retrieval.
+
+Times BM25 (LexicalIndex), dense top-k (ChunkIndex) and their reciprocal-rank fusion over
+the same chunks and reports overlap@k of each with the dense ranking that
+``_get_relevant_chunks`` used before, plus how often the chunk a query was written from
+is retrieved. Dense timings cover only the local search; the per-turn query embedding
+request dense and hybrid also need (typically 100-400 ms) is not made here.
+
+Chunks come from ``--document`` (chunked like the platform does) or a synthetic corpus.
+Vectors come from the embedding cache for ``--model``; with ``--embed`` the chunks and
+queries it lacks are embedded through the API first (and cached). Generated queries are
+never in the cache, so without ``--embed`` the run usually falls back to random
+projections of hashed term counts. Those track lexical overlap, so the "dense" reference
+is then itself lexical and the agreement figures say nothing about real embeddings; only
+runs on real embeddings should inform the retrieval mode default.
+
+    OPENAI_API_KEY=sk-... python benchmarks/retrieval.py --document docs/product.txt --embed
+"""
+import argparse
+import hashlib
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend", "src"))
+from chunk_index import ChunkIndex  # noqa: E402
+from lexical_index import LexicalIndex, reciprocal_rank_fusion, tokenize  # noqa: E402
+from text_chunker import TextChunker  # noqa: E402
+
+VOCABULARY = ("deploy pipeline build cache latency dashboard alert invoice billing export report "
+              "login sso permission role audit webhook api token quota upload search filter tag "
+              "notification email slack mobile offline sync conflict backup restore migration").split()
+
+
+def load_chunks(args) -> list:
+    if args.document:
+        with open(args.document, encoding="utf-8") as f:
+            chunker = TextChunker()
+            return chunker.feed(f.read()) + chunker.finish()
+
+    rng = np.random.default_rng(args.seed)
+    chunks = []
+    for _ in range(args.chunks):
+        topic = rng.choice(VOCABULARY, size=4, replace=False)
+        words = rng.choice(np.concatenate([topic.repeat(6), rng.choice(VOCABULARY, size=40)]), size=150)
+        chunks.append("The team uses " + " ".join(words) + ".")
+    return chunks
+
+
+def make_queries(chunks: list, count: int, seed: int) -> tuple:
+    """Conversation-like queries, each a few turns paraphrasing one source chunk"""
+    rng = np.random.default_rng(seed + 1)
+    queries, sources = [], []
+    for source in rng.integers(0, len(chunks), size=count):
+        terms = tokenize(chunks[source])
+        turns = []
+        for _ in range(3):
+            picked = rng.choice(terms, size=min(8, len(terms)), replace=False) if terms else []
+            turns.append(f"Q: How do you handle that?\nA: Mostly {' '.join(picked)} when it breaks")
+        queries.append("\n".join(turns))
+        sources.append(int(source))
+    return queries, sources
+
+
+def hashed_vectors(texts: list, dim: int) -> np.ndarray:
+    vectors = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for term in tokenize(text):
+            seed = int.from_bytes(hashlib.md5(term.encode()).digest()[:4], "little")
+            vectors[row] += np.random.default_rng(seed).normal(size=dim).astype(np.float32)
+    return vectors + 1e-6
+
+
+def embed_missing(args, cache, texts: list, vectors: list):
+    """Fill the ``None`` entries of ``vectors`` from the embeddings API and cache them"""
+    from openai_scheduler import shared_clients
+    client, _ = shared_clients(os.environ["OPENAI_API_KEY"])
+    missing = [i for i, vector in enumerate(vectors) if vector is None]
+    for start in range(0, len(missing), 256):
+        batch = missing[start:start + 256]
+        response = client.embeddings.create(model=args.model, input=[texts[i] for i in batch])
+        for item in response.data:
+            vectors[batch[item.index]] = item.embedding
+        cache.put_many(args.model, [texts[i] for i in batch], [vectors[i] for i in batch])
+
+
+def load_vectors(args, chunks: list, queries: list):
+    """Chunk and query vectors, and whether they are real ``--model`` embeddings"""
+    if args.embed or (args.cache and os.path.exists(args.cache)):
+        from embedding_cache import EmbeddingCache
+        cache = EmbeddingCache(args.cache)
+        chunk_vectors = cache.get_many(args.model, chunks)
+        query_vectors = cache.get_many(args.model, queries)
+        if args.embed:
+            embed_missing(args, cache, chunks, chunk_vectors)
+            embed_missing(args, cache, queries, query_vectors)
+        if all(vector is not None for vector in chunk_vectors + query_vectors):
+            print(f"Using {args.model} embeddings (cached in {args.cache})")
+            return np.array(chunk_vectors, dtype=np.float32), np.array(query_vectors, dtype=np.float32), True
+        print("Cache does not cover every chunk and query, falling back to hashed term vectors (pass --embed)")
+    return hashed_vectors(chunks, args.dim), hashed_vectors(queries, args.dim), False
+
+
+def timed(search, queries) -> tuple:
+    results, durations = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(search(query))
+        durations.append(time.perf_counter() - start)
+    durations = np.array(durations) * 1e6
+    return results, float(np.median(durations)), float(np.percentile(durations, 95))
+
+
+def overlap(results, reference, top_k: int) -> float:
+    return sum(len(set(a) & set(b)) for a, b in zip(results, reference)) / (len(reference) * top_k)
+
+
+def hit_rate(results, sources) -> float:
+    """Share of queries whose source chunk was retrieved"""
+    return sum(source in result for result, source in zip(results, sources)) / len(sources)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--document")
+    parser.add_argument("--cache", default=os.path.join("results", "embeddings.sqlite3"))
+    parser.add_argument("--model", default="text-embedding-3-small")
+    parser.add_argument("--embed", action="store_true", help="embed what the cache lacks through the API")
+    parser.add_argument("--chunks", type=int, default=500)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    chunks = load_chunks(args)
+    queries, sources = make_queries(chunks, args.queries, args.seed)
+    chunk_vectors, query_vectors, real = load_vectors(args, chunks, queries)
+    top_k, candidates = args.top_k, max(args.top_k * 10, 20)
+
+    start = time.perf_counter()
+    lexical = LexicalIndex()
+    lexical.add(chunks)
+    lexical.search("warm up", 1)
+    lexical_build = time.perf_counter() - start
+    dense = ChunkIndex("float32")
+    dense.add(chunk_vectors)
+
+    query_pairs = list(zip(queries, query_vectors))
+    dense_results, dense_p50, dense_p95 = timed(lambda pair: dense.search(pair[1], top_k), query_pairs)
+    lexical_results, lexical_p50, lexical_p95 = timed(lambda pair: lexical.search(pair[0], top_k), query_pairs)
+    hybrid_results, hybrid_p50, hybrid_p95 = timed(lambda pair: reciprocal_rank_fusion(
+        [lexical.search(pair[0], candidates), dense.search(pair[1], candidates)], top_k), query_pairs)
+
+    print(f"{len(chunks)} chunks, {len(queries)} queries, top-{top_k}; "
+          f"BM25 index built in {lexical_build * 1000:.1f} ms\n")
+    print(f"{'mode':<10}{'p50 us':>10}{'p95 us':>10}{'overlap vs dense':>18}{'source hit':>12}")
+    rows = [("dense", dense_results, dense_p50, dense_p95, "   + query embedding request"),
+            ("hybrid", hybrid_results, hybrid_p50, hybrid_p95, "   + query embedding request"),
+            ("lexical", lexical_results, lexical_p50, lexical_p95, "")]
+    for mode, results, p50, p95, note in rows:
+        print(f"{mode:<10}{p50:>10.1f}{p95:>10.1f}{overlap(results, dense_results, top_k):>18.3f}"
+              f"{hit_rate(results, sources):>12.3f}{note}")
+    if not real:
+        print("\nDense vectors were hashed term counts, not embeddings: overlap and hit rates are not "
+              "evidence for or against dense retrieval.")
+
+
+if __name__ == "__main__":
+    main()
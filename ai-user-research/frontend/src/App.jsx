@@ -220,8 +220,20 @@ const AnalysisResults = ({ analysis }) => {
       throw new Error(data.detail || 'Failed to start project');
     }
 
+    // Diagnostic documents are ingested in the background; wait for the first question
+    let question = data.question;
+    while (!question) {
+      await new Promise((resolve) => setTimeout(resolve, 1000));
+      const statusResponse = await fetch(`${API_URL}/api/project-status/${data.session_id}`);
+      const status = await statusResponse.json();
+      if (!statusResponse.ok || status.stage === 'failed') {
+        throw new Error(status.error || status.detail || 'Failed to process document');
+      }
+      question = status.question;
+    }
+
     setSessionId(data.session_id);
-    setCurrentQuestion(data.question);
+    setCurrentQuestion(question);
     localStorage.setItem('openai_api_key', data.api_key);
     setCurrentStep('mode-select');
   } catch (err) {